@@ -1,11 +1,12 @@
 import streamlit as st
 import os
-from components.form_components import render_insurance_form
-from components.clause_manager import render_clause_manager
-from components.document_generator import generate_document
-from components.project_manager import render_project_manager
+from datetime import datetime
+from components import perf
 from welcome import show_welcome_screen, should_show_welcome
 
+# 其余组件依赖 pandas、SQLAlchemy、python-docx 等较重的库，在 main() 中按需导入，
+# 欢迎页面和未打开项目时的首屏不加载它们（冷启动目标见 benchmarks/bench_import_time.py）
+
 def init_session_state():
     """初始化session state"""
     if 'insurance_data' not in st.session_state:
@@ -91,6 +92,7 @@ def main():
         os.makedirs('projects')
     
     # 渲染项目管理器
+    from components.project_manager import render_project_manager
     render_project_manager()
     
     # 如果没有选择项目，显示提示信息
@@ -98,6 +100,14 @@ def main():
         st.warning("🎯 请先选择或创建一个项目开始您的保险方案之旅~")
         return
     
+    # 打开项目后才加载数据库层和表单、条款、文档组件
+    from components.form_components import render_insurance_form
+    from components.clause_manager import render_clause_manager
+    from components.document_generator import generate_document
+    from components.job_manager import submit_job, run_generate_job, render_job_status, job_dir
+    from components.selected_clauses import order_by_policy
+    from components.database import Database
+    
     # 显示当前项目名称
     st.markdown(f"# 📁 项目：{st.session_state.project_name}")
     
@@ -136,6 +146,13 @@ def main():
         if st.button("🚀 生成方案"):
             with st.spinner("📊 正在精心排版您的保险方案..."):
                 try:
+                    # 条款顺序以数据库中当前方案的顺序为准
+                    if st.session_state.get('current_policy_id') is not None:
+                        selected_clauses = order_by_policy(
+                            Database(st.session_state.db_path),
+                            st.session_state.current_policy_id,
+                            selected_clauses
+                        )
                     if format == "Markdown":
                         content = generate_document(
                             insurance_data,
@@ -167,6 +184,31 @@ def main():
                             )
                 except Exception as e:
                     st.error(f"❌ 生成文档时出错：{str(e)}")
+        
+        # 大型方案可以提交到后台生成，完成后在任务列表中下载
+        if st.button("🕒 后台生成", help="在后台生成方案文档，生成期间可以继续操作"):
+            output_dir = job_dir(st.session_state.db_path)
+            os.makedirs(output_dir, exist_ok=True)
+            extension = 'md' if format == "Markdown" else 'docx'
+            submit_job(
+                st.session_state.db_path,
+                'generate',
+                run_generate_job,
+                insurance_data=insurance_data,
+                selected_clauses=[dict(clause) for clause in selected_clauses],
+                policy_id=st.session_state.get('current_policy_id'),
+                format='markdown' if format == "Markdown" else 'docx',
+                output_path=os.path.join(
+                    output_dir,
+                    f"insurance_policy_{datetime.now().strftime('%Y%m%d%H%M%S')}.{extension}"
+                )
+            )
+        
+        render_job_status(st.session_state.db_path, 'generate')
 
 if __name__ == "__main__":
+    # 记录本次重跑的耗时段，欢迎页面之外在侧边栏提供性能面板
+    trace = perf.begin_rerun()
     main()
+    if not should_show_welcome():
+        perf.render_perf_panel(trace)
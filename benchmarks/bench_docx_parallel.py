@@ -0,0 +1,75 @@
+"""扩展条款分片并行生成 DOCX 的扩展性测试
+
+使用 1–8 个进程（不超过 CPU 核数，也可通过参数指定）生成同一份保险方案，
+报告耗时和相对单进程的加速比，并检查：
+    - 不同进程数生成的 word/document.xml 完全相同（合并结果确定）
+    - 书签ID唯一，目录中的每个超链接都能找到对应的 clause_{i} 书签
+
+用法：python benchmarks/bench_docx_parallel.py [条款数量] [进程数 ...]
+"""
+import os
+import re
+import sys
+import time
+import zipfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from components.document_generator import generate_docx, _shard_pool
+import synthetic
+
+DEFAULT_CLAUSES = 5000
+
+def document_xml(buffer):
+    """读取生成文档的 word/document.xml"""
+    with zipfile.ZipFile(buffer) as archive:
+        return archive.read('word/document.xml').decode('utf-8')
+
+def check_links(xml, count):
+    """检查书签ID唯一、目录超链接都有对应书签，返回错误描述列表"""
+    errors = []
+    ids = re.findall(r'<w:bookmarkStart w:id="(\d+)"', xml)
+    if len(ids) != len(set(ids)):
+        errors.append("书签ID重复")
+    names = set(re.findall(r'<w:bookmarkStart w:id="\d+" w:name="([^"]+)"', xml))
+    anchors = re.findall(r'<w:hyperlink w:anchor="([^"]+)"', xml)
+    if len(anchors) != count:
+        errors.append(f"目录项数量 {len(anchors)} 与条款数量 {count} 不符")
+    missing = [anchor for anchor in anchors if anchor not in names]
+    if missing:
+        errors.append(f"{len(missing)} 个超链接没有对应书签，例如 {missing[0]}")
+    return errors
+
+def main(count, worker_counts):
+    clauses = synthetic.make_clauses(count).to_dict('records')
+    insurance_data = synthetic.make_insurance_data()
+    print(f"{count} 条扩展条款，CPU 核数 {os.cpu_count()}")
+
+    baseline_seconds = None
+    baseline_xml = None
+    failed = False
+    for workers in worker_counts:
+        if workers > 1:
+            # 进程启动和模块导入不计入耗时
+            list(_shard_pool(workers).map(abs, range(workers)))
+        start = time.perf_counter()
+        buffer = generate_docx(insurance_data, clauses, workers=workers)
+        seconds = time.perf_counter() - start
+        xml = document_xml(buffer)
+
+        errors = check_links(xml, count)
+        if baseline_xml is None:
+            baseline_seconds, baseline_xml = seconds, xml
+        elif xml != baseline_xml:
+            errors.append(f"与 {worker_counts[0]} 个进程生成的结果不同")
+        failed = failed or bool(errors)
+        print(f"{workers:>3} 进程  {seconds * 1000:10.1f} ms  加速比 {baseline_seconds / seconds:5.2f}x  "
+              f"{'；'.join(errors) or '检查通过'}", flush=True)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CLAUSES
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or list(range(1, min(os.cpu_count() or 1, 8) + 1))
+    sys.exit(main(count, worker_counts))
@@ -0,0 +1,119 @@
+"""条款管理页局部重跑的耗时测试
+
+用 Streamlit AppTest 在合成条款库上打开项目并选中一批条款，然后反复勾选/取消一个条款，
+比较整页重跑与只重跑各片段（条款列表、已选条款区域、已选条款分页列表、单个条款的版本面板）的耗时。
+AppTest 只能整页运行脚本，片段单独重跑用只调用对应片段函数的脚本模拟，会话状态与整页相同。
+
+    目标：勾选条款时只重跑条款列表和已选条款区域，两者之和明显低于整页重跑。
+
+用法：python benchmarks/bench_fragments.py [条款数量] [重跑次数]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+# 各片段单独重跑时执行的脚本
+FRAGMENT_SCRIPTS = {
+    '条款列表': """
+from components.database import Database
+from components.clause_manager import render_clause_list
+render_clause_list(Database())
+""",
+    '已选条款区域': """
+from components.database import Database
+from components.clause_manager import render_selected_pane
+render_selected_pane(Database())
+""",
+    '已选条款分页列表': """
+from components.database import Database
+from components.clause_manager import render_selected_clauses
+render_selected_clauses(Database())
+""",
+    '单个版本面板': """
+import streamlit as st
+from components.database import Database
+from components.clause_manager import render_clause_content
+render_clause_content(st.session_state.selected_clauses[0], Database())
+""",
+}
+
+# 整页和片段之间共享的会话状态
+SHARED_KEYS = ['db_path', 'selected_clauses', 'version_info', 'current_policy_id']
+
+def timed_reruns(at, toggle_clause, rounds):
+    """每次勾选或取消 toggle_clause 后重跑，返回重跑耗时的中位数（毫秒）"""
+    timings = []
+    for i in range(rounds):
+        selected = list(at.session_state['selected_clauses'])
+        if i % 2:
+            selected = [clause for clause in selected if clause['UUID'] != toggle_clause['UUID']]
+        else:
+            selected.append(toggle_clause)
+        at.session_state['selected_clauses'] = selected
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return sorted(timings)[len(timings) // 2]
+
+def main(count, rounds):
+    from streamlit.testing.v1 import AppTest
+    from components.database import Database
+    from components.clause_snapshot import load_catalog
+    from components.selected_clauses import make_selected_clause
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ['POLICYMAKER_LIBRARY_DB'] = os.path.abspath('library.db')
+    with redirect_stdout(io.StringIO()):
+        Database('library.db').import_clauses(synthetic.make_clauses(count))
+
+    # 整页：新建项目，选中前 30 个条款
+    app = AppTest.from_file(os.path.join(ROOT_DIR, 'app.py'), default_timeout=120)
+    app.session_state['welcome_completed'] = True
+    app.run()
+    app.sidebar.text_input[0].input('bench')
+    app.sidebar.button[0].click().run()
+    db = Database(app.session_state['db_path'])
+    catalog = load_catalog(db)
+    app.session_state['selected_clauses'] = [
+        make_selected_clause(db.db_path, row, i + 1) for i, (_, row) in enumerate(catalog.head(30).iterrows())
+    ]
+    app.run()
+    toggle_clause = make_selected_clause(db.db_path, catalog.iloc[30], 31)
+
+    full_ms = timed_reruns(app, toggle_clause, rounds)
+    print(f"{count} 条款，已选 30 个：整页重跑中位数 {full_ms:.1f} ms")
+
+    status = 0
+    timings = {}
+    for name, script in FRAGMENT_SCRIPTS.items():
+        at = AppTest.from_string(script, default_timeout=120)
+        for key in SHARED_KEYS:
+            if key in app.session_state:
+                at.session_state[key] = app.session_state[key]
+        at.run()
+        fragment_ms = timings[name] = timed_reruns(at, toggle_clause, rounds)
+        print(f"  {name}重跑中位数 {fragment_ms:.1f} ms，为整页的 {fragment_ms / full_ms:.0%}（加速 {full_ms / fragment_ms:.1f} 倍）")
+        if fragment_ms >= full_ms:
+            status = 1
+    # 勾选条款时条款列表和已选条款区域两个片段一起重跑
+    toggle_ms = timings['条款列表'] + timings['已选条款区域']
+    print(f"  勾选条款（条款列表 + 已选条款区域）{toggle_ms:.1f} ms，为整页的 {toggle_ms / full_ms:.0%}")
+    if toggle_ms >= full_ms:
+        status = 1
+    return status
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sys.exit(main(count, rounds))
@@ -0,0 +1,69 @@
+"""容错搜索的耗时与召回测试
+
+在合成条款库上建立模糊搜索索引，随机选取条款，在其标题、拼音首字母或全拼中
+制造错字（替换、删除或插入一个字符），检查原条款是否出现在搜索结果中，
+并报告建立索引、条款库变化后增量重建以及每次搜索的耗时。
+
+用法：python benchmarks/bench_fuzzy.py [条款数量] [搜索次数]
+"""
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from components.fuzzy_search import FUZZY_COLUMNS, FuzzyIndex
+import synthetic
+
+def make_typo(text, rng):
+    """在文本中随机替换、删除或插入一个字符"""
+    pos = rng.randrange(len(text))
+    kind = rng.choice(['replace', 'delete', 'insert'])
+    if kind == 'replace':
+        return text[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + text[pos + 1:]
+    if kind == 'delete':
+        return text[:pos] + text[pos + 1:]
+    return text[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + text[pos:]
+
+def main(count, rounds):
+    df = synthetic.make_clauses(count)
+    start = time.perf_counter()
+    index = FuzzyIndex(df)
+    print(f"{count} 条款，建立索引 {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    changed = df.copy()
+    edited = changed.index[:max(1, count // 100)]
+    changed.loc[edited, '扩展条款标题'] = changed.loc[edited, '扩展条款标题'] + '（修订）'
+    start = time.perf_counter()
+    index = FuzzyIndex(changed, previous=index)
+    print(f"修改 {len(edited)} 条后增量重建 {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = random.Random(0)
+    timings = []
+    missed = 0
+    for _ in range(rounds):
+        row = rng.randrange(count)
+        text = str(changed[rng.choice(FUZZY_COLUMNS)].iloc[row]).lower()
+        # 取 8–12 个字符的片段制造错字，允许的编辑距离为 2
+        length = min(len(text), rng.randint(8, 12))
+        offset = rng.randrange(len(text) - length + 1)
+        term = make_typo(text[offset:offset + length], rng)
+        start = time.perf_counter()
+        positions, _ = index.search(term)
+        timings.append((time.perf_counter() - start) * 1000)
+        if row not in set(positions.tolist()):
+            missed += 1
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"搜索 {rounds} 次：中位数 {median:.1f} ms，P95 {p95:.1f} ms，未召回 {missed} 次")
+    return 1 if missed else 0
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    sys.exit(main(count, rounds))
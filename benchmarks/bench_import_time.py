@@ -0,0 +1,86 @@
+"""冷启动导入耗时（基于 python -X importtime）
+
+分别测量欢迎页面 / 未打开项目时的首屏导入（import app）和打开项目后的完整组件导入，
+列出耗时最多的模块，并检查冷启动目标：
+
+    冷启动目标：import app 时除 streamlit 本身外的导入耗时不超过 50 ms，
+    且不加载 pandas、numpy、SQLAlchemy、python-docx、openpyxl、pyarrow、requests。
+
+未达到目标时以非零状态退出，可以放在提交前检查中运行。
+
+用法：python benchmarks/bench_import_time.py [重复次数]
+"""
+import os
+import sys
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 冷启动目标：除 streamlit 外的导入耗时上限（毫秒）
+COLD_START_TARGET_MS = 50
+
+# 首屏不应加载的重型依赖
+DEFERRED_MODULES = ['pandas', 'numpy', 'sqlalchemy', 'docx', 'openpyxl', 'pyarrow', 'requests']
+
+COLD_START_CODE = (
+    "import sys, app\n"
+    f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+)
+
+PROJECT_OPEN_CODE = (
+    "import app\n"
+    "import components.project_manager, components.form_components, components.clause_manager\n"
+    "import components.document_generator, components.job_manager, components.database\n"
+)
+
+def importtime(code):
+    """在新进程中执行 code，返回 ({模块: (自身微秒, 累计微秒, 层级)}, 标准输出)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.setdefault(name.strip(), (int(self_us), int(cumulative_us), depth))
+    return modules, result.stdout.strip()
+
+def best_of(code, repeat):
+    """多次运行取总耗时最短的一次"""
+    runs = [importtime(code) for _ in range(repeat)]
+    return min(runs, key=lambda run: sum(cumulative for _, cumulative, depth in run[0].values() if depth == 0))
+
+def report(title, modules, limit=12):
+    total = sum(cumulative for _, cumulative, depth in modules.values() if depth == 0)
+    print(f"\n{title}：总计 {total / 1000:.1f} ms")
+    slowest = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth <= 1),
+        key=lambda item: item[1], reverse=True
+    )[:limit]
+    for name, cumulative in slowest:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+    return total
+
+def main(repeat):
+    cold_modules, loaded = best_of(COLD_START_CODE, repeat)
+    report("首屏（import app）", cold_modules)
+    app_self = cold_modules.get('app', (0, 0, 0))
+    streamlit_cost = cold_modules.get('streamlit', (0, 0, 0))[1]
+    own_cost_ms = (app_self[1] - streamlit_cost) / 1000
+
+    project_modules, _ = best_of(PROJECT_OPEN_CODE, repeat)
+    report("打开项目后（全部组件）", project_modules)
+
+    print(f"\n首屏除 streamlit 外的导入耗时：{own_cost_ms:.1f} ms（目标 ≤ {COLD_START_TARGET_MS} ms）")
+    print(f"首屏加载的重型依赖：{loaded or '无'}")
+    if own_cost_ms > COLD_START_TARGET_MS or loaded:
+        print("未达到冷启动目标")
+        return 1
+    print("达到冷启动目标")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,108 @@
+"""日志开销基准：模拟渲染一页（25 个条款）时版本管理和条款内容的日志调用
+
+对比原先的同步 FileHandler + DEBUG 级别 f-string 日志，与现在的队列日志管道
+（默认 INFO 级别、%-style 惰性格式化），以及在新管道上打开 DEBUG 时的开销。
+
+用法：python benchmarks/bench_logging.py [重复页数]
+"""
+import io
+import os
+import sys
+import time
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGE_SIZE = 25
+VERSIONS_PER_CLAUSE = 3
+
+def make_page():
+    """生成一页条款及其版本"""
+    page = []
+    for i in range(PAGE_SIZE):
+        versions = [
+            SimpleNamespace(
+                version_number=n,
+                created_at=datetime(2024, 1, 1) + timedelta(days=n),
+                content=f"本保险扩展承保第{i}项约定的损失，" * 30
+            )
+            for n in range(VERSIONS_PER_CLAUSE, 0, -1)
+        ]
+        page.append((f"C{i:06d}", versions))
+    return page
+
+def render_page_legacy(log, page):
+    """原先的日志调用方式"""
+    for uuid, versions in page:
+        log.debug(f"\n=== 开始渲染条款内容 ===")
+        log.debug(f"条款UUID: {uuid}")
+        log.debug(f"当前版本号: {versions[0].version_number}")
+        log.debug("\n=== 版本标签渲染开始 ===")
+        log.debug(f"当前版本号: {versions[0].version_number}")
+        log.debug(f"条款UUID: {uuid}")
+        log.debug(f"当前版本内容: {versions[0].content[:50]}...")
+        log.debug(f"可用版本数量: {len(versions)}")
+        log.debug("可用版本列表:")
+        for v in versions:
+            log.debug(f"  - V{v.version_number} ({v.created_at})")
+        log.debug(f"选中的版本号: {versions[0].version_number}")
+        log.debug(f"选中版本内容: {versions[0].content[:50]}...")
+        log.debug("=== 条款内容渲染结束 ===\n")
+
+def render_page_pipeline(log, page):
+    """现在的日志调用方式（与 clause_manager / version_manager 一致）"""
+    for uuid, versions in page:
+        log.debug("开始渲染条款内容：%s", uuid)
+        debug_enabled = log.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            log.debug("=== 版本标签渲染开始 === 条款UUID: %s，当前版本号: %s", uuid, versions[0].version_number)
+            log.debug("当前版本内容: %s...", versions[0].content[:50])
+            log.debug("可用版本: %s", ", ".join(f"V{v.version_number} ({v.created_at})" for v in versions))
+            log.debug("选中的版本号: %s，内容: %s...", versions[0].version_number, versions[0].content[:50])
+
+def legacy_logger(log_dir):
+    """按原先方式配置：同步文件处理器和控制台处理器，DEBUG 级别"""
+    log = logging.getLogger('bench.legacy')
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    for handler in (logging.FileHandler(os.path.join(log_dir, 'legacy.log'), encoding='utf-8'),
+                    logging.StreamHandler(io.StringIO())):
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    return log
+
+def measure(render, log, page, pages):
+    """渲染 pages 页所需的平均时间（毫秒/页）"""
+    start = time.perf_counter()
+    for _ in range(pages):
+        render(log, page)
+    return (time.perf_counter() - start) / pages * 1000
+
+def main(pages):
+    work_dir = tempfile.mkdtemp()
+    os.chdir(work_dir)
+    # 控制台输出丢弃，只测量日志管道本身
+    sys.stderr = io.StringIO()
+    from components.logger import logger as pipeline
+
+    page = make_page()
+    legacy = legacy_logger(work_dir)
+    pipeline_log = logging.getLogger('components.clause_manager')
+
+    results = {
+        '原同步日志 (DEBUG)': measure(render_page_legacy, legacy, page, pages),
+        '队列日志 (默认 INFO)': measure(render_page_pipeline, pipeline_log, page, pages)
+    }
+    pipeline.configure_levels({'components': 'DEBUG'})
+    results['队列日志 (DEBUG)'] = measure(render_page_pipeline, pipeline_log, page, pages)
+
+    sys.stderr = sys.__stderr__
+    for name, elapsed in results.items():
+        print(f"{name:<20} {elapsed:8.3f} ms/页")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,61 @@
+"""近似重复条款检测的耗时与召回测试
+
+在合成条款库中复制一部分条款正文并改动一两个字符，计算所有条款的 MinHash 签名、
+用 LSH 聚类，报告两个阶段的耗时以及被改动的条款与原条款落入同一簇的比例。
+
+    目标：10 万条款时签名和聚类合计远低于 1 分钟。
+
+用法：python benchmarks/bench_near_duplicates.py [条款数量] [复制数量]
+"""
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from components.near_duplicates import minhash_signatures, find_clusters
+import synthetic
+
+TARGET_SECONDS = 60
+MIN_RECALL = 0.95
+
+def main(count, copies):
+    texts = synthetic.make_clauses(count)['扩展条款正文'].tolist()
+    rng = random.Random(0)
+    copied = {}
+    for target in rng.sample(range(count), min(copies, count // 2)):
+        source = rng.randrange(count)
+        if source == target or source in copied or target in copied.values():
+            continue
+        text = texts[source]
+        for _ in range(rng.randint(1, 2)):
+            pos = rng.randrange(len(text))
+            text = text[:pos] + '该' + text[pos + 1:]
+        texts[target] = text
+        copied[target] = source
+
+    start = time.perf_counter()
+    signatures = minhash_signatures(texts)
+    signature_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    clusters = find_clusters(signatures)
+    cluster_seconds = time.perf_counter() - start
+
+    cluster_of = {member: i for i, members in enumerate(clusters) for member in members}
+    found = sum(
+        1 for target, source in copied.items()
+        if target in cluster_of and cluster_of[target] == cluster_of.get(source)
+    )
+    recall = found / max(len(copied), 1)
+    total = signature_seconds + cluster_seconds
+    print(f"{count} 条款：签名 {signature_seconds:.2f} s，聚类 {cluster_seconds:.2f} s，"
+          f"{len(clusters)} 簇，复制条款召回 {found}/{len(copied)}（{recall:.1%}）")
+    return 0 if total <= TARGET_SECONDS and recall >= MIN_RECALL else 1
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    sys.exit(main(count, copies))
@@ -0,0 +1,56 @@
+"""条款库快照与 SQLite+ORM 加载路径的对比基准
+
+用法：python benchmarks/bench_snapshot.py [条款数量 ...]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from components.database import Database
+from components import clause_snapshot
+from synthetic import make_clauses
+
+def timed(func, repeat=3):
+    """返回多次执行中的最短耗时（秒）和最后一次的结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run(count):
+    work_dir = tempfile.mkdtemp()
+    try:
+        db = Database(os.path.join(work_dir, 'clauses.db'))
+        db.import_clauses(make_clauses(count))
+
+        orm_time, _ = timed(lambda: db.export_clauses('dataframe'))
+
+        # 首次加载：从数据库重建并写入快照
+        build_time, _ = timed(lambda: clause_snapshot.load_catalog(db), repeat=1)
+
+        def load_from_disk():
+            clause_snapshot._loaded_snapshots.clear()
+            return clause_snapshot.load_catalog(db)
+
+        mmap_time, _ = timed(load_from_disk)
+        warm_time, _ = timed(lambda: clause_snapshot.load_catalog(db))
+
+        print(f"{count:>8} 条  ORM: {orm_time * 1000:9.1f} ms  "
+              f"重建快照: {build_time * 1000:9.1f} ms  "
+              f"快照(mmap): {mmap_time * 1000:8.1f} ms  "
+              f"进程缓存: {warm_time * 1000:6.2f} ms")
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 5000]
+    for count in counts:
+        run(count)
@@ -0,0 +1,264 @@
+"""数据库层与文档生成的基准测试
+
+在多个数据规模下测量 import_clauses、export_clauses（DataFrame 和 XLSX）、export_selected_clauses、
+save_policy_clauses、apply_policy_selection_diff、move_policy_clause、load_project、generate_markdown、generate_docx 以及相关条款推荐的耗时、SQL 数量和峰值内存，
+结果保存为 JSON，便于在不同提交之间比较。
+
+用法：
+    python benchmarks/run_benchmarks.py                       # 默认规模 200 1000 3000
+    python benchmarks/run_benchmarks.py --scales 500 5000     # 指定条款数量
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<旧提交>.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import streamlit as st
+from components import perf
+from components.database import Database
+from components.project_manager import ProjectManager
+from components.document_generator import generate_markdown, generate_docx
+from components.similarity import load_similarity_index
+import synthetic
+
+DEFAULT_SCALES = [200, 1000, 3000]
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# 每个规模下的方案数量、每个方案的条款数量和每个条款的版本数量
+POLICY_COUNT = 10
+MAX_CLAUSES_PER_POLICY = 200
+VERSIONS_PER_CLAUSE = 3
+
+PROJECT_NAME = 'bench'
+
+class BenchEnv:
+    """一个规模下的基准测试环境：项目目录、数据库和已生成的数据"""
+
+    def __init__(self, scale, work_dir):
+        self.scale = scale
+        self.work_dir = work_dir
+        self.manager = ProjectManager(base_dir=os.path.join(work_dir, 'projects'))
+        # 使用项目独立的条款库，结果与之前的提交可比
+        self.manager.create_project(PROJECT_NAME, use_library=False)
+        self.db_path = os.path.join(work_dir, 'projects', PROJECT_NAME, 'clauses.db')
+        st.session_state.db_path = self.db_path
+        self.db = Database(self.db_path)
+        self.clauses = synthetic.make_clauses(scale)
+        self.uuids = self.clauses['UUID'].tolist()
+        self.selection_size = min(MAX_CLAUSES_PER_POLICY, scale)
+        self.save_round = 0
+        self.diff_round = 0
+        self.move_round = 0
+        self.import_round = 0
+
+    def populate(self):
+        """导入条款并准备多版本和多方案数据"""
+        self.db.import_clauses(self.clauses)
+        synthetic.add_versions(self.db, self.uuids, VERSIONS_PER_CLAUSE)
+        # 项目创建时的保险方案排在第一个，load_project 会加载它，这里同样为它选择条款
+        default_policy = self.db.session.query(self.db.InsurancePolicy).order_by(self.db.InsurancePolicy.id).first()
+        self.db.save_policy_clauses(default_policy.id, self.uuids[-self.selection_size:])
+        self.policy_ids = [default_policy.id] + synthetic.add_policies(
+            self.db, self.uuids, POLICY_COUNT - 1, self.selection_size
+        )
+        st.session_state.current_policy_id = self.policy_ids[0]
+        self.selected_uuids = self.db.get_policy_clause_uuids(self.policy_ids[0])
+
+def prepare_import(env):
+    """每次导入使用一个新的空数据库"""
+    env.import_round += 1
+    db = Database(os.path.join(env.work_dir, f'import_{env.import_round}.db'))
+    return lambda: db.import_clauses(env.clauses)
+
+def prepare_export(env):
+    return lambda: env.db.export_clauses('dataframe')
+
+def prepare_export_xlsx(env):
+    return lambda: env.db.export_clauses('xlsx').close()
+
+def prepare_export_selected(env):
+    return lambda: env.db.export_selected_clauses(env.selected_uuids, 'xlsx')
+
+def prepare_save_policy(env):
+    """每次保存替换一半条款，保证都有实际写入"""
+    env.save_round += 1
+    half = env.selection_size // 2
+    offset = (env.save_round * half) % max(1, len(env.uuids) - half)
+    selection = env.selected_uuids[:half] + env.uuids[offset:offset + half]
+    st.session_state.version_info = {}
+    return lambda: env.db.save_policy_clauses(env.policy_ids[1], selection)
+
+def prepare_selection_diff(env):
+    """每次在一页（20 个）条款中勾选一半、取消另一半，与上一次相反，保证都有实际写入"""
+    env.diff_round += 1
+    page = env.uuids[:20]
+    added, removed = (page[:10], page[10:]) if env.diff_round % 2 else (page[10:], page[:10])
+    st.session_state.version_info = {}
+    return lambda: env.db.apply_policy_selection_diff(env.policy_ids[2], added, removed)
+
+def prepare_move_clause(env):
+    """每次把方案中的第一个条款移动到不同位置"""
+    env.move_round += 1
+    policy_id = env.policy_ids[3]
+    first = env.db.get_policy_clause_bindings(policy_id)[0][0]
+    position = (env.move_round * 37) % env.selection_size
+    return lambda: env.db.move_policy_clause(policy_id, first, position)
+
+def prepare_load_project(env):
+    return lambda: env.manager.load_project(PROJECT_NAME)
+
+def _selected_clauses(env):
+    """加载项目得到已选条款，作为文档生成的输入"""
+    env.manager.load_project(PROJECT_NAME)
+    return [dict(clause) for clause in st.session_state.selected_clauses]
+
+def prepare_markdown(env):
+    clauses = _selected_clauses(env)
+    insurance_data = synthetic.make_insurance_data()
+    return lambda: generate_markdown(insurance_data, clauses)
+
+def prepare_docx(env):
+    clauses = _selected_clauses(env)
+    insurance_data = synthetic.make_insurance_data()
+    return lambda: generate_docx(insurance_data, clauses)
+
+def prepare_similar(env):
+    """相似度索引在准备阶段建好，只测量查询"""
+    index = load_similarity_index(env.db)
+    return lambda: index.similar(env.selected_uuids[:5], k=10)
+
+def prepare_co_selected(env):
+    return lambda: env.db.get_co_selected_clauses(env.selected_uuids[:5], limit=10)
+
+SCENARIOS = [
+    ('import_clauses', prepare_import),
+    ('export_clauses', prepare_export),
+    ('export_clauses_xlsx', prepare_export_xlsx),
+    ('export_selected_clauses', prepare_export_selected),
+    ('save_policy_clauses', prepare_save_policy),
+    ('apply_selection_diff', prepare_selection_diff),
+    ('move_policy_clause', prepare_move_clause),
+    ('load_project', prepare_load_project),
+    ('generate_markdown', prepare_markdown),
+    ('generate_docx', prepare_docx),
+    ('similar_clauses', prepare_similar),
+    ('co_selected_clauses', prepare_co_selected)
+]
+
+def measure(env, prepare, with_memory=True):
+    """执行一次计时（同时统计 SQL 数量），再单独执行一次测量峰值内存"""
+    run = prepare(env)
+    trace = perf.begin_rerun()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    queries = trace.queries
+
+    peak_mb = None
+    if with_memory:
+        run = prepare(env)
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / 1024 / 1024
+    return {'seconds': seconds, 'queries': queries, 'peak_mb': peak_mb}
+
+def git_commit():
+    """当前提交的短哈希，不在 git 仓库中时返回 unknown"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_scale(scale, scenarios, with_memory):
+    """在一个数据规模下运行所有场景"""
+    work_dir = tempfile.mkdtemp(prefix='policymaker_bench_')
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        # 数据库层的调试输出不计入结果显示
+        with redirect_stdout(io.StringIO()):
+            env = BenchEnv(scale, work_dir)
+        results = []
+        for name, prepare in scenarios:
+            with redirect_stdout(io.StringIO()):
+                if name != 'import_clauses' and not hasattr(env, 'policy_ids'):
+                    env.populate()
+                measured = measure(env, prepare, with_memory)
+            result = {'scenario': name, 'scale': scale, **measured}
+            results.append(result)
+            peak = f"{result['peak_mb']:8.1f} MB" if result['peak_mb'] is not None else '       -'
+            print(f"{scale:>7}  {name:<24} {result['seconds'] * 1000:10.1f} ms  "
+                  f"{result['queries']:>7} SQL  {peak}", flush=True)
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare(current, baseline_path):
+    """与之前保存的结果比较"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['scenario'], r['scale']): r for r in baseline['results']}
+    print(f"\n与 {baseline.get('commit', baseline_path)} 比较：")
+    for result in current['results']:
+        old = previous.get((result['scenario'], result['scale']))
+        if not old:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        print(f"{result['scale']:>7}  {result['scenario']:<24} "
+              f"{old['seconds'] * 1000:10.1f} ms -> {result['seconds'] * 1000:10.1f} ms  ({ratio:5.2f}x)  "
+              f"SQL {old['queries']} -> {result['queries']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='保险方案生成平台基准测试')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='条款数量')
+    parser.add_argument('--scenarios', nargs='+', choices=[name for name, _ in SCENARIOS], help='只运行指定场景')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存（更快）')
+    parser.add_argument('--output', help='结果文件路径，默认 benchmarks/results/<提交>.json')
+    parser.add_argument('--compare', help='与之前保存的结果文件比较')
+    args = parser.parse_args()
+
+    # 其他场景依赖的数据由 BenchEnv.populate 准备，不要求同时运行 import_clauses
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s[0] in args.scenarios]
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': []
+    }
+    for scale in args.scales:
+        report['results'].extend(run_scale(scale, scenarios, not args.no_memory))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""基准测试用的合成数据：中文条款标题与正文、拼音、多版本条款和多个保险方案"""
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# 条款标题用词及其拼音音节
+TITLE_WORDS = [
+    ('火灾', ['huo', 'zai']), ('地震', ['di', 'zhen']), ('暴雨', ['bao', 'yu']),
+    ('台风', ['tai', 'feng']), ('洪水', ['hong', 'shui']), ('盗窃', ['dao', 'qie']),
+    ('抢劫', ['qiang', 'jie']), ('责任', ['ze', 'ren']), ('赔偿', ['pei', 'chang']),
+    ('雇主', ['gu', 'zhu']), ('第三者', ['di', 'san', 'zhe']), ('财产', ['cai', 'chan']),
+    ('工程', ['gong', 'cheng']), ('设备', ['she', 'bei']), ('机器', ['ji', 'qi']),
+    ('损坏', ['sun', 'huai']), ('营业', ['ying', 'ye']), ('中断', ['zhong', 'duan']),
+    ('清理', ['qing', 'li']), ('残骸', ['can', 'hai']), ('费用', ['fei', 'yong']),
+    ('临时', ['lin', 'shi']), ('移动', ['yi', 'dong']), ('玻璃', ['bo', 'li']),
+    ('破碎', ['po', 'sui']), ('水管', ['shui', 'guan']), ('爆裂', ['bao', 'lie']),
+    ('自动', ['zi', 'dong']), ('恢复', ['hui', 'fu']), ('保险', ['bao', 'xian']),
+    ('金额', ['jin', 'e']), ('专业', ['zhuan', 'ye']), ('顾问', ['gu', 'wen']),
+    ('公共', ['gong', 'gong']), ('当局', ['dang', 'ju']), ('罢工', ['ba', 'gong']),
+    ('暴乱', ['bao', 'luan']), ('露天', ['lu', 'tian']), ('存放', ['cun', 'fang']),
+    ('运输', ['yun', 'shu']), ('途中', ['tu', 'zhong']), ('电子', ['dian', 'zi']),
+    ('数据', ['shu', 'ju']), ('重置', ['chong', 'zhi']), ('价值', ['jia', 'zhi'])
+]
+
+# 条款正文句式
+BODY_SENTENCES = [
+    "本保险扩展承保被保险人因{a}造成的直接物质损失。",
+    "在保险期间内，由于{a}导致保险标的发生{b}，保险人按照本保险合同的约定负责赔偿。",
+    "对于因{a}引起的{b}，每次事故免赔额为人民币{n}元或损失金额的{p}%，以高者为准。",
+    "本扩展条款项下的累计赔偿限额为人民币{n}万元，且不超过保险单明细表中列明的保险金额。",
+    "被保险人应当采取合理的预防措施，防止{a}造成{b}，否则保险人有权拒绝赔偿。",
+    "本条款与主险条款相抵触之处，以本条款为准；本条款未尽事宜，以主险条款为准。",
+    "发生{a}后，被保险人应在{d}小时内通知保险人，并提供损失清单及相关证明材料。",
+    "保险人对因{a}而产生的合理的、必要的{b}费用，在赔偿限额内负责赔偿。"
+]
+
+INSURANCE_TYPES = ['财产险', '工程险', '责任险', '货运险', '机损险']
+COMPANIES = ['平安保险', '太平洋保险', '人保财险', '国寿财险', '大地保险', '阳光保险']
+YEARS = ['2020', '2021', '2022', '2023', '2024']
+
+def _title(rng):
+    """生成条款标题、拼音首字母和全拼"""
+    words = rng.sample(TITLE_WORDS, rng.randint(2, 3))
+    title = ''.join(word for word, _ in words) + '扩展条款'
+    syllables = [s for _, word_syllables in words for s in word_syllables]
+    pinyin = ''.join(s[0] for s in syllables).upper() + 'KZTK'
+    quanpin = ' '.join(''.join(word_syllables) for _, word_syllables in words).upper() + ' KUOZHAN TIAOKUAN'
+    return title, pinyin, quanpin
+
+def _body(rng, sentences=6):
+    """生成条款正文"""
+    parts = []
+    for _ in range(sentences):
+        a, b = rng.sample(TITLE_WORDS, 2)
+        parts.append(rng.choice(BODY_SENTENCES).format(
+            a=a[0], b=b[0] + '损失', n=rng.randint(1, 500) * 100, p=rng.randint(5, 20), d=rng.choice([24, 48, 72])
+        ))
+    return ''.join(parts)
+
+def make_clauses(count, seed=0):
+    """生成 count 条条款，列与条款导入文件一致"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        title, pinyin, quanpin = _title(rng)
+        rows.append({
+            'UUID': f"SYN{i:07d}",
+            '扩展条款标题': f"{title}（{i}）",
+            '扩展条款正文': _body(rng, rng.randint(3, 10)),
+            'PINYIN': pinyin,
+            'QUANPIN': quanpin,
+            '险种': rng.choice(INSURANCE_TYPES),
+            '保险公司': rng.choice(COMPANIES),
+            '年度版本': rng.choice(YEARS)
+        })
+    return pd.DataFrame(rows)
+
+def add_versions(db, clause_uuids, versions_per_clause=3, seed=0):
+    """为条款批量添加历史版本（直接写库，避免逐条调用 update_clause 拖慢准备阶段）"""
+    rng = random.Random(seed)
+    base_time = datetime(2023, 1, 1)
+    for start in range(0, len(clause_uuids), 500):
+        batch = clause_uuids[start:start + 500]
+        clauses = db.session.query(db.Clause).filter(db.Clause.uuid.in_(batch)).all()
+        for clause in clauses:
+            for number in range(2, versions_per_clause + 1):
+                content = _body(rng, rng.randint(3, 10))
+                db.session.add(db.ClauseVersion(
+                    clause_uuid=clause.uuid,
+                    version_number=number,
+                    title=clause.title,
+                    content=content,
+                    note=f"第{number}次修订",
+                    created_at=base_time + timedelta(days=30 * number, minutes=rng.randint(0, 1440))
+                ))
+                clause.content = content
+                clause.version_number = number
+        db.session.commit()
+
+def add_policies(db, clause_uuids, policy_count, clauses_per_policy, seed=0):
+    """创建多个保险方案并为每个方案随机选择条款，返回方案ID列表"""
+    rng = random.Random(seed)
+    policy_ids = []
+    for i in range(policy_count):
+        policy = db.create_policy(f"方案{i + 1}", "基准测试方案")
+        selection = rng.sample(clause_uuids, min(clauses_per_policy, len(clause_uuids)))
+        db.save_policy_clauses(policy.id, selection)
+        policy_ids.append(policy.id)
+    return policy_ids
+
+def make_insurance_data():
+    """生成方案文档所需的投保信息"""
+    return {
+        'policyholder': '某某制造有限公司',
+        'insured': {
+            'name': '某某制造有限公司',
+            'id_type': '统一社会信用代码',
+            'id_number': '91310000000000000X',
+            'contact': {
+                'name': '张三',
+                'phone': '021-00000000',
+                'email': 'zhangsan@example.com',
+                'address': '上海市浦东新区某某路1号',
+                'postal_code': '200000'
+            }
+        },
+        'property': {'name': '生产厂房及仓库', 'address': '上海市浦东新区某某路1号'},
+        'material_loss': [
+            {'标的类别': '建筑物', '保险金额（元）': 50000000, '费率（%）': 0.05, '保费（元）': 25000},
+            {'标的类别': '机器设备', '保险金额（元）': 30000000, '费率（%）': 0.06, '保费（元）': 18000}
+        ],
+        'liability': [
+            {'限额名称': '每次事故赔偿限额', '责任限额（元）': 5000000, '保费（元）': 8000}
+        ],
+        'deductibles': [
+            {'免赔项目': '火灾、爆炸', '免赔额 / 免赔约定': '无免赔'},
+            {'免赔项目': '其他损失', '免赔额 / 免赔约定': '每次事故人民币5000元或损失金额的10%，以高者为准'}
+        ],
+        'special_terms': ['本保险单项下建筑物按重置价值承保。', '被保险人应每年进行一次消防检查。']
+    }
@@ -0,0 +1,218 @@
+import os
+import sys
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import create_engine, text, bindparam
+from .perf import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# 缓存中的条款记录（按版本不可变）
+CachedClause = namedtuple('CachedClause', [
+    'title', 'content', 'pinyin', 'quanpin', 'insurance_type', 'company', 'version'
+])
+
+# 找不到条款时返回的空记录
+MISSING_CLAUSE = CachedClause(None, None, None, None, None, None, None)
+
+# 默认缓存上限（MB），可通过环境变量 POLICYMAKER_CLAUSE_CACHE_MB 调整
+DEFAULT_CACHE_MB = 64
+
+# 每条缓存记录除文本外的固定开销估算（字节）
+ENTRY_OVERHEAD = 200
+
+_LOAD_VERSIONS_SQL = text("""
+    SELECT v.version_number, v.title, v.content, c.pinyin, c.quanpin, c.insurance_type, c.company, c.version
+    FROM clause_versions v JOIN clauses c ON c.uuid = v.clause_uuid
+    WHERE v.clause_uuid = :uuid AND v.version_number IN :version_numbers
+""").bindparams(bindparam('version_numbers', expanding=True))
+
+_LOAD_CLAUSE_SQL = text("""
+    SELECT title, content, pinyin, quanpin, insurance_type, company, version
+    FROM clauses WHERE uuid = :uuid
+""")
+
+def _entry_size(clause):
+    """估算一条缓存记录占用的内存"""
+    return ENTRY_OVERHEAD + sum(sys.getsizeof(field) for field in clause if field is not None)
+
+class ClauseCache:
+    """进程级条款文本缓存
+
+    以 (数据库路径, 条款UUID, 版本号) 为键保存不可变的版本文本，所有会话共享。
+    按总字节数限制容量，超出时淘汰最久未使用的记录，并统计命中、未命中和淘汰次数。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._engines = {}
+        self._libraries = {}
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(db_path, clause_uuid, version_number):
+        """缓存键，数据库路径统一为绝对路径"""
+        return (os.path.abspath(db_path), clause_uuid, int(version_number))
+
+    def _engine_for(self, db_path):
+        """每个数据库共用一个只读查询引擎"""
+        path = os.path.abspath(db_path)
+        with self._lock:
+            engine = self._engines.get(path)
+            if engine is None:
+                engine = create_engine(f'sqlite:///{path}')
+                instrument_engine(engine)
+                self._engines[path] = engine
+            return engine
+
+    def set_library(self, db_path, library_path):
+        """登记项目使用的共享条款库：项目中找不到的条款从条款库读取，条款库变化时一并清除项目的缓存"""
+        with self._lock:
+            self._libraries[os.path.abspath(db_path)] = os.path.abspath(library_path)
+
+    def _store(self, key, clause):
+        """写入一条记录并按容量淘汰，调用方需持有锁"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        size = _entry_size(clause)
+        self._entries[key] = (clause, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def _load(self, db_path, clause_uuid, version_numbers):
+        """从数据库批量读取同一条款的多个版本，项目中没有的版本再从共享条款库读取"""
+        loaded = self._load_from(db_path, clause_uuid, version_numbers)
+        with self._lock:
+            library_path = self._libraries.get(os.path.abspath(db_path))
+        missing = [version_number for version_number in version_numbers if version_number not in loaded]
+        if missing and library_path:
+            loaded.update(self._load_from(library_path, clause_uuid, missing))
+        return loaded
+
+    def _load_from(self, db_path, clause_uuid, version_numbers):
+        """从一个数据库批量读取同一条款的多个版本"""
+        loaded = {}
+        with self._engine_for(db_path).connect() as conn:
+            for row in conn.execute(_LOAD_VERSIONS_SQL, {
+                'uuid': clause_uuid, 'version_numbers': list(version_numbers)
+            }):
+                loaded[row[0]] = CachedClause(*row[1:])
+            if not loaded:
+                # 旧数据库中可能还没有版本记录，使用条款本身的内容
+                row = conn.execute(_LOAD_CLAUSE_SQL, {'uuid': clause_uuid}).first()
+                if row is not None:
+                    loaded = {version_number: CachedClause(*row) for version_number in version_numbers}
+        return loaded
+
+    def put(self, db_path, clause_uuid, version_number, clause):
+        """写入缓存"""
+        with self._lock:
+            self._store(self._key(db_path, clause_uuid, version_number), clause)
+
+    def get_many(self, db_path, clause_uuid, version_numbers):
+        """获取同一条款的多个版本，未命中的版本用一次查询补齐；返回 {版本号: CachedClause}"""
+        result = {}
+        missing = []
+        with self._lock:
+            for version_number in version_numbers:
+                key = self._key(db_path, clause_uuid, version_number)
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(int(version_number))
+                    continue
+                self._entries.move_to_end(key)
+                result[int(version_number)] = entry[0]
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load(db_path, clause_uuid, missing)
+            with self._lock:
+                for version_number, clause in loaded.items():
+                    self._store(self._key(db_path, clause_uuid, version_number), clause)
+            result.update(loaded)
+            for version_number in missing:
+                if version_number not in result:
+                    logger.warning("条款 %s V%s 不存在", clause_uuid, version_number)
+                    result[version_number] = MISSING_CLAUSE
+        return result
+
+    def get(self, db_path, clause_uuid, version_number):
+        """获取指定版本的条款，找不到时返回 MISSING_CLAUSE"""
+        return self.get_many(db_path, clause_uuid, [version_number])[int(version_number)]
+
+    def invalidate(self, db_path, clause_uuids=None):
+        """清除缓存：指定 clause_uuids 时只清除这些条款，否则清除整个数据库（清空或替换数据库后调用）"""
+        path = os.path.abspath(db_path)
+        engine = None
+        with self._lock:
+            # 共享条款库变化时，使用它的项目中缓存的条款也要清除
+            paths = {path} | {project for project, library in self._libraries.items() if library == path}
+            if clause_uuids is None:
+                stale = [key for key in self._entries if key[0] in paths]
+                engine = self._engines.pop(path, None)
+            else:
+                clause_uuids = set(clause_uuids)
+                stale = [key for key in self._entries if key[0] in paths and key[1] in clause_uuids]
+            for key in stale:
+                self.current_bytes -= self._entries.pop(key)[1]
+        if engine is not None:
+            engine.dispose()
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+def _max_bytes_from_env():
+    """读取缓存容量配置"""
+    try:
+        return int(float(os.environ.get('POLICYMAKER_CLAUSE_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_CACHE_MB * 1024 * 1024
+
+# 进程级共享实例
+_cache = ClauseCache(_max_bytes_from_env())
+
+def put(db_path, clause_uuid, version_number, clause):
+    """写入缓存，clause 为 CachedClause"""
+    _cache.put(db_path, clause_uuid, version_number, clause)
+
+def get(db_path, clause_uuid, version_number):
+    """获取指定版本的条款"""
+    return _cache.get(db_path, clause_uuid, version_number)
+
+def get_many(db_path, clause_uuid, version_numbers):
+    """获取同一条款的多个版本"""
+    return _cache.get_many(db_path, clause_uuid, version_numbers)
+
+def set_library(db_path, library_path):
+    """登记项目使用的共享条款库"""
+    _cache.set_library(db_path, library_path)
+
+def invalidate(db_path, clause_uuids=None):
+    """清除缓存"""
+    _cache.invalidate(db_path, clause_uuids)
+
+def stats():
+    """缓存统计信息"""
+    return _cache.stats()
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import pandas as pd
+from .database import REQUIRED_IMPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 每批读取并写入数据库的行数
+DEFAULT_CHUNK_SIZE = 500
+
+def file_fingerprint(file, block_size=1024 * 1024):
+    """计算上传文件的内容哈希（SHA-256），用作断点续传的标识"""
+    file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(block_size), b''):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+def chunk_digest(chunk):
+    """计算数据块中导入列内容的哈希，用于识别已导入的数据块"""
+    content = chunk[REQUIRED_IMPORT_COLUMNS].to_csv(index=False, header=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def _file_size(file):
+    """获取文件大小，不改变当前读取位置"""
+    position = file.tell()
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+def iter_csv_chunks(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """分块读取CSV文件，逐块返回 (DataFrame, 进度)"""
+    total_size = _file_size(file)
+    # 所有列按文本读取，避免各块类型推断不一致（如 UUID "001" 被读成 1）
+    reader = pd.read_csv(file, dtype=str, chunksize=chunk_size)
+    for chunk in reader:
+        fraction = min(file.tell() / total_size, 1.0) if total_size else None
+        yield chunk, fraction
+
+def _xlsx_cell_text(value):
+    """将Excel单元格的值转换为文本"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def iter_xlsx_chunks(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """使用 openpyxl 只读模式逐行读取XLSX文件，逐块返回 (DataFrame, 进度)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else '' for c in header]
+        total_rows = (sheet.max_row - 1) if sheet.max_row else None
+
+        buffer = []
+        rows_read = 0
+        for row in rows:
+            # 跳过空行
+            if all(v is None for v in row):
+                continue
+            values = [_xlsx_cell_text(v) for v in row[:len(columns)]]
+            values += [None] * (len(columns) - len(values))
+            buffer.append(values)
+            if len(buffer) >= chunk_size:
+                rows_read += len(buffer)
+                fraction = min(rows_read / total_rows, 1.0) if total_rows else None
+                yield pd.DataFrame(buffer, columns=columns), fraction
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns), 1.0
+    finally:
+        workbook.close()
+
+def iter_clause_chunks(file, file_name, chunk_size=DEFAULT_CHUNK_SIZE):
+    """根据文件类型分块读取条款文件"""
+    if file_name.endswith('.csv'):
+        return iter_csv_chunks(file, chunk_size)
+    return iter_xlsx_chunks(file, chunk_size)
+
+class ClauseImporter:
+    """流式条款导入：分块读取、逐块校验、分批写入，并记录断点以便续传"""
+
+    def __init__(self, db, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        # 最近一次导入中因内容已导入过而跳过的行数
+        self.skipped_rows = 0
+
+    def _validate_chunk(self, chunk, seen_uuids, first_row):
+        """校验单个数据块，UUID 的空值和重复检查跨块累计进行"""
+        if not all(col in chunk.columns for col in REQUIRED_IMPORT_COLUMNS):
+            raise ValueError("导入的数据缺少必要的列")
+
+        uuids = chunk['UUID']
+        null_mask = uuids.isnull()
+        if null_mask.any():
+            row_number = first_row + int(null_mask.to_numpy().argmax()) + 1
+            raise ValueError(f"存在空的UUID（第 {row_number} 行）")
+
+        dup_mask = uuids.duplicated() | uuids.isin(seen_uuids)
+        if dup_mask.any():
+            position = int(dup_mask.to_numpy().argmax())
+            raise ValueError(f"存在重复的UUID：{uuids.iloc[position]}（第 {first_row + position + 1} 行）")
+
+        seen_uuids.update(uuids)
+
+    def run(self, file, file_name, progress_callback=None, force=False):
+        """执行导入，返回 (新增数量, 更新数量)
+
+        progress_callback(已处理行数, 进度比例) 在每块处理完成后调用，进度比例未知时为 None。
+        同一文件中断后再次导入时，会跳过断点之前已写入的行；内容与之前导入过的数据块
+        相同、且之后条款库没有变化的数据块也会跳过，force=True 时全部重新写入。
+        """
+        file_hash = file_fingerprint(file)
+        self.skipped_rows = 0
+        checkpoint = self.db.get_import_checkpoint(file_hash)
+        if checkpoint and not checkpoint.completed:
+            rows_done = checkpoint.rows_done
+            new_count = checkpoint.new_count
+            update_count = checkpoint.update_count
+            logger.info("从断点继续导入 %s，已完成 %d 行", file_name, rows_done)
+        else:
+            rows_done = 0
+            new_count = 0
+            update_count = 0
+
+        seen_uuids = set()
+        chunk_hashes = []
+        rows_read = 0
+        for chunk, fraction in iter_clause_chunks(file, file_name, self.chunk_size):
+            self._validate_chunk(chunk, seen_uuids, rows_read)
+            chunk_end = rows_read + len(chunk)
+
+            # 断点之前的数据块只参与校验，不重复写入
+            if chunk_end > rows_done:
+                pending = chunk.iloc[max(0, rows_done - rows_read):]
+                digest = chunk_digest(pending)
+                chunk_hashes.append(digest)
+                if not force and self.db.is_chunk_imported(digest):
+                    self.skipped_rows += len(pending)
+                else:
+                    batch_new, batch_update = self.db.import_clause_batch(pending)
+                    new_count += batch_new
+                    update_count += batch_update
+                    self.db.record_chunk(digest, len(pending))
+                rows_done = chunk_end
+                self.db.save_import_checkpoint(file_hash, file_name, rows_done, new_count, update_count)
+            else:
+                # 中断前已写入的数据块，完成时同样更新其修订号
+                chunk_hashes.append(chunk_digest(chunk))
+
+            rows_read = chunk_end
+            if progress_callback:
+                progress_callback(rows_read, fraction)
+
+        self.db.save_import_checkpoint(file_hash, file_name, rows_read, new_count, update_count, completed=True)
+        self.db.stamp_imported_chunks(chunk_hashes)
+        self.db.refresh_clause_signatures()
+        self.db.record_upload(
+            'clauses', file_hash, _file_size(file), file_name,
+            summary=f"{rows_read} 行，新增 {new_count} 条，更新 {update_count} 条"
+        )
+        return new_count, update_count
@@ -1,7 +1,15 @@
 import streamlit as st
+import os
 import pandas as pd
-import numpy as np
 from .database import Database
+from .clause_importer import file_fingerprint
+from .clause_snapshot import load_catalog, catalog_revision_key
+from .fragments import rerun_fragment
+from .facet_index import load_facet_index
+from .similarity import load_similarity_index
+from .selected_clauses import make_selected_clause, order_by_policy
+from .perf import timed, span
+from .job_manager import submit_job, run_import_job, run_export_job, render_job_status, job_dir
 from .version_manager import render_version_tags
 import io
 import difflib
@@ -10,18 +18,43 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# 条款列表和已选条款区域的片段键，已选条款变化时两者一起重跑
+CLAUSE_LIST_FRAGMENT = 'clause_list'
+SELECTED_PANE_FRAGMENT = 'selected_pane'
+
 def export_clauses(clauses, format):
     """导出选中的条款"""
     db = Database()
     clause_uuids = [clause['UUID'] for clause in clauses]
     return db.export_selected_clauses(clause_uuids, format)
 
+def handle_upload(db, uploaded_file, kind, process):
+    """处理上传文件：同一次上传在本会话中只处理一次，项目中处理过的相同内容需确认后才重新处理
+
+    process(文件哈希, force) 执行实际处理。页面重跑时只查会话中的记录，不再读取文件。
+    """
+    handled = st.session_state.setdefault('processed_uploads', {}).setdefault(db.db_path, {})
+    entry = handled.get(uploaded_file.file_id)
+    if entry is None:
+        file_hash = file_fingerprint(uploaded_file)
+        record = db.get_upload_record(kind, file_hash, uploaded_file.size)
+        previous = f"{record.created_at:%Y-%m-%d %H:%M} 处理过（{record.summary or record.file_name}）" if record else None
+        # 先记录再处理，处理中途重跑或失败都不会自动重复处理
+        entry = handled[uploaded_file.file_id] = {'hash': file_hash, 'previous': previous}
+        if previous is None:
+            process(file_hash, False)
+            return
+    
+    if entry['previous']:
+        st.info(f"ℹ️ 相同内容的文件已于 {entry['previous']}，未重复导入")
+        if st.button("🔁 重新导入", key=f"reprocess_upload_{kind}"):
+            entry['previous'] = None
+            process(entry['hash'], True)
+
 def handle_version_select(db, clause_uuid, version_number, clause, content=None, version_note=None):
     """处理版本选择"""
-    logger.info(f"\n=== 处理版本选择 ===")
-    logger.info(f"条款UUID: {clause_uuid}")
-    logger.info(f"目标版本号: {version_number}")
-    logger.info(f"当前版本号: {clause.get('版本号', 1)}")
+    logger.info("处理版本选择：条款UUID %s，目标版本号 %s，当前版本号 %s",
+                clause_uuid, version_number, clause.get('版本号', 1))
     
     try:
         if version_number is None and content is not None:
@@ -36,15 +69,11 @@ def handle_version_select(db, clause_uuid, version_number, clause, content=None,
                     st.session_state.version_info = {}
                 st.session_state.version_info[clause_uuid] = version_number
                 
-                # 更新 selected_clauses
+                # 更新 selected_clauses，标题和正文随版本号从缓存中读取
                 for clause in st.session_state.selected_clauses:
                     if clause['UUID'] == clause_uuid:
-                        version = db.get_clause_version_by_clause_uuid(clause_uuid)
-                        if version:
-                            clause['版本号'] = version_number
-                            clause['扩展条款标题'] = version.title
-                            clause['扩展条款正文'] = version.content
-                            break
+                        clause['版本号'] = version_number
+                        break
                 
                 # 保存到数据库
                 if 'current_policy_id' in st.session_state:
@@ -56,7 +85,7 @@ def handle_version_select(db, clause_uuid, version_number, clause, content=None,
                 return True
             return False
     except Exception as e:
-        logger.error(f"版本切换失败: {str(e)}")
+        logger.error("版本切换失败: %s", e)
         return False
 
 def handle_version_delete(db, clause_uuid, version_number):
@@ -99,10 +128,31 @@ def handle_version_rollback(db, clause_uuid, version_number):
     else:
         st.error("版本回滚失败")
 
+def get_clause_versions_cached(db, clause_uuid):
+    """读取条款的所有版本，条款库修订号不变时复用本会话中缓存的结果
+
+    版本面板作为片段单独重跑时不必每次都查询数据库。
+    """
+    revision = catalog_revision_key(db)
+    cache = st.session_state.get('clause_versions_cache')
+    if not cache or cache['db_path'] != db.db_path or cache['revision'] != revision:
+        cache = {'db_path': db.db_path, 'revision': revision, 'versions': {}}
+    versions = cache['versions'].get(clause_uuid)
+    if versions is None:
+        versions = db.get_clause_versions(clause_uuid)
+        # 首次读取时可能补建初始版本，修订号随之变化
+        revision_after = catalog_revision_key(db)
+        if revision_after != revision:
+            cache = {'db_path': db.db_path, 'revision': revision_after, 'versions': {}}
+        cache['versions'][clause_uuid] = versions
+    st.session_state.clause_versions_cache = cache
+    return versions
+
+@st.fragment
+@timed('ui.render_clause_content')
 def render_clause_content(clause, db):
-    """渲染条款内容编辑器"""
-    logger.debug(f"\n=== 开始渲染条款内容 ===")
-    logger.debug(f"条款UUID: {clause['UUID']}")
+    """渲染条款内容编辑器（单独的片段，编辑、预览版本时只重跑当前条款的面板）"""
+    logger.debug("开始渲染条款内容：%s", clause['UUID'])
     
     # 确保 version_info 存在
     if 'version_info' not in st.session_state:
@@ -114,12 +164,10 @@ def render_clause_content(clause, db):
         clause.get('版本号', 1)
     )
     
-    logger.debug(f"当前版本号: {current_version}")
-    
     with st.expander(f"{clause['扩展条款标题']}", expanded=False):
         try:
             # 获取所有版本
-            versions = db.get_clause_versions(clause['UUID'])
+            versions = get_clause_versions_cached(db, clause['UUID'])
             
             def handle_version_select_wrapper(version_number, content=None, version_note=None):
                 """处理版本选择的包装函数"""
@@ -147,13 +195,14 @@ def render_clause_content(clause, db):
                     st.rerun()
             
         except Exception as e:
-            logger.error(f"渲染条款内容时出错: {str(e)}")
+            logger.error("渲染条款内容时出错: %s", e)
             st.error(f"渲染条款内容时出错: {str(e)}")
-    
-    logger.debug("=== 条款内容渲染结束 ===\n")
 
-def render_selected_clauses(clauses, db, page_size=25):
-    """分页渲染已选条款"""
+@st.fragment
+@timed('ui.render_selected_clauses')
+def render_selected_clauses(db, page_size=25):
+    """分页渲染已选条款（单独的片段，翻页时只重跑分页列表）"""
+    clauses = st.session_state.selected_clauses
     # 使用markdown渲染标题以应用样式
     st.markdown("## 已选条款")
     
@@ -219,9 +268,219 @@ def render_selected_clauses(clauses, db, page_size=25):
         clause = clauses[i]
         render_clause_content(clause, db)
 
+def rerun_after_selection(had_selection, from_editor=False):
+    """已选条款变化后重跑，只能在控件回调中调用
+
+    已选条款在空和非空之间变化时，生成方案页也要随之更新，需要整页重跑；
+    否则只重跑条款列表和已选条款两个片段。不是在数据表格中勾选时，
+    换一个表格键丢弃表格中残留的勾选，表格按新的已选条款重新显示。
+    """
+    if not from_editor:
+        st.session_state.clause_editor_round = st.session_state.get('clause_editor_round', 0) + 1
+    if had_selection != bool(st.session_state.selected_clauses):
+        st.rerun()
+    st.rerun([CLAUSE_LIST_FRAGMENT, SELECTED_PANE_FRAGMENT])
+
+def reload_selection_order(db):
+    """按数据库中方案的条款顺序重新排列已选条款并重新编号"""
+    selected = order_by_policy(db, st.session_state.current_policy_id, st.session_state.selected_clauses)
+    for idx, clause in enumerate(selected, 1):
+        clause['序号'] = idx
+    st.session_state.selected_clauses = selected
+
+def render_clause_order(db):
+    """调整已选条款在方案中的顺序：移动单个条款或按险种、条款名称整体排序"""
+    if st.session_state.get('current_policy_id') is None:
+        return
+    policy_id = st.session_state.current_policy_id
+    selected = st.session_state.selected_clauses
+    
+    with st.expander("↕️ 调整条款顺序", expanded=False):
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            moving = st.selectbox(
+                "选择条款",
+                range(len(selected)),
+                format_func=lambda i: f"{selected[i]['序号']}. {selected[i]['扩展条款标题']}",
+                key="order_clause"
+            )
+        with col2:
+            position = st.number_input("移动到第几位", min_value=1, max_value=len(selected), value=1, key="order_position")
+        with col3:
+            if st.button("移动", key="order_move"):
+                # 先保存尚未写入方案的勾选，再只改写被移动条款的排序键
+                db.save_policy_clauses(policy_id, [clause['UUID'] for clause in selected])
+                if db.move_policy_clause(policy_id, selected[moving]['UUID'], int(position) - 1):
+                    reload_selection_order(db)
+                    rerun_fragment()
+                else:
+                    st.error("移动条款失败")
+        
+        if st.button("🔤 按险种、条款名称排序", key="order_sort"):
+            db.save_policy_clauses(policy_id, [clause['UUID'] for clause in selected])
+            db.sort_policy_clauses(policy_id, ('险种', '扩展条款标题'))
+            reload_selection_order(db)
+            rerun_fragment()
+
+def apply_selection_diff(db, added_rows, removed_uuids):
+    """把一次操作中新增和取消的条款一起应用到已选条款，并在一个事务中写入当前方案
+
+    added_rows 为条款库中的行，已选中的条款会被跳过；移除后只重新编号一次。
+    """
+    removed = set(removed_uuids)
+    selected = st.session_state.selected_clauses
+    removed_uuids = [clause['UUID'] for clause in selected if clause['UUID'] in removed]
+    if removed_uuids:
+        selected = [clause for clause in selected if clause['UUID'] not in removed]
+        for idx, clause in enumerate(selected, 1):
+            clause['序号'] = idx
+    
+    present = {clause['UUID'] for clause in selected}
+    added_uuids = []
+    for row in added_rows:
+        if row['UUID'] not in present:
+            present.add(row['UUID'])
+            selected.append(make_selected_clause(db.db_path, row, len(selected) + 1))
+            added_uuids.append(row['UUID'])
+    st.session_state.selected_clauses = selected
+    
+    if 'current_policy_id' in st.session_state and (added_uuids or removed_uuids):
+        db.apply_policy_selection_diff(st.session_state.current_policy_id, added_uuids, removed_uuids)
+    return added_uuids, removed_uuids
+
+def add_recommended_clause(db, catalog, position):
+    """把推荐的条款加入已选条款（按钮回调）"""
+    had_selection = bool(st.session_state.selected_clauses)
+    apply_selection_diff(db, [catalog.iloc[position]], [])
+    rerun_after_selection(had_selection)
+
+def render_recommendation_rows(db, catalog, index, recommendations, label, kind):
+    """渲染推荐条款列表，每条带有添加按钮"""
+    # 跳过已不在条款库中的条款（条款库在两次读取之间变化时也按UUID核对）
+    rows = [
+        (uuid, score) for uuid, score in recommendations
+        if uuid in index.position and index.position[uuid] < len(catalog)
+        and catalog['UUID'].iat[index.position[uuid]] == uuid
+    ]
+    if not rows:
+        st.caption("暂无推荐")
+        return
+    for uuid, score in rows:
+        position = index.position[uuid]
+        row = catalog.iloc[position]
+        text_col, button_col = st.columns([5, 1])
+        with text_col:
+            st.markdown(f"**{row['扩展条款标题']}**  \n{row['险种']} · {row['保险公司']} · {label(score)}")
+        with button_col:
+            st.button(
+                "➕", key=f"recommend_{kind}_{uuid}", help="加入已选条款",
+                on_click=add_recommended_clause, args=(db, catalog, position)
+            )
+
+@timed('ui.render_recommendations')
+def render_recommendations(db, limit=8):
+    """根据已选条款推荐内容相似的条款和在其他方案中经常一起选择的条款"""
+    selected = st.session_state.selected_clauses
+    with st.expander("🔗 相关条款推荐"):
+        # 相似度索引与当前条款库快照按行对应
+        index = load_similarity_index(db)
+        catalog = load_catalog(db)
+        titles = {clause['UUID']: clause['扩展条款标题'] for clause in selected}
+        similar_tab, together_tab = st.tabs(["内容相似", "经常一起选择"])
+        
+        with similar_tab:
+            target = st.selectbox(
+                "参照条款",
+                [None] + list(titles),
+                format_func=lambda uuid: "全部已选条款" if uuid is None else titles[uuid],
+                key="recommend_target"
+            )
+            with span('ui.recommendations.similar'):
+                similar = index.similar([target] if target else list(titles), k=limit + len(titles))
+            similar = [(uuid, score) for uuid, score in similar if uuid not in titles][:limit]
+            render_recommendation_rows(
+                db, catalog, index, similar, lambda score: f"相似度 {score:.0%}", 'similar'
+            )
+        
+        with together_tab:
+            with span('ui.recommendations.co_selected'):
+                together = db.get_co_selected_clauses(list(titles), limit=limit)
+            render_recommendation_rows(
+                db, catalog, index, together, lambda policies: f"{policies} 个方案中一起选择", 'together'
+            )
+
+def render_duplicate_cluster(db, cluster):
+    """渲染一组近似重复条款，可选择其中一条作为标准条款"""
+    uuids = [clause['UUID'] for clause in cluster]
+    canonical = next((clause['标准条款'] for clause in cluster if clause['标准条款'] in uuids), None)
+    st.dataframe(
+        pd.DataFrame(cluster).assign(标准条款=lambda df: df['UUID'].map(
+            lambda clause_uuid: '⭐' if clause_uuid == canonical else ''
+        )),
+        hide_index=True,
+        use_container_width=True
+    )
+    titles = {clause['UUID']: f"{clause['扩展条款标题']}（{clause['保险公司']} {clause['年度版本']}）" for clause in cluster}
+    choice_col, link_col, clear_col = st.columns([3, 1, 1])
+    with choice_col:
+        choice = st.selectbox(
+            "标准条款",
+            uuids,
+            index=uuids.index(canonical) if canonical else 0,
+            format_func=titles.get,
+            key=f"canonical_{uuids[0]}"
+        )
+    with link_col:
+        if st.button("🔗 关联", key=f"link_canonical_{uuids[0]}", help="其余条款关联到所选的标准条款"):
+            db.set_canonical_clause(choice, uuids)
+            for clause in cluster:
+                clause['标准条款'] = None if clause['UUID'] == choice else choice
+            st.rerun()
+    with clear_col:
+        if st.button("✂️ 解除", key=f"clear_canonical_{uuids[0]}", disabled=canonical is None):
+            db.clear_canonical_clause(uuids)
+            for clause in cluster:
+                clause['标准条款'] = None
+            st.rerun()
+
+@timed('ui.render_duplicate_clusters')
+def render_duplicate_clusters(db, page_size=10):
+    """查找并浏览正文近似重复的条款"""
+    with st.expander("🧬 近似重复条款"):
+        threshold = st.slider(
+            "相似度阈值", min_value=0.5, max_value=1.0, value=0.8, step=0.05,
+            help="正文字符三元组的 Jaccard 相似度估计值达到该值的条款视为近似重复",
+            key="duplicate_threshold"
+        )
+        if st.button("🔍 查找近似重复条款"):
+            with st.spinner("正在查找..."):
+                st.session_state.duplicate_clusters = {
+                    'db_path': db.db_path,
+                    'clusters': db.find_duplicate_clusters(threshold)
+                }
+        
+        result = st.session_state.get('duplicate_clusters')
+        if not result or result['db_path'] != db.db_path:
+            return
+        clusters = result['clusters']
+        if not clusters:
+            st.success("✅ 没有发现近似重复的条款")
+            return
+        
+        total_pages = max(1, (len(clusters) + page_size - 1) // page_size)
+        page_cols = st.columns([1, 4])
+        with page_cols[0]:
+            page = st.number_input("页码", min_value=1, max_value=total_pages, value=1, key="duplicate_page")
+        with page_cols[1]:
+            st.write(f"共 {len(clusters)} 组、{sum(len(cluster) for cluster in clusters)} 条近似重复条款")
+        for number, cluster in enumerate(clusters[(page - 1) * page_size:page * page_size], (page - 1) * page_size + 1):
+            st.markdown(f"**第 {number} 组（{len(cluster)} 条）**")
+            render_duplicate_cluster(db, cluster)
+
+@timed('ui.render_clause_manager')
 def render_clause_manager():
     """渲染条款管理界面"""
-    logger.debug("\n=== 开始渲染条款管理界面 ===")
+    logger.debug("开始渲染条款管理界面")
     
     # 初始化 session state
     if 'selected_clauses' not in st.session_state:
@@ -252,11 +511,30 @@ def render_clause_manager():
             
             db_col1, db_col2, db_col3 = st.columns(3)
             with db_col1:
-                if st.button("🗑️ 清空数据库", help="清空所有条款数据，请谨慎操作"):
+                clear_help = "清空所有条款数据，请谨慎操作"
+                if db.library is not None:
+                    clear_help = "清空项目中的条款、方案和本地修改，请谨慎操作；共享条款库中的条款所有项目共用，不会被清空"
+                if st.button("🗑️ 清空数据库", help=clear_help):
                     db.clear_database()
                     st.session_state.selected_clauses = []
-                    st.success("🎉 数据库已清空")
+                    if db.library is not None:
+                        st.session_state.database_cleared = f"🎉 项目数据库已清空，共享条款库（{db.library.db_path}）中的条款仍然保留"
+                    else:
+                        st.session_state.database_cleared = "🎉 数据库已清空"
                     st.rerun()
+                if 'database_cleared' in st.session_state:
+                    st.success(st.session_state.pop('database_cleared'))
+                if st.button("🩺 检查版本一致性", help="检查并修复条款当前版本和最新版本号的记录"):
+                    drift = db.check_version_pointers(repair=True)
+                    if drift['current_version_id'] or drift['max_version_number']:
+                        st.warning(
+                            f"⚠️ 已修复 {drift['current_version_id']} 个当前版本记录、"
+                            f"{drift['max_version_number']} 个最新版本号"
+                        )
+                    else:
+                        st.success("✅ 版本记录一致")
+                    if drift['duplicate_versions']:
+                        st.error(f"❌ 有 {drift['duplicate_versions']} 组重复的版本号，需要手动处理")
             
             with db_col2:
                 exported_db = db.export_database()
@@ -268,34 +546,69 @@ def render_clause_manager():
                         mime="application/octet-stream",
                         help="将当前条款库导出为数据库文件"
                     )
+                if st.button("📦 后台导出条款库", help="在后台将条款库导出为Excel文件"):
+                    export_dir = job_dir(db.db_path)
+                    os.makedirs(export_dir, exist_ok=True)
+                    submit_job(
+                        db.db_path,
+                        'export',
+                        run_export_job,
+                        output_path=os.path.join(export_dir, f"clauses_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx")
+                    )
             
             with db_col3:
                 uploaded_db = st.file_uploader("📤 导入数据库", type=['db'], help="导入已有的条款库数据库文件")
                 if uploaded_db:
-                    db.import_database(uploaded_db.read())
-                    st.success("🎉 数据库导入成功")
-                    st.rerun()
+                    def import_uploaded_db(file_hash, force):
+                        if not db.import_database(uploaded_db.getvalue()):
+                            st.error("❌ 数据库导入失败")
+                            return
+                        db.record_upload('database', file_hash, uploaded_db.size, uploaded_db.name)
+                        st.success("🎉 数据库导入成功")
+                        st.rerun()
+                    
+                    handle_upload(db, uploaded_db, 'database', import_uploaded_db)
             
             st.markdown('</div>', unsafe_allow_html=True)
             
+            # 近似重复条款
+            render_duplicate_clusters(db)
+            
             # 文件上传区域
             st.markdown("### 📥 条款导入")
+            if db.library is not None:
+                st.caption(f"📚 当前项目使用共享条款库（{db.library.db_path}），导入的条款所有项目共用")
             uploaded_file = st.file_uploader(
                 "选择文件",
                 type=['csv', 'xlsx'],
                 help="支持 CSV 或 Excel 格式的条款库文件"
             )
             if uploaded_file is not None:
+                def submit_import(file_hash, force):
+                    upload_dir = os.path.join(job_dir(db.db_path), 'uploads')
+                    os.makedirs(upload_dir, exist_ok=True)
+                    file_path = os.path.join(upload_dir, file_hash + os.path.splitext(uploaded_file.name)[1])
+                    with open(file_path, 'wb') as f:
+                        f.write(uploaded_file.getbuffer())
+                    submit_job(
+                        db.db_path,
+                        'import',
+                        run_import_job,
+                        dedupe_key=file_hash,
+                        file_path=file_path,
+                        file_name=uploaded_file.name,
+                        force=force
+                    )
+                    st.info("📨 已提交后台导入任务，可继续操作页面")
+                
+                # 每个上传文件只提交一次后台导入任务，页面重跑不会重复导入
                 try:
-                    if uploaded_file.name.endswith('.csv'):
-                        df = pd.read_csv(uploaded_file)
-                    else:
-                        df = pd.read_excel(uploaded_file)
-                    db.import_clauses(df)
-                    st.success("🎉 条款库导入成功！")
+                    handle_upload(db, uploaded_file, 'clauses', submit_import)
                 except Exception as e:
                     st.error(f"❌ 文件导入错误：{str(e)}")
             
+            render_job_status(db.db_path, 'clause_manager')
+            
             # 筛选条件部分
             st.markdown("## 🔍 筛选条件")
             render_clause_list(db)
@@ -303,155 +616,155 @@ def render_clause_manager():
     # 右侧已选条款区域
     with col2:
         with right_container:
-            st.markdown(f"## 📋 已选条款 (共{len(st.session_state.selected_clauses)}个)")
-            if st.session_state.selected_clauses:
-                # 导出选项
-                export_format = st.selectbox(
-                    "📤 导出格式",
-                    ["XLSX", "DOCX", "Markdown"],
-                    key="export_format",
-                    help="选择导出文件的格式"
+            render_selected_pane(db)
+
+@st.fragment(key=SELECTED_PANE_FRAGMENT)
+@timed('ui.render_selected_pane')
+def render_selected_pane(db):
+    """渲染已选条款区域：导出、推荐和分页列表（单独的片段，只在已选条款变化时随条款列表重跑）"""
+    st.markdown(f"## 📋 已选条款 (共{len(st.session_state.selected_clauses)}个)")
+    if st.session_state.selected_clauses:
+        # 导出选项
+        export_format = st.selectbox(
+            "📤 导出格式",
+            ["XLSX", "DOCX", "Markdown"],
+            key="export_format",
+            help="选择导出文件的格式"
+        )
+        
+        if st.button("📥 导出选中条款"):
+            export_data = export_clauses(
+                st.session_state.selected_clauses,
+                export_format.lower()
+            )
+            
+            if export_format == "XLSX":
+                # 导出结果是临时文件，download_button 需要读出内容
+                st.download_button(
+                    "⬇️ 下载Excel文件",
+                    export_data.read(),
+                    file_name="selected_clauses.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-                
-                if st.button("📥 导出选中条款"):
-                    export_data = export_clauses(
-                        st.session_state.selected_clauses,
-                        export_format.lower()
-                    )
-                    
-                    if export_format == "XLSX":
-                        st.download_button(
-                            "⬇️ 下载Excel文件",
-                            export_data,
-                            file_name="selected_clauses.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    elif export_format == "DOCX":
-                        st.download_button(
-                            "⬇️ 下载Word文件",
-                            export_data,
-                            file_name="selected_clauses.docx",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-                    elif export_format == "Markdown":
-                        st.download_button(
-                            "⬇️ 下载Markdown文件",
-                            export_data,
-                            file_name="selected_clauses.md",
-                            mime="text/markdown"
-                        )
-                
-                # 使用独立容器渲染已选条款列表
-                with st.container():
-                    render_selected_clauses(st.session_state.selected_clauses, db)
-            else:
-                st.info("🤔 还未选择任何条款，快去左侧挑选几个吧~")
+            elif export_format == "DOCX":
+                st.download_button(
+                    "⬇️ 下载Word文件",
+                    export_data,
+                    file_name="selected_clauses.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
+            elif export_format == "Markdown":
+                st.download_button(
+                    "⬇️ 下载Markdown文件",
+                    export_data,
+                    file_name="selected_clauses.md",
+                    mime="text/markdown"
+                )
+        
+        # 相关条款推荐
+        render_recommendations(db)
+        
+        # 调整条款在方案中的顺序
+        render_clause_order(db)
+        
+        # 已选条款分页列表，翻页时只重跑该片段
+        render_selected_clauses(db)
+    else:
+        st.info("🤔 还未选择任何条款，快去左侧挑选几个吧~")
+
+def select_rows(db, added_rows, removed_uuids, from_editor=False):
+    """把条款列表中的勾选变更应用到已选条款（控件回调），有变化时重跑"""
+    had_selection = bool(st.session_state.selected_clauses)
+    added_uuids, removed_uuids = apply_selection_diff(db, added_rows, removed_uuids)
+    if added_uuids or removed_uuids:
+        rerun_after_selection(had_selection, from_editor)
+
+def select_all_rows(db, rows):
+    """全选当前筛选结果（按钮回调）"""
+    select_rows(db, [row for _, row in rows.iterrows()], [])
 
+def apply_editor_selection(db, display_df, editor_key):
+    """把数据表格中本页的勾选变更作为一次变更应用（表格回调）"""
+    edited_rows = st.session_state[editor_key]['edited_rows']
+    selected_uuids = {c['UUID'] for c in st.session_state.selected_clauses}
+    added_rows, removed_uuids = [], []
+    for i, row in display_df.iterrows():
+        is_selected = edited_rows.get(i, {}).get('选择', row['UUID'] in selected_uuids)
+        if is_selected and row['UUID'] not in selected_uuids:
+            added_rows.append(row)
+        elif not is_selected and row['UUID'] in selected_uuids:
+            removed_uuids.append(row['UUID'])
+    select_rows(db, added_rows, removed_uuids, from_editor=True)
+
+@st.fragment(key=CLAUSE_LIST_FRAGMENT)
+@timed('ui.render_clause_list')
 def render_clause_list(db):
-    """渲染条款列表和筛选功能"""
-    # 获取所有条款
-    clauses_df = db.export_clauses('dataframe')
+    """渲染条款列表和筛选功能（单独的片段，筛选、翻页时只重跑条款列表）"""
+    # 获取所有条款（优先读取条款库快照）及其分面索引
+    facet_index = load_facet_index(db)
+    clauses_df = facet_index.df
     if not clauses_df.empty:
+        # 先用上一次的选择计算匹配结果和各选项的计数，再渲染筛选框
+        selections = {col: st.session_state.get(f"filter_{col}", []) for col in facet_index.columns}
+        with span('ui.clause_list.facets'):
+            search_bitmap, ranked = facet_index.search(st.session_state.get('clause_search', ''))
+            positions, facet_counts = facet_index.filter(selections, search_bitmap, ranked)
+        
         # 创建筛选条件
         st.markdown("## 筛选条件")
         filter_cols = st.columns(3)
         
-        # 动态生成筛选框
-        filters = {}
-        exclude_columns = ['UUID', 'PINYIN', 'QUANPIN', '扩展条正文', '序号', '版本号']
-        filter_columns = [col for col in clauses_df.columns if col not in exclude_columns]
-        
-        for i, col in enumerate(filter_columns):
+        for i, col in enumerate(facet_index.columns):
             with filter_cols[i % 3]:
-                unique_values = sorted(clauses_df[col].unique())
-                filters[col] = st.multiselect(
+                counts = dict(zip(facet_index.options(col), facet_counts[col]))
+                st.multiselect(
                     f"选择{col}",
-                    options=unique_values,
+                    options=facet_index.options(col),
+                    format_func=lambda value, counts=counts: f"{value}（{counts.get(value, 0)}）",
                     key=f"filter_{col}"
                 )
         
         # 搜索框
-        search_term = st.text_input(
+        st.text_input(
             "搜索条",
             placeholder="输入条款名称、拼音或关键词",
-            help="支持条款名称、拼音首字母和全拼搜索"
+            help="支持条款名称、拼音首字母和全拼搜索，容许少量错字，结果按相似度排序",
+            key="clause_search"
         )
         
-        # 应用筛选条件
-        filtered_df = clauses_df.copy()
-        
-        # 应用搜索条件
-        if search_term:
-            search_term = search_term.lower()
-            mask = (
-                filtered_df['扩展条款标题'].str.contains(search_term, na=False, case=False) |
-                filtered_df['PINYIN'].str.contains(search_term, na=False, case=False) |
-                filtered_df['QUANPIN'].str.contains(search_term, na=False, case=False)
-            )
-            filtered_df = filtered_df[mask]
-        
-        # 应用筛选条件
-        for col, selected_values in filters.items():
-            if selected_values:
-                filtered_df = filtered_df[filtered_df[col].isin(selected_values)]
-        
-        if not filtered_df.empty:
+        if len(positions):
             # 分页设置
             ITEMS_PER_PAGE = 20
-            total_pages = max(1, (len(filtered_df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
+            total_pages = max(1, (len(positions) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
             
             page_cols = st.columns([1, 4])
             with page_cols[0]:
                 current_page = st.number_input("页码", min_value=1, max_value=total_pages, value=1)
             
             start_idx = (current_page - 1) * ITEMS_PER_PAGE
-            end_idx = min(start_idx + ITEMS_PER_PAGE, len(filtered_df))
+            end_idx = min(start_idx + ITEMS_PER_PAGE, len(positions))
             
             # 显示分页信息
-            st.write(f"显示第 {start_idx + 1} 到 {end_idx} 条，共 {len(filtered_df)} 条")
+            st.write(f"显示第 {start_idx + 1} 到 {end_idx} 条，共 {len(positions)} 条")
             
             # 准备当前页的数据
-            display_df = filtered_df.iloc[start_idx:end_idx].copy()
+            display_df = clauses_df.iloc[positions[start_idx:end_idx]].copy()
             display_df = display_df.reset_index(drop=True)
             
-            # 全选功能
+            # 全选功能，当前筛选结果的所有条款作为一次变更加入或移除
             col1, col2 = st.columns(2)
             
             with col1:
-                if st.button("全选当前筛选结果", key="select_all"):
-                    # 获取当前筛选结果的所有条款
-                    for _, row in filtered_df.iterrows():
-                        # 检查是否已经选择
-                        if not any(c['UUID'] == row['UUID'] for c in st.session_state.selected_clauses):
-                            # 准备新的条款数据
-                            new_clause = {
-                                'UUID': row['UUID'],
-                                '序号': len(st.session_state.selected_clauses) + 1,
-                                '扩展条款标题': row['扩展条款标题'],
-                                '扩展条款正文': row['扩展条款正文'],
-                                'PINYIN': row['PINYIN'],
-                                'QUANPIN': row['QUANPIN'],
-                                '险种': row['险种'],
-                                '保险公司': row['保险公司'],
-                                '年度版本': row['年度版本'],
-                                '版本号': row['版本号']
-                            }
-                            st.session_state.selected_clauses.append(new_clause)
-                    st.rerun()
+                st.button(
+                    "全选当前筛选结果", key="select_all",
+                    on_click=select_all_rows, args=(db, clauses_df.iloc[positions])
+                )
             
             with col2:
-                if st.button("❌ 取消全选当前结果", key="cancel_all"):
-                    # 获取当前筛选结果的UUID列表
-                    current_uuids = set(filtered_df['UUID'].tolist())
-                    # 保留不在当前筛选结果中的条款
-                    st.session_state.selected_clauses = [
-                        clause for clause in st.session_state.selected_clauses 
-                        if clause['UUID'] not in current_uuids
-                    ]
-                    # 重新编号
-                    for idx, clause in enumerate(st.session_state.selected_clauses, 1):
-                        clause['序号'] = idx
-                    st.rerun()
+                st.button(
+                    "❌ 取消全选当前结果", key="cancel_all",
+                    on_click=select_rows, args=(db, [], clauses_df['UUID'].iloc[positions].tolist())
+                )
             
             # 显示数据表格
             edited_df = pd.DataFrame({
@@ -468,78 +781,50 @@ def render_clause_list(db):
                 if row['UUID'] in selected_uuids:
                     edited_df.at[i, '选择'] = True
             
-            # 显示数据表格
-            edited_result = st.data_editor(
-                edited_df,
-                hide_index=True,
-                use_container_width=True,
-                key=f"data_editor_{current_page}",
-                column_config={
-                    "选择": st.column_config.CheckboxColumn(
-                        "选择",
-                        help="选择条款",
-                        default=False,
-                        width="small"
-                    ),
-                    "序号": st.column_config.TextColumn(
-                        "序号",
-                        help="条款序号",
-                        disabled=True,
-                        width="small"
-                    ),
-                    "条款名称": st.column_config.TextColumn(
-                        "条款名称",
-                        help="条款标题",
-                        disabled=True,
-                        width="medium"
-                    ),
-                    "条款正文": st.column_config.TextColumn(
-                        "条款正文预览",
-                        help="条款内容预览",
-                        disabled=True,
-                        width="large"
-                    ),
-                    "版本": st.column_config.TextColumn(
-                        "版本号",
-                        help="条款版本",
-                        disabled=True,
-                        width="small"
-                    )
-                }
-            )
-            
-            # 处理选择变更
-            for i, (is_selected, row) in enumerate(zip(edited_result['选择'], display_df.iterrows())):
-                uuid = row[1]['UUID']
-                current_selected = uuid in selected_uuids
-                
-                if is_selected != current_selected:
-                    if is_selected:
-                        # 添加新选择的条款
-                        new_clause = {
-                            'UUID': uuid,
-                            '序号': len(st.session_state.selected_clauses) + 1,
-                            '扩展条款标题': row[1]['扩展条款标题'],
-                            '扩展条款正文': row[1]['扩展条款正文'],
-                            'PINYIN': row[1]['PINYIN'],
-                            'QUANPIN': row[1]['QUANPIN'],
-                            '险种': row[1]['险种'],
-                            '保险公司': row[1]['保险公司'],
-                            '年度版本': row[1]['年度版本'],
-                            '版本号': row[1]['版本号']
-                        }
-                        st.session_state.selected_clauses.append(new_clause)
-                        st.rerun()
-                    else:
-                        # 移除取消选择的条款
-                        st.session_state.selected_clauses = [
-                            c for c in st.session_state.selected_clauses 
-                            if c['UUID'] != uuid
-                        ]
-                        # 重新编号
-                        for idx, clause in enumerate(st.session_state.selected_clauses, 1):
-                            clause['序号'] = idx
-                        st.rerun()
+            # 显示数据表格，本页所有勾选变更在回调中一次性应用
+            editor_key = f"data_editor_{current_page}_{st.session_state.get('clause_editor_round', 0)}"
+            with span('ui.clause_list.data_editor'):
+                st.data_editor(
+                    edited_df,
+                    hide_index=True,
+                    use_container_width=True,
+                    key=editor_key,
+                    on_change=apply_editor_selection,
+                    args=(db, display_df, editor_key),
+                    column_config={
+                        "选择": st.column_config.CheckboxColumn(
+                            "选择",
+                            help="选择条款",
+                            default=False,
+                            width="small"
+                        ),
+                        "序号": st.column_config.TextColumn(
+                            "序号",
+                            help="条款序号",
+                            disabled=True,
+                            width="small"
+                        ),
+                        "条款名称": st.column_config.TextColumn(
+                            "条款名称",
+                            help="条款标题",
+                            disabled=True,
+                            width="medium"
+                        ),
+                        "条款正文": st.column_config.TextColumn(
+                            "条款正文预览",
+                            help="条款内容预览",
+                            disabled=True,
+                            width="large"
+                        ),
+                        "版本": st.column_config.TextColumn(
+                            "版本号",
+                            help="条款版本",
+                            disabled=True,
+                            width="small"
+                        )
+                    }
+                )
+
         else:
             st.info("没找到匹配的条款")
     else:
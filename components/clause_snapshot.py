@@ -0,0 +1,142 @@
+import os
+import logging
+import tempfile
+import threading
+from .perf import timed
+
+logger = logging.getLogger(__name__)
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow 随 streamlit 安装，缺失时退回数据库查询
+    pa = None
+
+def _arrow_string_dtype():
+    """由 Arrow 数组直接支撑的字符串类型（缺失值为 NaN，与 pandas 3 默认的 str 相同），旧版 pandas 不支持时返回 None"""
+    try:
+        return pd.StringDtype('pyarrow', na_value=float('nan'))
+    except (TypeError, ImportError):
+        return None
+
+# 快照中的字符串列转换为 Arrow 字符串类型，直接引用内存映射中的数据，不逐个复制成 Python 对象
+ARROW_STRING_DTYPE = _arrow_string_dtype() if pa is not None else None
+
+# 快照元数据中保存条款库标识和修订号的键
+SNAPSHOT_CATALOG_KEY = b'policymaker.catalog_id'
+SNAPSHOT_REVISION_KEY = b'policymaker.revision'
+
+# 进程内已加载的快照：快照路径 -> ((条款库标识, 修订号), DataFrame)
+_loaded_snapshots = {}
+_loaded_lock = threading.Lock()
+
+def snapshot_path(db_path):
+    """条款库快照文件路径，与数据库文件放在同一目录"""
+    return os.path.splitext(os.path.abspath(db_path))[0] + '.snapshot.arrow'
+
+def _read_snapshot(path, revision_key):
+    """以内存映射方式读取快照，修订号不匹配时返回 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            metadata = reader.schema.metadata or {}
+            stored_key = (
+                metadata.get(SNAPSHOT_CATALOG_KEY, b'').decode('utf-8'),
+                int(metadata.get(SNAPSHOT_REVISION_KEY, b'-1'))
+            )
+            if stored_key != revision_key:
+                return None
+            return _to_pandas(reader.read_all())
+    except (OSError, ValueError, pa.ArrowException) as e:
+        logger.warning("读取条款库快照失败，将重新生成：%s", e)
+        return None
+
+def _to_pandas(table):
+    """Arrow 表转换为 DataFrame，字符串列不复制"""
+    if ARROW_STRING_DTYPE is None:
+        return table.to_pandas()
+    string_types = {pa.string(): ARROW_STRING_DTYPE, pa.large_string(): ARROW_STRING_DTYPE}
+    return table.to_pandas(types_mapper=string_types.get)
+
+def _write_snapshot(path, df, revision_key):
+    """写入快照，先写临时文件再原子替换，避免并发读取到半个文件"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SNAPSHOT_CATALOG_KEY: revision_key[0].encode('utf-8'),
+        SNAPSHOT_REVISION_KEY: str(revision_key[1]).encode('utf-8')
+    })
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def catalog_revision_key(db):
+    """当前条款库的修订号，使用共享条款库的项目同时包含条款库的修订号"""
+    if getattr(db, 'library', None) is not None:
+        return (db.get_catalog_revision(), db.library.get_catalog_revision())
+    return db.get_catalog_revision()
+
+@timed('catalog.load_catalog')
+def load_catalog(db):
+    """加载当前条款库（与 export_clauses('dataframe') 结果相同）
+
+    优先使用进程内缓存，其次使用与数据库修订号一致的磁盘快照，都不可用时从数据库重建快照。
+    返回的 DataFrame 在多个会话间共享，调用方不得原地修改。
+    """
+    if getattr(db, 'library', None) is not None:
+        return _load_merged_catalog(db)
+    if pa is None:
+        return db.export_clauses('dataframe')
+
+    revision_key = db.get_catalog_revision()
+    path = snapshot_path(db.db_path)
+
+    with _loaded_lock:
+        cached = _loaded_snapshots.get(path)
+    if cached and cached[0] == revision_key:
+        return cached[1]
+
+    df = _read_snapshot(path, revision_key)
+    if df is None:
+        df = db.export_clauses('dataframe')
+        try:
+            _write_snapshot(path, df, revision_key)
+        except Exception as e:
+            logger.warning("写入条款库快照失败：%s", e)
+        else:
+            # 改用刚写入的快照，与之后从磁盘加载的结果一致，重建时的 Python 字符串对象随之释放
+            snapshot = _read_snapshot(path, revision_key)
+            if snapshot is not None:
+                df = snapshot
+
+    with _loaded_lock:
+        _loaded_snapshots[path] = (revision_key, df)
+    return df
+
+def _load_merged_catalog(db):
+    """使用共享条款库的项目：条款库快照由所有项目共用，只合并项目中的本地修改"""
+    from .database import merge_catalog
+
+    library_df = load_catalog(db.library)
+    revision_key = catalog_revision_key(db)
+    path = snapshot_path(db.db_path)
+
+    with _loaded_lock:
+        cached = _loaded_snapshots.get(path)
+    if cached and cached[0] == revision_key:
+        return cached[1]
+
+    df = merge_catalog(library_df, db.export_local_clauses(db.get_local_overrides()))
+    with _loaded_lock:
+        _loaded_snapshots[path] = (revision_key, df)
+    return df
@@ -1,14 +1,22 @@
 import os
+import re
+import threading
 from datetime import datetime
 import sqlite3
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, LargeBinary, Index, func, text, insert, select, literal, update, bindparam
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 import io
+import tempfile
 import streamlit as st
 import uuid
 import logging
+from collections import defaultdict, namedtuple
+from . import clause_cache
+from .order_keys import key_between, keys_between, assign_order_keys
+from .near_duplicates import DUPLICATE_THRESHOLD, content_digest, minhash_signatures, signatures_from_bytes, find_clusters
+from .perf import timed, instrument_engine
 
 # 添加 logger
 logger = logging.getLogger(__name__)
@@ -44,12 +52,19 @@ class Clause(Base):
     company = Column(String(100))
     version = Column(String(20))
     version_number = Column(Integer, default=1)
+    # 当前版本（version_number 对应的版本记录）和最新版本号，由触发器维护
+    current_version_id = Column(Integer, ForeignKey('clause_versions.id', use_alter=True, name='fk_clauses_current_version'))
+    max_version_number = Column(Integer)
+    # 近似重复条款关联到的标准条款UUID，本身是标准条款或未关联时为空
+    canonical_uuid = Column(String(50))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关联的版本历史
-    versions = relationship("ClauseVersion", back_populates="clause")
+    versions = relationship("ClauseVersion", back_populates="clause", foreign_keys="ClauseVersion.clause_uuid")
+    # 当前版本，只读
+    current_version = relationship("ClauseVersion", foreign_keys=[current_version_id], viewonly=True)
 
 class ClauseVersion(Base):
     """条款版本历史"""
@@ -63,8 +78,13 @@ class ClauseVersion(Base):
     note = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index('ix_clause_versions_clause_uuid_version_number', 'clause_uuid', 'version_number'),
+        Index('ix_clause_versions_clause_uuid_created_at', 'clause_uuid', 'created_at', 'version_number'),
+    )
+    
     # 关联的条款
-    clause = relationship("Clause", back_populates="versions")
+    clause = relationship("Clause", back_populates="versions", foreign_keys=[clause_uuid])
     # 关联的保险方案版本
     policy_versions = relationship("PolicyClauseVersion", back_populates="clause_version")
 
@@ -73,18 +93,375 @@ class PolicyClauseVersion(Base):
     __tablename__ = 'policy_clause_versions'
 
     id = Column(Integer, primary_key=True)
-    policy_id = Column(Integer, ForeignKey('insurance_policies.id'), nullable=False)
-    clause_version_id = Column(Integer, ForeignKey('clause_versions.id'), nullable=False)
+    policy_id = Column(Integer, ForeignKey('insurance_policies.id'), nullable=False, index=True)
+    clause_version_id = Column(Integer, ForeignKey('clause_versions.id'), nullable=False, index=True)
+    # 条款在方案中的顺序（分数排序键，见 order_keys），按字符串比较
+    order_key = Column(String(100))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index('ix_policy_clause_versions_policy_id_order_key', 'policy_id', 'order_key'),
+    )
+    
     # 关联的保险方案
     policy = relationship("InsurancePolicy", back_populates="clause_versions")
     # 关联的条款版本
     clause_version = relationship("ClauseVersion", back_populates="policy_versions")
 
+class ImportCheckpoint(Base):
+    """条款导入断点记录"""
+    __tablename__ = 'import_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    file_hash = Column(String(64), unique=True, nullable=False)
+    file_name = Column(String(255))
+    rows_done = Column(Integer, default=0)
+    new_count = Column(Integer, default=0)
+    update_count = Column(Integer, default=0)
+    completed = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BackgroundJob(Base):
+    """后台任务记录"""
+    __tablename__ = 'background_jobs'
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(50), unique=True, nullable=False)
+    kind = Column(String(20), nullable=False)
+    dedupe_key = Column(String(100))
+    status = Column(String(20), default='queued')
+    progress = Column(Float, default=0.0)
+    message = Column(Text)
+    result_path = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UploadRecord(Base):
+    """已处理的上传文件，按内容哈希和大小识别，相同内容再次上传时不重复处理"""
+    __tablename__ = 'upload_ledger'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)
+    content_hash = Column(String(64), nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+    file_name = Column(String(255))
+    summary = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ImportedChunk(Base):
+    """已写入的导入数据块摘要，条款库自写入后没有变化时，内容相同的数据块再次导入会跳过"""
+    __tablename__ = 'imported_chunks'
+
+    id = Column(Integer, primary_key=True)
+    chunk_hash = Column(String(64), unique=True, nullable=False)
+    rows = Column(Integer, default=0)
+    # 数据块写入（或所在的导入完成）时的条款库修订号
+    catalog_revision = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ClauseSignature(Base):
+    """条款正文的 MinHash 签名，用于查找近似重复条款"""
+    __tablename__ = 'clause_signatures'
+
+    clause_uuid = Column(String(50), primary_key=True)
+    content_hash = Column(String(16), nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ProjectSetting(Base):
+    """项目设置（如共享条款库路径）"""
+    __tablename__ = 'project_settings'
+
+    key = Column(String(50), primary_key=True)
+    value = Column(Text)
+
+class CatalogRevision(Base):
+    """条款库修订号，由触发器在条款或版本变化时递增"""
+    __tablename__ = 'catalog_revision'
+
+    id = Column(Integer, primary_key=True)
+    catalog_id = Column(String(50), nullable=False)
+    revision = Column(Integer, nullable=False, default=0)
+
+# 条款或版本表发生变化时递增修订号的触发器
+CATALOG_REVISION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bump_revision_{table}_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE catalog_revision SET revision = revision + 1 WHERE id = 1;
+    END
+    """
+    for table in ('clauses', 'clause_versions')
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+# 维护 clauses.current_version_id 和 clauses.max_version_number 的触发器。
+# 所有写入路径（ORM、批量 SQL、复制共享条款）都经过这些触发器，应用代码不需要手动同步
+VERSION_POINTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS version_pointer_version_insert
+    AFTER INSERT ON clause_versions
+    BEGIN
+        UPDATE clauses SET
+            max_version_number = MAX(COALESCE(max_version_number, 0), NEW.version_number),
+            current_version_id = CASE WHEN version_number = NEW.version_number THEN NEW.id ELSE current_version_id END
+        WHERE uuid = NEW.clause_uuid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS version_pointer_version_delete
+    AFTER DELETE ON clause_versions
+    BEGIN
+        UPDATE clauses SET
+            max_version_number = (
+                SELECT MAX(version_number) FROM clause_versions WHERE clause_uuid = OLD.clause_uuid
+            ),
+            current_version_id = (
+                SELECT id FROM clause_versions
+                WHERE clause_uuid = OLD.clause_uuid AND version_number = clauses.version_number
+                ORDER BY id DESC LIMIT 1
+            )
+        WHERE uuid = OLD.clause_uuid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS version_pointer_clause_insert
+    AFTER INSERT ON clauses
+    BEGIN
+        UPDATE clauses SET
+            max_version_number = (
+                SELECT MAX(version_number) FROM clause_versions WHERE clause_uuid = NEW.uuid
+            ),
+            current_version_id = (
+                SELECT id FROM clause_versions
+                WHERE clause_uuid = NEW.uuid AND version_number = NEW.version_number
+                ORDER BY id DESC LIMIT 1
+            )
+        WHERE id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS version_pointer_clause_update
+    AFTER UPDATE OF version_number ON clauses
+    BEGIN
+        UPDATE clauses SET current_version_id = (
+            SELECT id FROM clause_versions
+            WHERE clause_uuid = NEW.uuid AND version_number = NEW.version_number
+            ORDER BY id DESC LIMIT 1
+        )
+        WHERE id = NEW.id;
+    END
+    """
+]
+
+# 旧版本数据库需要补充的列：(表, 列, 类型)
+SCHEMA_COLUMNS = [
+    ('clauses', 'current_version_id', 'INTEGER REFERENCES clause_versions(id)'),
+    ('clauses', 'max_version_number', 'INTEGER'),
+    ('clauses', 'canonical_uuid', 'VARCHAR(50)'),
+    ('policy_clause_versions', 'order_key', 'VARCHAR(100)'),
+    ('imported_chunks', 'catalog_revision', 'INTEGER')
+]
+
+# 版本指针的一致性检查：(名称, 统计偏差的 SQL)
+VERSION_POINTER_CHECKS = [
+    ('current_version_id', """
+        SELECT COUNT(*) FROM clauses c
+        WHERE c.current_version_id IS NOT (
+            SELECT id FROM clause_versions
+            WHERE clause_uuid = c.uuid AND version_number = c.version_number
+            ORDER BY id DESC LIMIT 1
+        )
+    """),
+    ('max_version_number', """
+        SELECT COUNT(*) FROM clauses c
+        WHERE c.max_version_number IS NOT (
+            SELECT MAX(version_number) FROM clause_versions WHERE clause_uuid = c.uuid
+        )
+    """),
+    ('duplicate_versions', """
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM clause_versions GROUP BY clause_uuid, version_number HAVING COUNT(*) > 1
+        )
+    """)
+]
+
+# 按版本记录重新计算全部版本指针
+REPAIR_VERSION_POINTERS_SQL = """
+    UPDATE clauses SET
+        max_version_number = (
+            SELECT MAX(version_number) FROM clause_versions WHERE clause_uuid = clauses.uuid
+        ),
+        current_version_id = (
+            SELECT id FROM clause_versions
+            WHERE clause_uuid = clauses.uuid AND version_number = clauses.version_number
+            ORDER BY id DESC LIMIT 1
+        )
+"""
+
+# 按时间点解析条款版本：每个条款取创建时间不晚于 as_of 的最大版本号，
+# SQLite 中与 MAX() 同时选出的 id 取自该行。(clause_uuid, created_at, version_number) 索引覆盖整个查询
+AS_OF_VERSIONS_SQL = """
+    SELECT clause_uuid, MAX(version_number) AS version_number, id
+    FROM clause_versions
+    WHERE created_at <= :as_of {condition}
+    GROUP BY clause_uuid
+"""
+
+# 只解析某个方案已绑定的条款
+AS_OF_POLICY_CONDITION = """
+    AND clause_uuid IN (
+        SELECT cv.clause_uuid FROM policy_clause_versions pcv
+        JOIN clause_versions cv ON cv.id = pcv.clause_version_id
+        WHERE pcv.policy_id = :policy_id
+    )
+"""
+
+# 与给定条款同时出现在保险方案中的其他条款，按共同出现的方案数排序
+CO_SELECTED_SQL = text("""
+    SELECT other.clause_uuid, COUNT(DISTINCT theirs.policy_id) AS policies
+    FROM policy_clause_versions mine
+    JOIN clause_versions chosen ON chosen.id = mine.clause_version_id
+    JOIN policy_clause_versions theirs ON theirs.policy_id = mine.policy_id
+    JOIN clause_versions other ON other.id = theirs.clause_version_id
+    WHERE chosen.clause_uuid IN :uuids AND other.clause_uuid NOT IN :uuids
+    GROUP BY other.clause_uuid
+    ORDER BY policies DESC, other.clause_uuid
+    LIMIT :limit
+""").bindparams(bindparam('uuids', expanding=True))
+
+# 给定条款较多、需要分批查询时：先找出包含这些条款的方案，再按方案分批统计其中的条款
+CO_SELECTED_POLICIES_SQL = text("""
+    SELECT DISTINCT mine.policy_id
+    FROM policy_clause_versions mine
+    JOIN clause_versions chosen ON chosen.id = mine.clause_version_id
+    WHERE chosen.clause_uuid IN :uuids
+""").bindparams(bindparam('uuids', expanding=True))
+
+CO_SELECTED_COUNTS_SQL = text("""
+    SELECT other.clause_uuid, COUNT(DISTINCT theirs.policy_id) AS policies
+    FROM policy_clause_versions theirs
+    JOIN clause_versions other ON other.id = theirs.clause_version_id
+    WHERE theirs.policy_id IN :policy_ids
+    GROUP BY other.clause_uuid
+""").bindparams(bindparam('policy_ids', expanding=True))
+
+# 近似重复条款簇中各条款的展示信息（标题取最新版本）
+DUPLICATE_DETAILS_SQL = text("""
+    SELECT c.uuid, COALESCE(v.title, c.title), c.insurance_type, c.company, c.version, c.canonical_uuid
+    FROM clauses c
+    LEFT JOIN clause_versions v ON v.clause_uuid = c.uuid AND v.version_number = c.max_version_number
+    WHERE c.uuid IN :uuids
+""").bindparams(bindparam('uuids', expanding=True))
+
+# 条款版本的只读视图，标题和正文来自进程级条款缓存，多个会话共享同一份文本
+ClauseVersionView = namedtuple('ClauseVersionView', [
+    'id', 'clause_uuid', 'version_number', 'title', 'content', 'note', 'created_at'
+])
+
+# 已有数据库中 create_all 不会补建的索引
+SCHEMA_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_policy_clause_versions_policy_id ON policy_clause_versions (policy_id)",
+    "CREATE INDEX IF NOT EXISTS ix_policy_clause_versions_clause_version_id ON policy_clause_versions (clause_version_id)",
+    "CREATE INDEX IF NOT EXISTS ix_policy_clause_versions_policy_id_order_key ON policy_clause_versions (policy_id, order_key)",
+    "CREATE INDEX IF NOT EXISTS ix_clause_versions_clause_uuid_version_number ON clause_versions (clause_uuid, version_number)",
+    "CREATE INDEX IF NOT EXISTS ix_clause_versions_clause_uuid_created_at ON clause_versions (clause_uuid, created_at, version_number)"
+]
+
+# 项目设置中记录共享条款库路径的键
+LIBRARY_PATH_SETTING = 'library_path'
+
+# 条款行中需要从共享条款库复制到项目数据库的字段
+CLAUSE_COPY_FIELDS = (
+    'uuid', 'title', 'content', 'pinyin', 'quanpin', 'insurance_type', 'company', 'version',
+    'version_number', 'is_active', 'created_at', 'updated_at'
+)
+
+# 单次 IN 查询的最大参数数量
+IN_QUERY_BATCH = 500
+
+# 方案条款可用的排序字段 -> 列（条款名称取方案绑定的版本）
+POLICY_SORT_FIELDS = {
+    '险种': Clause.insurance_type,
+    '保险公司': Clause.company,
+    '年度版本': Clause.version,
+    '扩展条款标题': ClauseVersion.title
+}
+
+def merge_catalog(library_df, local_df):
+    """合并共享条款库和项目本地条款：本地行替换条款库中相同UUID的行，序号重新编排"""
+    if local_df.empty:
+        return library_df
+    if library_df.empty:
+        return local_df
+    merged = pd.concat([library_df[~library_df['UUID'].isin(local_df['UUID'])], local_df], ignore_index=True)
+    merged['序号'] = range(1, len(merged) + 1)
+    return merged
+
+# 条款库导出的列
+CATALOG_COLUMNS = ['UUID', '序号', '扩展条款标题', '扩展条款正文', 'PINYIN', 'QUANPIN', '险种', '保险公司', '年度版本', '版本号']
+
+# 流式导出时每批从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+# 导出文件超过此大小后从内存转存到磁盘上的临时文件
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+# 有效条款及其最新版本的内容（与 CATALOG_COLUMNS 对应，不含序号），
+# 通过 max_version_number 和 (clause_uuid, version_number) 索引连接
+CATALOG_ROWS_SQL = """
+    SELECT c.uuid, COALESCE(v.title, c.title), COALESCE(v.content, c.content),
+           c.pinyin, c.quanpin, c.insurance_type, c.company, c.version,
+           COALESCE(v.version_number, c.version_number)
+    FROM clauses c
+    LEFT JOIN clause_versions v ON v.clause_uuid = c.uuid AND v.version_number = c.max_version_number
+    WHERE c.is_active = 1
+    ORDER BY c.id
+"""
+
+def write_xlsx(columns, rows):
+    """以 openpyxl 只写模式逐行写入Excel，返回指向开头的临时文件（较小时保留在内存中）"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+# 保险方案列表中的一项
+PolicySummary = namedtuple('PolicySummary', ['id', 'name', 'description', 'clause_count'])
+
+# 后台任务中尚未结束的状态
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+# 本进程中已补齐结构的数据库文件：(绝对路径, 设备号, inode)
+_prepared_schemas = set()
+_schema_lock = threading.Lock()
+
+def _schema_key(db_path):
+    """数据库文件的标识，文件不存在时为 None；文件被删除重建后 inode 变化，需要重新补齐结构"""
+    path = os.path.abspath(db_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_dev, stat.st_ino)
+
+def _schema_object_name(statement):
+    """CREATE ... IF NOT EXISTS 语句创建的触发器或索引名称"""
+    return re.search(r'IF NOT EXISTS\s+(\w+)', statement).group(1)
+
+# 导入文件必须包含的列
+REQUIRED_IMPORT_COLUMNS = ['UUID', '扩展条款标题', '扩展条款正文', 'PINYIN', 'QUANPIN', '险种', '保险公司', '年度版本']
+
 class Database:
-    def __init__(self, db_path=None):
-        """初始化数据库连接"""
+    def __init__(self, db_path=None, library_path=None):
+        """初始化数据库连接，library_path 为新项目指定共享条款库（之后从项目设置中读取）"""
         # 如果没有提供数据库路径，使用session state中的路径
         if db_path is None and 'db_path' in st.session_state:
             db_path = st.session_state.db_path
@@ -113,9 +490,10 @@ class Database:
             
             self.db_path = db_path
             self.engine = create_engine(f'sqlite:///{db_path}')
-            Base.metadata.create_all(self.engine)
+            instrument_engine(self.engine)
             Session = sessionmaker(bind=self.engine)
             self.session = Session()
+            self._prepare_schema()
             
             # 导出类型供外部使用
             self.Clause = Clause
@@ -123,10 +501,203 @@ class Database:
             self.InsurancePolicy = InsurancePolicy
             self.PolicyClauseVersion = PolicyClauseVersion
             
+            # 共享条款库（未使用时为 None，条款全部保存在项目数据库中）
+            self.library = self._open_library(library_path)
+            
         except Exception as e:
             st.error(f"数据库初始化失败: {str(e)}")
             raise
 
+    def _prepare_schema(self, force=False):
+        """建表并补齐结构，每个数据库文件在本进程中只执行一次（force=True 时强制执行）"""
+        with _schema_lock:
+            key = _schema_key(self.db_path)
+            if not force and key is not None and key in _prepared_schemas:
+                return
+            Base.metadata.create_all(self.engine)
+            self._ensure_schema()
+            _prepared_schemas.add(_schema_key(self.db_path))
+
+    def _ensure_schema(self):
+        """补充 create_all 无法完成的结构：旧表缺少的列、修订号初始记录、触发器和已有表的索引
+
+        先读取现有结构，只在缺少时写入，结构完整的数据库上不产生任何写操作，
+        其他连接持有写锁时也不会被阻塞。
+        """
+        with self.engine.begin() as conn:
+            added = False
+            for table, column, column_type in SCHEMA_COLUMNS:
+                columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                    added = True
+            if conn.execute(text("SELECT 1 FROM catalog_revision WHERE id = 1")).first() is None:
+                conn.execute(
+                    text("INSERT OR IGNORE INTO catalog_revision (id, catalog_id, revision) VALUES (1, :catalog_id, 0)"),
+                    {'catalog_id': str(uuid.uuid4())}
+                )
+            existing = {name for (name,) in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")
+            )}
+            for statement in CATALOG_REVISION_TRIGGERS + VERSION_POINTER_TRIGGERS + SCHEMA_INDEXES:
+                if _schema_object_name(statement) not in existing:
+                    conn.execute(text(statement))
+            if added:
+                # 旧数据库新增的版本指针列按已有版本一次性填充
+                conn.execute(text(REPAIR_VERSION_POINTERS_SQL))
+            self._fill_order_keys(conn)
+
+    @staticmethod
+    def _fill_order_keys(conn):
+        """为没有排序键的方案条款（旧数据库中的绑定）按添加顺序补充排序键，排在方案已有条款之后"""
+        rows = conn.execute(text(
+            "SELECT id, policy_id FROM policy_clause_versions WHERE order_key IS NULL ORDER BY policy_id, id"
+        )).all()
+        pending = {}
+        for binding_id, policy_id in rows:
+            pending.setdefault(policy_id, []).append(binding_id)
+        for policy_id, binding_ids in pending.items():
+            last_key = conn.execute(
+                text("SELECT MAX(order_key) FROM policy_clause_versions WHERE policy_id = :policy_id"),
+                {'policy_id': policy_id}
+            ).scalar()
+            conn.execute(
+                text("UPDATE policy_clause_versions SET order_key = :order_key WHERE id = :id"),
+                [
+                    {'id': binding_id, 'order_key': order_key}
+                    for binding_id, order_key in zip(binding_ids, keys_between(last_key, None, len(binding_ids)))
+                ]
+            )
+
+    def check_version_pointers(self, repair=False):
+        """检查触发器维护的版本指针是否与版本记录一致，返回 {检查项: 不一致数量}
+
+        repair=True 时按版本记录重新计算指针（重复的版本号只能报告，需要人工处理）。
+        """
+        with self.engine.begin() as conn:
+            drift = {name: conn.execute(text(sql)).scalar() for name, sql in VERSION_POINTER_CHECKS}
+            if repair and (drift['current_version_id'] or drift['max_version_number']):
+                conn.execute(text(REPAIR_VERSION_POINTERS_SQL))
+                logger.warning("已修复版本指针：%s", drift)
+        if repair:
+            self.session.expire_all()
+            clause_cache.invalidate(self.db_path)
+        return drift
+
+    def get_setting(self, key, default=None):
+        """读取项目设置"""
+        setting = self.session.get(ProjectSetting, key)
+        return setting.value if setting else default
+
+    def set_setting(self, key, value):
+        """写入项目设置"""
+        self.session.merge(ProjectSetting(key=key, value=value))
+        self.session.commit()
+
+    def _open_library(self, library_path=None):
+        """打开共享条款库
+
+        项目数据库只保存方案绑定、本地修改和被绑定条款的副本，条款库本身只导入和存储一次。
+        """
+        if library_path:
+            library_path = os.path.abspath(library_path)
+            self.set_setting(LIBRARY_PATH_SETTING, library_path)
+        else:
+            library_path = self.get_setting(LIBRARY_PATH_SETTING)
+            if not library_path:
+                return None
+            if not os.path.exists(library_path):
+                # 例如在其他机器上导入的项目：已绑定的条款都有本地副本，仍可正常使用
+                logger.warning("共享条款库 %s 不存在，只使用项目中的条款", library_path)
+                return None
+        if library_path == os.path.abspath(self.db_path):
+            return None
+        clause_cache.set_library(self.db_path, library_path)
+        return Database(library_path)
+
+    @timed('db.pin_library_clauses')
+    def pin_library_clauses(self, clause_uuids):
+        """把共享条款库中的条款及其全部版本复制到项目数据库
+
+        方案绑定的外键和本地修改都只涉及项目数据库。已复制的条款在本地没有修改、
+        而条款库中更新过时，用条款库的内容刷新本地副本。
+        """
+        if self.library is None or not clause_uuids:
+            return
+        
+        clause_uuids = list(dict.fromkeys(clause_uuids))
+        refreshed = []
+        try:
+            for start in range(0, len(clause_uuids), IN_QUERY_BATCH):
+                batch = clause_uuids[start:start + IN_QUERY_BATCH]
+                library_clauses = {
+                    clause.uuid: clause
+                    for clause in self.library.session.query(Clause).filter(Clause.uuid.in_(batch))
+                }
+                if not library_clauses:
+                    continue
+                
+                local_clauses = {
+                    clause.uuid: clause
+                    for clause in self.session.query(Clause).filter(Clause.uuid.in_(list(library_clauses)))
+                }
+                local_versions = set(self.session.query(
+                    ClauseVersion.clause_uuid, ClauseVersion.version_number
+                ).filter(ClauseVersion.clause_uuid.in_(list(library_clauses))))
+                
+                for uuid, source in library_clauses.items():
+                    fields = {field: getattr(source, field) for field in CLAUSE_COPY_FIELDS}
+                    local = local_clauses.get(uuid)
+                    if local is None:
+                        self.session.add(Clause(**fields))
+                    elif (local.updated_at or datetime.min) < (source.updated_at or datetime.min):
+                        for field, value in fields.items():
+                            setattr(local, field, value)
+                        refreshed.append(uuid)
+                
+                for version in self.library.session.query(ClauseVersion).filter(
+                    ClauseVersion.clause_uuid.in_(list(library_clauses))
+                ):
+                    if (version.clause_uuid, version.version_number) not in local_versions:
+                        self.session.add(ClauseVersion(
+                            clause_uuid=version.clause_uuid,
+                            version_number=version.version_number,
+                            title=version.title,
+                            content=version.content,
+                            note=version.note,
+                            created_at=version.created_at
+                        ))
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error("复制共享条款库中的条款失败：%s", e)
+            raise
+        
+        if refreshed:
+            clause_cache.invalidate(self.db_path, refreshed)
+
+    def get_local_overrides(self):
+        """项目中比共享条款库更新的条款UUID（本地修改过或只存在于项目中的条款）"""
+        local = dict(self.session.query(Clause.uuid, Clause.updated_at).filter_by(is_active=True))
+        if self.library is None:
+            return set(local)
+        
+        uuids = list(local)
+        library = {}
+        for start in range(0, len(uuids), IN_QUERY_BATCH):
+            library.update(self.library.session.query(Clause.uuid, Clause.updated_at).filter(
+                Clause.uuid.in_(uuids[start:start + IN_QUERY_BATCH])
+            ))
+        return {
+            uuid for uuid, updated_at in local.items()
+            if uuid not in library or (updated_at or datetime.min) > (library[uuid] or datetime.min)
+        }
+
+    def get_catalog_revision(self):
+        """获取条款库标识和修订号，任何条款或版本变化都会使修订号递增"""
+        row = self.session.query(CatalogRevision.catalog_id, CatalogRevision.revision).filter_by(id=1).first()
+        return (row.catalog_id, row.revision) if row else (None, 0)
+
     def create_policy(self, name, description=""):
         """创建保险方案"""
         policy = InsurancePolicy(
@@ -142,6 +713,67 @@ class Database:
         """获取保险方案"""
         return self.session.query(InsurancePolicy).filter_by(id=policy_id).first()
 
+    def list_policies(self):
+        """列出所有保险方案及其条款数量（一次分组查询）"""
+        rows = self.session.query(
+            InsurancePolicy.id,
+            InsurancePolicy.name,
+            InsurancePolicy.description,
+            func.count(PolicyClauseVersion.id)
+        ).outerjoin(
+            PolicyClauseVersion, PolicyClauseVersion.policy_id == InsurancePolicy.id
+        ).group_by(InsurancePolicy.id).order_by(InsurancePolicy.id).all()
+        return [PolicySummary(*row) for row in rows]
+
+    @timed('db.get_policy_clause_bindings')
+    def get_policy_clause_bindings(self, policy_id):
+        """获取保险方案绑定的条款版本，返回按方案中条款顺序排列的 [(条款UUID, 版本号)]
+
+        只查询两列，通过 (policy_id, order_key) 索引和 clause_versions 主键完成一次连接查询。
+        """
+        rows = self.session.query(
+            ClauseVersion.clause_uuid, ClauseVersion.version_number
+        ).join(
+            PolicyClauseVersion, PolicyClauseVersion.clause_version_id == ClauseVersion.id
+        ).filter(
+            PolicyClauseVersion.policy_id == policy_id
+        ).order_by(PolicyClauseVersion.order_key, PolicyClauseVersion.id).all()
+        return [(row.clause_uuid, row.version_number) for row in rows]
+
+    @timed('db.clone_policy')
+    def clone_policy(self, policy_id, name, description=None):
+        """复制保险方案，条款绑定用一条 INSERT ... SELECT 复制"""
+        source = self.get_policy(policy_id)
+        if source is None:
+            return None
+        
+        try:
+            policy = InsurancePolicy(
+                uuid=str(uuid.uuid4()),
+                name=name,
+                description=source.description if description is None else description
+            )
+            self.session.add(policy)
+            self.session.flush()
+            
+            self.session.execute(insert(PolicyClauseVersion).from_select(
+                ['policy_id', 'clause_version_id', 'order_key', 'created_at'],
+                select(
+                    literal(policy.id),
+                    PolicyClauseVersion.clause_version_id,
+                    PolicyClauseVersion.order_key,
+                    literal(datetime.utcnow())
+                ).where(
+                    PolicyClauseVersion.policy_id == policy_id
+                ).order_by(PolicyClauseVersion.id)
+            ))
+            self.session.commit()
+            return policy
+        except Exception as e:
+            self.session.rollback()
+            logger.error("复制保险方案失败：%s", e)
+            return None
+
     def update_policy(self, policy_id, name=None, description=None):
         """更新保险方案"""
         policy = self.get_policy(policy_id)
@@ -164,10 +796,11 @@ class Database:
         return False
 
     def add_clause_to_policy(self, policy_id, clause_version_id):
-        """添加条款版本到保险方案"""
+        """添加条款版本到保险方案（排在最后）"""
         policy_clause = PolicyClauseVersion(
             policy_id=policy_id,
-            clause_version_id=clause_version_id
+            clause_version_id=clause_version_id,
+            order_key=key_between(self._last_order_key(policy_id), None)
         )
         self.session.add(policy_clause)
         self.session.commit()
@@ -189,13 +822,98 @@ class Database:
         """获取保险方案的所有条款版"""
         return self.session.query(PolicyClauseVersion).filter_by(
             policy_id=policy_id
-        ).all()
+        ).order_by(PolicyClauseVersion.order_key, PolicyClauseVersion.id).all()
+
+    def _last_order_key(self, policy_id):
+        """方案中最后一个条款的排序键，方案为空时为 None"""
+        return self.session.query(func.max(PolicyClauseVersion.order_key)).filter(
+            PolicyClauseVersion.policy_id == policy_id
+        ).scalar()
+
+    def _policy_order(self, policy_id):
+        """方案的条款顺序，返回按顺序排列的 [(绑定ID, 条款UUID, 排序键)]"""
+        return self.session.query(
+            PolicyClauseVersion.id, ClauseVersion.clause_uuid, PolicyClauseVersion.order_key
+        ).join(
+            ClauseVersion, ClauseVersion.id == PolicyClauseVersion.clause_version_id
+        ).filter(
+            PolicyClauseVersion.policy_id == policy_id
+        ).order_by(PolicyClauseVersion.order_key, PolicyClauseVersion.id).all()
+
+    @timed('db.move_policy_clause')
+    def move_policy_clause(self, policy_id, clause_uuid, position):
+        """把方案中的条款移动到第 position 位（从 0 开始），只改写该条款的排序键
+
+        返回是否移动成功。
+        """
+        try:
+            rows = self._policy_order(policy_id)
+            current = next((i for i, row in enumerate(rows) if row.clause_uuid == clause_uuid), None)
+            if current is None:
+                return False
+            binding_id = rows[current].id
+            others = rows[:current] + rows[current + 1:]
+            position = max(0, min(position, len(others)))
+            if position == current:
+                return True
+            lower = others[position - 1].order_key if position > 0 else None
+            upper = others[position].order_key if position < len(others) else None
+            self.session.query(PolicyClauseVersion).filter_by(id=binding_id).update(
+                {'order_key': key_between(lower, upper)}, synchronize_session=False
+            )
+            self.session.commit()
+            return True
+        except Exception as e:
+            self.session.rollback()
+            logger.error("移动方案条款失败：%s", e)
+            return False
+
+    @timed('db.reorder_policy_clauses')
+    def reorder_policy_clauses(self, policy_id, clause_uuids):
+        """按给定的条款UUID顺序重排方案，未列出的条款按原顺序排在最后
 
-    def import_clauses(self, df):
+        保留已按顺序排列的条款的排序键，只改写需要移动的条款，在一个事务中完成。
+        返回改写的条款数量。
+        """
+        try:
+            rows = self._policy_order(policy_id)
+            by_uuid = {row.clause_uuid: row for row in rows}
+            ordered = [by_uuid[uuid] for uuid in dict.fromkeys(clause_uuids) if uuid in by_uuid]
+            listed = {row.clause_uuid for row in ordered}
+            ordered += [row for row in rows if row.clause_uuid not in listed]
+            
+            changes = [
+                {'id': row.id, 'order_key': order_key}
+                for row, order_key in zip(ordered, assign_order_keys([row.order_key for row in ordered]))
+                if row.order_key != order_key
+            ]
+            if changes:
+                self.session.execute(update(PolicyClauseVersion), changes)
+            self.session.commit()
+            return len(changes)
+        except Exception as e:
+            self.session.rollback()
+            logger.error("重排方案条款失败：%s", e)
+            raise
+
+    @timed('db.sort_policy_clauses')
+    def sort_policy_clauses(self, policy_id, fields=('险种', '扩展条款标题')):
+        """按条款字段（如险种、条款名称）排序方案中的条款，字段相同的保持原顺序，返回改写的条款数量"""
+        columns = [POLICY_SORT_FIELDS[field] for field in fields]
+        rows = self.session.query(ClauseVersion.clause_uuid).join(
+            PolicyClauseVersion, PolicyClauseVersion.clause_version_id == ClauseVersion.id
+        ).join(
+            Clause, Clause.uuid == ClauseVersion.clause_uuid
+        ).filter(
+            PolicyClauseVersion.policy_id == policy_id
+        ).order_by(*columns, PolicyClauseVersion.order_key, PolicyClauseVersion.id).all()
+        return self.reorder_policy_clauses(policy_id, [row.clause_uuid for row in rows])
+
+    @timed('db.import_clauses')
+    def import_clauses(self, df, batch_size=500):
         """导入条款数据"""
         # 确保DataFrame包含所需的列
-        required_columns = ['UUID', '扩展条款标题', '扩展条款正文', 'PINYIN', 'QUANPIN', '险种', '保险公司', '年度版本']
-        if not all(col in df.columns for col in required_columns):
+        if not all(col in df.columns for col in REQUIRED_IMPORT_COLUMNS):
             raise ValueError("导入的数据缺少必要的列")
 
         # 验证UUID不为空且不重复
@@ -208,17 +926,53 @@ class Database:
         new_count = 0
         update_count = 0
 
-        for _, row in df.iterrows():
+        # 分批写入，每批一次查询、一次提交
+        for start in range(0, len(df), batch_size):
+            batch_new, batch_update = self.import_clause_batch(df.iloc[start:start + batch_size])
+            new_count += batch_new
+            update_count += batch_update
+        self.refresh_clause_signatures()
+        return new_count, update_count
+
+    @timed('db.import_clause_batch')
+    def import_clause_batch(self, df):
+        """导入一批已校验的条款，整批只提交一次"""
+        if self.library is not None:
+            # 使用共享条款库的项目直接导入到条款库，所有项目只需导入一次
+            return self.library.import_clause_batch(df)
+        
+        batch = df[REQUIRED_IMPORT_COLUMNS].astype(object)
+        rows = batch.where(batch.notna(), None).to_dict('records')
+        uuids = [row['UUID'] for row in rows]
+        if not uuids:
+            return 0, 0
+
+        # 一次性查出本批已存在的条款及其最新版本
+        existing_clauses = {
+            clause.uuid: clause
+            for clause in self.session.query(Clause).filter(Clause.uuid.in_(uuids))
+        }
+        latest_versions = {
+            version.clause_uuid: version
+            for version in self.session.query(ClauseVersion).join(
+                Clause,
+                (Clause.uuid == ClauseVersion.clause_uuid) &
+                (Clause.max_version_number == ClauseVersion.version_number)
+            ).filter(Clause.uuid.in_(list(existing_clauses)))
+        }
+
+        new_count = 0
+        update_count = 0
+        updated_uuids = []
+        now = datetime.utcnow()
+        for row in rows:
             uuid = row['UUID']
-            existing_clause = self.session.query(Clause).filter_by(uuid=uuid).first()
-            
+            existing_clause = existing_clauses.get(uuid)
+
             if existing_clause:
-                # 获取最新版本
-                latest_version = self.session.query(ClauseVersion).filter_by(
-                    clause_uuid=uuid
-                ).order_by(ClauseVersion.version_number.desc()).first()
-                
-                # 只有当内容有变化时才更新款
+                latest_version = latest_versions.get(uuid)
+
+                # 只有当内容有变化时才更新条款
                 if not latest_version or latest_version.content != row['扩展条款正文']:
                     # 更新条款基本信息，但不创建新版本
                     existing_clause.title = row['扩展条款标题']
@@ -228,8 +982,8 @@ class Database:
                     existing_clause.insurance_type = row['险种']
                     existing_clause.company = row['保险公司']
                     existing_clause.version = row['年度版本']
-                    existing_clause.updated_at = datetime.utcnow()
-                    
+                    existing_clause.updated_at = now
+
                     # 如果没有任何版本记录，创建初始版本
                     if not latest_version:
                         version = ClauseVersion(
@@ -238,12 +992,13 @@ class Database:
                             title=row['扩展条款标题'],
                             content=row['扩展条款正文'],
                             note="初始版本",
-                            created_at=datetime.utcnow()
+                            created_at=now
                         )
                         self.session.add(version)
                         existing_clause.version_number = 1
-                    
+
                     update_count += 1
+                    updated_uuids.append(uuid)
             else:
                 # 创建新条款
                 new_clause = Clause(
@@ -258,7 +1013,7 @@ class Database:
                     version_number=1
                 )
                 self.session.add(new_clause)
-                
+
                 # 创建初始版本
                 initial_version = ClauseVersion(
                     clause_uuid=uuid,
@@ -266,94 +1021,224 @@ class Database:
                     title=row['扩展条款标题'],
                     content=row['扩展条款正文'],
                     note="初始导入",
-                    created_at=datetime.utcnow()
+                    created_at=now
                 )
                 self.session.add(initial_version)
                 new_count += 1
 
+        try:
             self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        if updated_uuids:
+            clause_cache.invalidate(self.db_path, updated_uuids)
         return new_count, update_count
 
+    def get_import_checkpoint(self, file_hash):
+        """获取导入断点"""
+        return self.session.query(ImportCheckpoint).filter_by(file_hash=file_hash).first()
+
+    def save_import_checkpoint(self, file_hash, file_name, rows_done, new_count, update_count, completed=False):
+        """保存导入断点"""
+        checkpoint = self.get_import_checkpoint(file_hash)
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(file_hash=file_hash, file_name=file_name)
+            self.session.add(checkpoint)
+        checkpoint.rows_done = rows_done
+        checkpoint.new_count = new_count
+        checkpoint.update_count = update_count
+        checkpoint.completed = completed
+        self.session.commit()
+        return checkpoint
+
+    def get_upload_record(self, kind, content_hash, size):
+        """查找内容相同的已处理上传文件"""
+        return self.session.query(UploadRecord).filter_by(
+            kind=kind, content_hash=content_hash, size=size
+        ).first()
+
+    def record_upload(self, kind, content_hash, size, file_name, summary=None):
+        """记录已处理的上传文件"""
+        record = self.get_upload_record(kind, content_hash, size)
+        if record is None:
+            record = UploadRecord(kind=kind, content_hash=content_hash, size=size)
+            self.session.add(record)
+        record.file_name = file_name
+        record.summary = summary
+        record.created_at = datetime.utcnow()
+        self.session.commit()
+        return record
+
+    def is_chunk_imported(self, chunk_hash):
+        """数据块是否已导入且之后条款库没有变化（使用共享条款库时查询条款库）
+
+        导入后条款被修改、删除或切换版本时修订号会变化，再次导入同一数据块需要重新写入。
+        """
+        if self.library is not None:
+            return self.library.is_chunk_imported(chunk_hash)
+        stored = self.session.query(ImportedChunk.catalog_revision).filter_by(chunk_hash=chunk_hash).scalar()
+        return stored is not None and stored == self.get_catalog_revision()[1]
+
+    def record_chunk(self, chunk_hash, rows):
+        """记录已导入的数据块及当前修订号，与条款写入同一个数据库"""
+        if self.library is not None:
+            return self.library.record_chunk(chunk_hash, rows)
+        chunk = self.session.query(ImportedChunk).filter_by(chunk_hash=chunk_hash).first()
+        if chunk is None:
+            chunk = ImportedChunk(chunk_hash=chunk_hash)
+            self.session.add(chunk)
+        chunk.rows = rows
+        chunk.catalog_revision = self.get_catalog_revision()[1]
+        self.session.commit()
+
+    def stamp_imported_chunks(self, chunk_hashes):
+        """一次导入完成后，把其中所有数据块的修订号更新为当前修订号
+
+        后写入的数据块会使先写入的数据块记录的修订号过期；导入完成时统一更新，
+        条款库不再变化时再次导入同一文件可以整体跳过。
+        """
+        if self.library is not None:
+            return self.library.stamp_imported_chunks(chunk_hashes)
+        chunk_hashes = list(dict.fromkeys(chunk_hashes))
+        revision = self.get_catalog_revision()[1]
+        for start in range(0, len(chunk_hashes), IN_QUERY_BATCH):
+            self.session.query(ImportedChunk).filter(
+                ImportedChunk.chunk_hash.in_(chunk_hashes[start:start + IN_QUERY_BATCH])
+            ).update({'catalog_revision': revision}, synchronize_session=False)
+        self.session.commit()
+
+    def create_job(self, kind, dedupe_key=None):
+        """创建后台任务记录"""
+        job = BackgroundJob(
+            job_id=str(uuid.uuid4()),
+            kind=kind,
+            dedupe_key=dedupe_key,
+            status='queued'
+        )
+        self.session.add(job)
+        self.session.commit()
+        return job
+
+    def get_job(self, job_id):
+        """获取后台任务"""
+        return self.session.query(BackgroundJob).filter_by(job_id=job_id).first()
+
+    def update_job(self, job_id, **fields):
+        """更新后台任务的状态、进度等字段"""
+        job = self.get_job(job_id)
+        if job:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self.session.commit()
+        return job
+
+    def find_active_job(self, kind, dedupe_key):
+        """查找相同内容且尚未结束的后台任务"""
+        return self.session.query(BackgroundJob).filter(
+            BackgroundJob.kind == kind,
+            BackgroundJob.dedupe_key == dedupe_key,
+            BackgroundJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).first()
+
+    def list_jobs(self, limit=10):
+        """列出最近的后台任务"""
+        return self.session.query(BackgroundJob).order_by(
+            BackgroundJob.created_at.desc()
+        ).limit(limit).all()
+
+    def fail_interrupted_jobs(self):
+        """将进程重启前未完成的任务标记为失败"""
+        count = self.session.query(BackgroundJob).filter(
+            BackgroundJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).update({'status': 'failed', 'message': '服务重启，任务已中断'}, synchronize_session=False)
+        self.session.commit()
+        return count
+
+    @timed('db.export_clauses')
     def export_clauses(self, format='dataframe'):
-        """导出条款数据"""
-        clauses = self.session.query(Clause).filter_by(is_active=True).all()
-        data = []
-        for i, clause in enumerate(clauses, 1):
-            # 获取最新版本
-            latest_version = self.session.query(ClauseVersion).filter_by(
-                clause_uuid=clause.uuid
-            ).order_by(ClauseVersion.version_number.desc()).first()
-            
-            # 使用最新版本的内容
-            if latest_version:
-                content = latest_version.content
-                title = latest_version.title
-                version_number = latest_version.version_number
-            else:
-                content = clause.content
-                title = clause.title
-                version_number = clause.version_number
-            
-            data.append({
-                'UUID': clause.uuid,
-                '序号': i,
-                '扩展条款标题': title,
-                '扩展条款正文': content,
-                'PINYIN': clause.pinyin,
-                'QUANPIN': clause.quanpin,
-                '险种': clause.insurance_type,
-                '保险公司': clause.company,
-                '年度版本': clause.version,
-                '版本号': version_number
-            })
-        df = pd.DataFrame(data)
-        
+        """导出条款数据，使用共享条款库时合并条款库和项目中的本地修改"""
         if format == 'xlsx':
-            output = io.BytesIO()
-            df.to_excel(output, index=False)
-            output.seek(0)
-            return output
-        elif format == 'json':
+            # 逐批读取、逐行写入，内存占用与条款数量无关
+            return write_xlsx(CATALOG_COLUMNS, self.iter_export_rows())
+        
+        if self.library is not None:
+            df = merge_catalog(
+                self.library.export_clauses('dataframe'),
+                self.export_local_clauses(self.get_local_overrides())
+            )
+        else:
+            df = self.export_local_clauses()
+        
+        if format == 'json':
             return df.to_json(orient='records', force_ascii=False)
         elif format == 'dataframe':
             return df
         else:
             return df
 
+    def iter_catalog_rows(self, batch_size=EXPORT_BATCH_SIZE):
+        """按批从数据库游标读取有效条款的最新版本，逐行返回（不含序号）"""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(text(CATALOG_ROWS_SQL))
+            for row in result:
+                yield tuple(row)
+
+    def iter_export_rows(self):
+        """逐行返回导出的条款库（与 CATALOG_COLUMNS 对应），使用共享条款库时本地修改替换条款库中的行"""
+        if self.library is None:
+            sources = [self.iter_catalog_rows()]
+        else:
+            overrides = self.get_local_overrides()
+            sources = [
+                (row for row in self.library.iter_catalog_rows() if row[0] not in overrides),
+                (row for row in self.iter_catalog_rows() if row[0] in overrides)
+            ]
+        index = 0
+        for source in sources:
+            for row in source:
+                index += 1
+                yield (row[0], index) + row[1:]
+
+    def export_local_clauses(self, clause_uuids=None):
+        """导出项目数据库中的条款，clause_uuids 为 None 时导出全部"""
+        rows = self.iter_catalog_rows()
+        if clause_uuids is not None:
+            if not clause_uuids:
+                return pd.DataFrame()
+            rows = (row for row in rows if row[0] in clause_uuids)
+        return pd.DataFrame(
+            [(row[0], i) + row[1:] for i, row in enumerate(rows, 1)],
+            columns=CATALOG_COLUMNS
+        )
+
+    @timed('db.export_selected_clauses')
     def export_selected_clauses(self, clause_uuids, format='docx'):
         """导出选中的条款"""
-        clauses = []
-        for uuid in clause_uuids:
-            # 获取条款基本信息
-            clause = self.session.query(Clause).filter_by(uuid=uuid, is_active=True).first()
-            if clause:
-                # 获取最新版本
-                latest_version = self.session.query(ClauseVersion).filter_by(
-                    clause_uuid=uuid
-                ).order_by(ClauseVersion.version_number.desc()).first()
-                
-                if latest_version:
-                    # 使用最新版本的内容
-                    clause.content = latest_version.content
-                    clause.title = latest_version.title
-                clauses.append(clause)
+        # 已选但尚未保存到方案的共享条款先复制到项目中
+        self.pin_library_clauses(clause_uuids)
+        # 按批查询条款及其最新版本的内容，再按选择顺序排列
+        found = {}
+        uuids = list(clause_uuids)
+        for start in range(0, len(uuids), IN_QUERY_BATCH):
+            found.update((row.uuid, row) for row in self.session.query(
+                Clause.uuid,
+                func.coalesce(ClauseVersion.title, Clause.title).label('title'),
+                func.coalesce(ClauseVersion.content, Clause.content).label('content'),
+                Clause.insurance_type,
+                Clause.company,
+                Clause.version
+            ).outerjoin(ClauseVersion, (ClauseVersion.clause_uuid == Clause.uuid) &
+                        (ClauseVersion.version_number == Clause.max_version_number)
+            ).filter(Clause.uuid.in_(uuids[start:start + IN_QUERY_BATCH]), Clause.is_active == True))
+        clauses = [found[uuid] for uuid in uuids if uuid in found]
         
         if format == 'xlsx':
-            data = []
-            for i, clause in enumerate(clauses, 1):
-                data.append({
-                    '序号': i,
-                    '扩展条款标题': clause.title,
-                    '扩展条款正文': clause.content,
-                    '险种': clause.insurance_type,
-                    '保险公司': clause.company,
-                    '年度版本': clause.version
-                })
-            df = pd.DataFrame(data)
-            output = io.BytesIO()
-            df.to_excel(output, index=False)
-            output.seek(0)
-            return output
+            return write_xlsx(
+                ['序号', '扩展条款标题', '扩展条款正文', '险种', '保险公司', '年度版本'],
+                ((i, clause.title, clause.content, clause.insurance_type, clause.company, clause.version)
+                 for i, clause in enumerate(clauses, 1))
+            )
         
         elif format == 'docx':
             from docx import Document
@@ -382,15 +1267,18 @@ class Database:
                 content += "---\n\n"
             return content
 
+    @timed('db.update_clause')
     def update_clause(self, uuid, title=None, content=None, version_note=None):
         """更新条款内容，仅在编辑时调用"""
         try:
+            # 修改共享条款库中的条款时，新版本只保存在项目中
+            self.pin_library_clauses([uuid])
             clause = self.session.query(Clause).filter_by(uuid=uuid).first()
             if clause:
-                # 获取最新版本号
+                # 获取最新版本
                 latest_version = self.session.query(ClauseVersion).filter_by(
-                    clause_uuid=uuid
-                ).order_by(ClauseVersion.version_number.desc()).first()
+                    clause_uuid=uuid, version_number=clause.max_version_number
+                ).first()
                 
                 # 检查内容是否真的有变化
                 if latest_version and content == latest_version.content:
@@ -422,19 +1310,26 @@ class Database:
                 return True
             return False
         except Exception as e:
-            logger.error(f"更新条款失败: {str(e)}")
+            logger.error("更新条款失败: %s", e)
             self.session.rollback()
             return False
 
+    @timed('db.get_clause_versions')
     def get_clause_versions(self, uuid):
         """获取条款的所有版本"""
         # 获取当前版本
         current = self.session.query(Clause).filter_by(uuid=uuid).first()
         if not current:
-            return []
+            # 尚未复制到项目中的共享条款，直接读取条款库中的版本
+            return self.library.get_clause_versions(uuid) if self.library is not None else []
         
-        # 获取所有版本（包括当前版本）
-        versions = self.session.query(ClauseVersion).filter_by(
+        # 获取所有版本（包括当前版本），只查询元数据，文本从共享缓存读取
+        versions = self.session.query(
+            ClauseVersion.id,
+            ClauseVersion.version_number,
+            ClauseVersion.note,
+            ClauseVersion.created_at
+        ).filter_by(
             clause_uuid=uuid
         ).order_by(ClauseVersion.version_number.desc()).all()
         
@@ -452,11 +1347,25 @@ class Database:
             self.session.commit()
             versions = [initial_version]
         
-        return versions
+        texts = clause_cache.get_many(self.db_path, uuid, [v.version_number for v in versions])
+        return [
+            ClauseVersionView(
+                id=v.id,
+                clause_uuid=uuid,
+                version_number=v.version_number,
+                title=texts[v.version_number].title,
+                content=texts[v.version_number].content,
+                note=v.note,
+                created_at=v.created_at
+            )
+            for v in versions
+        ]
 
+    @timed('db.activate_clause_version')
     def activate_clause_version(self, uuid, version_number):
         """激活指定版本的条款，仅在切换版本时调用"""
         try:
+            self.pin_library_clauses([uuid])
             # 获取指定版本
             version = self.session.query(ClauseVersion).filter_by(
                 clause_uuid=uuid,
@@ -476,17 +1385,11 @@ class Database:
                     # 提交更改
                     self.session.commit()
                     
-                    # 更新session state中的条款内容
+                    # 更新session state中的条款版本，标题和正文随版本号从缓存中读取
                     if 'selected_clauses' in st.session_state:
-                        st.session_state.selected_clauses = [
-                            {
-                                **c,
-                                '扩展条款正文': version.content,
-                                '版本号': version_number,
-                                '扩展条款标题': version.title
-                            } if c['UUID'] == uuid else c
-                            for c in st.session_state.selected_clauses
-                        ]
+                        for c in st.session_state.selected_clauses:
+                            if c['UUID'] == uuid:
+                                c['版本号'] = version_number
                     
                     # 更新version_info
                     if 'version_info' not in st.session_state:
@@ -496,12 +1399,14 @@ class Database:
                     return True
             return False
         except Exception as e:
-            logger.error(f"激活条款版本失败: {str(e)}")
+            logger.error("激活条款版本失败: %s", e)
             self.session.rollback()
             return False
 
     def delete_clause_version(self, uuid, version_number):
         """删除指定版的条款"""
+        self.pin_library_clauses([uuid])
+        
         # 获取所有版本
         versions = self.get_clause_versions(uuid)
         
@@ -521,15 +1426,23 @@ class Database:
         ).delete()
         
         self.session.commit()
+        # 删除的版本号之后会被新版本重新使用，清除缓存中该条款的旧文本
+        clause_cache.invalidate(self.db_path, [uuid])
         return True
 
     def clear_database(self):
-        """清空数据库"""
+        """清空项目数据库；使用共享条款库时，条款库中的条款供所有项目共用，不会被清空"""
         self.session.query(Clause).delete()
         self.session.query(ClauseVersion).delete()
         self.session.query(InsurancePolicy).delete()
         self.session.query(PolicyClauseVersion).delete()
+        self.session.query(ImportCheckpoint).delete()
+        # 条款已清空，之前导入过的文件和数据块可以重新导入
+        self.session.query(ImportedChunk).delete()
+        self.session.query(ClauseSignature).delete()
+        self.session.query(UploadRecord).filter_by(kind='clauses').delete()
         self.session.commit()
+        clause_cache.invalidate(self.db_path)
 
     def export_database(self):
         """导出数据库"""
@@ -541,6 +1454,13 @@ class Database:
     def import_database(self, db_data):
         """导入数据库"""
         try:
+            # 数据库导入记录是项目的历史，保留到新数据库中；
+            # 条款文件和数据块的记录描述的是旧数据库的内容，以新数据库自带的为准
+            database_uploads = [
+                {column: getattr(record, column) for column in ('kind', 'content_hash', 'size', 'file_name', 'summary', 'created_at')}
+                for record in self.session.query(UploadRecord).filter_by(kind='database')
+            ]
+            
             # 先关闭当前会话
             self.session.close()
             
@@ -553,10 +1473,18 @@ class Database:
             with open(self.db_path, 'wb') as f:
                 f.write(db_data)
             
-            # 重新创建会话
+            # 重新创建会话，并补齐旧版本数据库缺少的表和触发器
             self.engine = create_engine(f'sqlite:///{self.db_path}')
+            instrument_engine(self.engine)
             Session = sessionmaker(bind=self.engine)
             self.session = Session()
+            self._prepare_schema(force=True)
+            for values in database_uploads:
+                if self.get_upload_record('database', values['content_hash'], values['size']) is None:
+                    self.session.add(UploadRecord(**values))
+            self.session.commit()
+            clause_cache.invalidate(self.db_path)
+            self.library = self._open_library()
             
             return True
         except Exception as e:
@@ -573,8 +1501,10 @@ class Database:
                 os.remove(f"{self.db_path}.bak")
 
     def __del__(self):
-        """关闭数据库连接"""
-        self.session.close()
+        """关闭数据库连接（初始化失败时可能还没有会话）"""
+        session = getattr(self, 'session', None)
+        if session is not None:
+            session.close()
 
     def get_policy_by_uuid(self, uuid):
         """通过 UUID 获取保险方案"""
@@ -582,70 +1512,90 @@ class Database:
 
     def get_clause_version_by_clause_uuid(self, clause_uuid):
         """获取条款的最新版本"""
-        return self.session.query(ClauseVersion).filter_by(
-            clause_uuid=clause_uuid
-        ).order_by(ClauseVersion.version_number.desc()).first()
+        return self.session.query(ClauseVersion).join(
+            Clause, (Clause.uuid == ClauseVersion.clause_uuid) &
+                    (Clause.max_version_number == ClauseVersion.version_number)
+        ).filter(Clause.uuid == clause_uuid).first()
+
+    def _target_version_ids(self, clause_uuids):
+        """条款要绑定的版本ID {UUID: 版本ID}
+
+        按批读取条款的当前版本指针；会话中记录了其他版本号的条款再单独查找。
+        """
+        version_info = st.session_state.get('version_info', {})
+        uuids = list(clause_uuids)
+        target_versions = {}
+        for start in range(0, len(uuids), IN_QUERY_BATCH):
+            for clause_uuid, version_number, current_version_id in self.session.query(
+                Clause.uuid, Clause.version_number, Clause.current_version_id
+            ).filter(Clause.uuid.in_(uuids[start:start + IN_QUERY_BATCH])):
+                wanted = version_info.get(clause_uuid, version_number)
+                if wanted == version_number:
+                    target_versions[clause_uuid] = current_version_id
+                else:
+                    target_versions[clause_uuid] = self.session.query(ClauseVersion.id).filter_by(
+                        clause_uuid=clause_uuid, version_number=wanted
+                    ).scalar()
+        return target_versions
 
+    @timed('db.save_policy_clauses')
     def save_policy_clauses(self, policy_id, clause_uuids):
         """保存保险方案关联的条款"""
         print(f"保存条款到保险方案，保险方案ID：{policy_id}，条款数量：{len(clause_uuids)}")
         
         try:
-            # 获取现有的关联记录
-            existing_relations = self.session.query(PolicyClauseVersion).filter_by(
-                policy_id=policy_id
-            ).all()
+            # 方案绑定引用项目数据库中的条款版本，先复制用到的共享条款
+            self.pin_library_clauses(clause_uuids)
             
-            # 创建映射：clause_uuid -> clause_version_id
-            existing_versions = {}
-            for relation in existing_relations:
-                clause_version = relation.clause_version
-                if clause_version:
-                    existing_versions[clause_version.clause_uuid] = relation
+            # 获取现有的关联记录及其条款UUID（一次连接查询）
+            existing_versions = {
+                clause_uuid: relation
+                for relation, clause_uuid in self.session.query(
+                    PolicyClauseVersion, ClauseVersion.clause_uuid
+                ).join(
+                    ClauseVersion, ClauseVersion.id == PolicyClauseVersion.clause_version_id
+                ).filter(PolicyClauseVersion.policy_id == policy_id)
+            }
             
             print(f"现有关联数量：{len(existing_versions)}")
             
-            # 处理每个条款
+            uuids = list(clause_uuids)
+            target_versions = self._target_version_ids(uuids)
+            
+            # 按已选条款的顺序处理每个条款
             updated_count = 0
-            for clause_uuid in clause_uuids:
-                # 获取条款的当前版本号
-                current_version_number = None
-                if 'version_info' in st.session_state:
-                    current_version_number = st.session_state.version_info.get(clause_uuid)
-                
-                # 如果session state中没有版本信息，从数据库获取
-                if current_version_number is None:
-                    clause = self.session.query(Clause).filter_by(uuid=clause_uuid).first()
-                    if clause:
-                        current_version_number = clause.version_number
-                
-                print(f"处理条款 {clause_uuid}，版本号：{current_version_number}")
-                
-                # 获取指定版本的条款版本记录
-                clause_version = self.session.query(ClauseVersion).filter_by(
-                    clause_uuid=clause_uuid,
-                    version_number=current_version_number
-                ).first()
-                
-                if clause_version:
-                    if clause_uuid in existing_versions:
-                        # 更新现有关联
-                        relation = existing_versions[clause_uuid]
-                        if relation.clause_version_id != clause_version.id:
-                            relation.clause_version_id = clause_version.id
-                            updated_count += 1
-                    else:
-                        # 创建新关联
-                        new_relation = PolicyClauseVersion(
-                            policy_id=policy_id,
-                            clause_version_id=clause_version.id
-                        )
-                        self.session.add(new_relation)
+            relations = []
+            for clause_uuid in dict.fromkeys(uuids):
+                clause_version_id = target_versions.get(clause_uuid)
+                if clause_version_id is None:
+                    continue
+                if clause_uuid in existing_versions:
+                    # 更新现有关联
+                    relation = existing_versions[clause_uuid]
+                    if relation.clause_version_id != clause_version_id:
+                        relation.clause_version_id = clause_version_id
+                        updated_count += 1
+                else:
+                    # 创建新关联
+                    relation = PolicyClauseVersion(
+                        policy_id=policy_id,
+                        clause_version_id=clause_version_id
+                    )
+                    self.session.add(relation)
+                    updated_count += 1
+                relations.append(relation)
+            
+            # 顺序未变的条款保留排序键，只为新增和移动过的条款生成排序键
+            for relation, order_key in zip(relations, assign_order_keys([relation.order_key for relation in relations])):
+                if relation.order_key != order_key:
+                    if relation.order_key is not None:
                         updated_count += 1
+                    relation.order_key = order_key
             
             # 删除不再需要的关联
+            keep = set(uuids)
             for clause_uuid, relation in existing_versions.items():
-                if clause_uuid not in clause_uuids:
+                if clause_uuid not in keep:
                     self.session.delete(relation)
                     updated_count += 1
             
@@ -660,13 +1610,265 @@ class Database:
             print(f"保存条款关联失败：{str(e)}")
             return False
 
+    @timed('db.apply_policy_selection_diff')
+    def apply_policy_selection_diff(self, policy_id, added_uuids, removed_uuids):
+        """把一次勾选操作的增删写入方案的条款绑定，在一个事务中完成
+
+        只插入新增条款的绑定（排在最后）、删除移除条款的绑定，其余绑定不读取也不改写。
+        返回是否成功。
+        """
+        removed_uuids = list(dict.fromkeys(removed_uuids))
+        removed = set(removed_uuids)
+        added_uuids = [uuid for uuid in dict.fromkeys(added_uuids) if uuid not in removed]
+        if not added_uuids and not removed_uuids:
+            return True
+        
+        try:
+            # 方案绑定引用项目数据库中的条款版本，先复制用到的共享条款
+            self.pin_library_clauses(added_uuids)
+            
+            changed = added_uuids + removed_uuids
+            bound = {}
+            for start in range(0, len(changed), IN_QUERY_BATCH):
+                for binding_id, clause_uuid in self.session.query(
+                    PolicyClauseVersion.id, ClauseVersion.clause_uuid
+                ).join(
+                    ClauseVersion, ClauseVersion.id == PolicyClauseVersion.clause_version_id
+                ).filter(
+                    PolicyClauseVersion.policy_id == policy_id,
+                    ClauseVersion.clause_uuid.in_(changed[start:start + IN_QUERY_BATCH])
+                ):
+                    bound.setdefault(clause_uuid, []).append(binding_id)
+            
+            stale = [binding_id for uuid in removed_uuids for binding_id in bound.get(uuid, [])]
+            for start in range(0, len(stale), IN_QUERY_BATCH):
+                self.session.query(PolicyClauseVersion).filter(
+                    PolicyClauseVersion.id.in_(stale[start:start + IN_QUERY_BATCH])
+                ).delete(synchronize_session=False)
+            
+            # 已绑定的条款不重复添加，新增的条款按勾选顺序排在方案最后
+            target_versions = self._target_version_ids([uuid for uuid in added_uuids if uuid not in bound])
+            new_versions = [target_versions[uuid] for uuid in added_uuids if target_versions.get(uuid) is not None]
+            self.session.add_all([
+                PolicyClauseVersion(policy_id=policy_id, clause_version_id=clause_version_id, order_key=order_key)
+                for clause_version_id, order_key in zip(
+                    new_versions, keys_between(self._last_order_key(policy_id), None, len(new_versions))
+                )
+            ])
+            self.session.commit()
+            return True
+        except Exception as e:
+            self.session.rollback()
+            logger.error("保存条款勾选变更失败：%s", e)
+            return False
+
+    def _query_versions_as_of(self, as_of, policy_id=None):
+        """执行时间点查询，返回 {UUID: (版本ID, 版本号)}（版本ID属于本数据库）"""
+        condition = AS_OF_POLICY_CONDITION if policy_id is not None else ''
+        statement = text(AS_OF_VERSIONS_SQL.format(condition=condition)).bindparams(
+            bindparam('as_of', type_=DateTime)
+        )
+        params = {'as_of': as_of}
+        if policy_id is not None:
+            params['policy_id'] = policy_id
+        return {
+            row.clause_uuid: (row.id, row.version_number)
+            for row in self.session.execute(statement, params)
+        }
+
+    @timed('db.get_versions_as_of')
+    def get_versions_as_of(self, as_of, policy_id=None):
+        """获取各条款在 as_of（UTC）时的版本号 {UUID: 版本号}
+
+        policy_id 为 None 时解析全部条款（使用共享条款库时包括尚未复制到项目中的条款），
+        否则只解析该方案绑定的条款。as_of 之后才创建的条款不在结果中。
+        """
+        versions = {
+            uuid: version_number
+            for uuid, (_, version_number) in self._query_versions_as_of(as_of, policy_id).items()
+        }
+        if policy_id is None and self.library is not None:
+            for uuid, version_number in self.library.get_versions_as_of(as_of).items():
+                versions.setdefault(uuid, version_number)
+        return versions
+
+    @timed('db.rebind_policy_as_of')
+    def rebind_policy_as_of(self, policy_id, as_of):
+        """把方案的全部条款绑定改为 as_of（UTC）时的版本，在一个事务中完成
+
+        返回 (改绑数量, as_of 时尚不存在、保持原绑定的条款UUID列表)。
+        """
+        try:
+            targets = self._query_versions_as_of(as_of, policy_id)
+            bindings = self.session.query(
+                PolicyClauseVersion.id, PolicyClauseVersion.clause_version_id, ClauseVersion.clause_uuid
+            ).join(
+                ClauseVersion, ClauseVersion.id == PolicyClauseVersion.clause_version_id
+            ).filter(PolicyClauseVersion.policy_id == policy_id).all()
+            
+            changes = []
+            missing = []
+            for binding_id, clause_version_id, clause_uuid in bindings:
+                target = targets.get(clause_uuid)
+                if target is None:
+                    missing.append(clause_uuid)
+                elif target[0] != clause_version_id:
+                    changes.append({'id': binding_id, 'clause_version_id': target[0]})
+            
+            if changes:
+                self.session.execute(update(PolicyClauseVersion), changes)
+            self.session.commit()
+            return len(changes), missing
+        except Exception as e:
+            self.session.rollback()
+            logger.error("按时间点改绑方案条款失败：%s", e)
+            raise
+
+    @timed('db.refresh_clause_signatures')
+    def refresh_clause_signatures(self):
+        """为新增或正文变化的有效条款计算 MinHash 签名，删除已失效条款的签名，返回重新计算的数量"""
+        if self.library is not None:
+            return self.library.refresh_clause_signatures()
+
+        stored = dict(self.session.query(ClauseSignature.clause_uuid, ClauseSignature.content_hash))
+        active = set()
+        pending = []
+        for row in self.iter_catalog_rows():
+            clause_uuid, content = row[0], row[2] or ''
+            active.add(clause_uuid)
+            content_hash = content_digest(content)
+            if stored.get(clause_uuid) != content_hash:
+                pending.append((clause_uuid, content_hash, content))
+        stale = [clause_uuid for clause_uuid in stored if clause_uuid not in active]
+        if not pending and not stale:
+            return 0
+
+        try:
+            signatures = minhash_signatures([content for _, _, content in pending])
+            now = datetime.utcnow()
+            if pending:
+                self.session.execute(insert(ClauseSignature).prefix_with('OR REPLACE'), [
+                    {'clause_uuid': clause_uuid, 'content_hash': content_hash,
+                     'signature': signature.tobytes(), 'updated_at': now}
+                    for (clause_uuid, content_hash, _), signature in zip(pending, signatures)
+                ])
+            for start in range(0, len(stale), IN_QUERY_BATCH):
+                self.session.query(ClauseSignature).filter(
+                    ClauseSignature.clause_uuid.in_(stale[start:start + IN_QUERY_BATCH])
+                ).delete(synchronize_session=False)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error("更新条款签名失败：%s", e)
+            raise
+        logger.info("已更新 %d 个条款签名，删除 %d 个", len(pending), len(stale))
+        return len(pending)
+
+    @timed('db.find_duplicate_clusters')
+    def find_duplicate_clusters(self, threshold=DUPLICATE_THRESHOLD):
+        """查找正文近似重复的条款簇（按条款数降序）
+
+        每簇是条款信息字典的列表，字段为 UUID、扩展条款标题、险种、保险公司、年度版本和标准条款。
+        """
+        if self.library is not None:
+            return self.library.find_duplicate_clusters(threshold)
+
+        self.refresh_clause_signatures()
+        rows = self.session.query(ClauseSignature.clause_uuid, ClauseSignature.signature).all()
+        if not rows:
+            return []
+        uuids = [clause_uuid for clause_uuid, _ in rows]
+        clusters = [
+            [uuids[i] for i in members]
+            for members in find_clusters(signatures_from_bytes([signature for _, signature in rows]), threshold)
+        ]
+
+        details = {}
+        members = [clause_uuid for cluster in clusters for clause_uuid in cluster]
+        for start in range(0, len(members), IN_QUERY_BATCH):
+            for clause_uuid, title, insurance_type, company, version, canonical_uuid in self.session.execute(
+                DUPLICATE_DETAILS_SQL, {'uuids': members[start:start + IN_QUERY_BATCH]}
+            ):
+                details[clause_uuid] = {
+                    'UUID': clause_uuid,
+                    '扩展条款标题': title,
+                    '险种': insurance_type,
+                    '保险公司': company,
+                    '年度版本': version,
+                    '标准条款': canonical_uuid
+                }
+        return [[details[clause_uuid] for clause_uuid in cluster if clause_uuid in details] for cluster in clusters]
+
+    def set_canonical_clause(self, canonical_uuid, duplicate_uuids):
+        """把近似重复的条款关联到标准条款，已关联到这些条款的也改为关联到标准条款"""
+        if self.library is not None:
+            return self.library.set_canonical_clause(canonical_uuid, duplicate_uuids)
+
+        duplicate_uuids = [clause_uuid for clause_uuid in duplicate_uuids if clause_uuid != canonical_uuid]
+        try:
+            self.session.query(Clause).filter(Clause.uuid == canonical_uuid).update(
+                {Clause.canonical_uuid: None}, synchronize_session=False
+            )
+            for start in range(0, len(duplicate_uuids), IN_QUERY_BATCH):
+                batch = duplicate_uuids[start:start + IN_QUERY_BATCH]
+                self.session.query(Clause).filter(
+                    Clause.uuid.in_(batch) | Clause.canonical_uuid.in_(batch)
+                ).update({Clause.canonical_uuid: canonical_uuid}, synchronize_session=False)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error("关联标准条款失败：%s", e)
+            raise
+
+    def clear_canonical_clause(self, clause_uuids):
+        """解除条款与标准条款的关联"""
+        if self.library is not None:
+            return self.library.clear_canonical_clause(clause_uuids)
+
+        clause_uuids = list(clause_uuids)
+        try:
+            for start in range(0, len(clause_uuids), IN_QUERY_BATCH):
+                self.session.query(Clause).filter(
+                    Clause.uuid.in_(clause_uuids[start:start + IN_QUERY_BATCH])
+                ).update({Clause.canonical_uuid: None}, synchronize_session=False)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error("解除标准条款关联失败：%s", e)
+            raise
+
+    @timed('db.get_co_selected_clauses')
+    def get_co_selected_clauses(self, clause_uuids, limit=10):
+        """统计各保险方案中与给定条款一起选择的其他条款，返回 [(条款UUID, 共同出现的方案数)]"""
+        clause_uuids = list(clause_uuids)
+        if not clause_uuids:
+            return []
+        if len(clause_uuids) <= IN_QUERY_BATCH:
+            rows = self.session.execute(CO_SELECTED_SQL, {'uuids': clause_uuids, 'limit': limit})
+            return [(clause_uuid, policies) for clause_uuid, policies in rows]
+        
+        # 同一方案可能包含不同批次中的条款，不能直接累加各批的方案数；
+        # 先汇总包含给定条款的方案，再按方案分批计数，各批方案互不重叠，计数可以相加
+        policy_ids = set()
+        for start in range(0, len(clause_uuids), IN_QUERY_BATCH):
+            policy_ids.update(row[0] for row in self.session.execute(
+                CO_SELECTED_POLICIES_SQL, {'uuids': clause_uuids[start:start + IN_QUERY_BATCH]}
+            ))
+        policy_ids = sorted(policy_ids)
+        selected = set(clause_uuids)
+        counts = defaultdict(int)
+        for start in range(0, len(policy_ids), IN_QUERY_BATCH):
+            for clause_uuid, policies in self.session.execute(
+                CO_SELECTED_COUNTS_SQL, {'policy_ids': policy_ids[start:start + IN_QUERY_BATCH]}
+            ):
+                if clause_uuid not in selected:
+                    counts[clause_uuid] += policies
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    @timed('db.get_policy_clause_uuids')
     def get_policy_clause_uuids(self, policy_id):
         """获取保险方案关联的所有条款UUID"""
         print(f"获取保险方案条款，保险方案ID：{policy_id}")
-        policy_clauses = self.session.query(PolicyClauseVersion).filter_by(
-            policy_id=policy_id
-        ).join(ClauseVersion).all()
-        
-        uuids = [pc.clause_version.clause_uuid for pc in policy_clauses]
+        uuids = [clause_uuid for clause_uuid, _ in self.get_policy_clause_bindings(policy_id)]
         print(f"找到关联条款数量：{len(uuids)}")
         return uuids
@@ -1,32 +1,49 @@
 import streamlit as st
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 import io
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from .perf import timed
+
+logger = logging.getLogger(__name__)
+
+# python-docx 只在生成 Word 文档时才导入，Markdown 预览和应用启动不需要加载它
+
+# 扩展条款少于此数量时在当前进程中生成，启动进程池不划算
+PARALLEL_MIN_CLAUSES = 300
+
+# 每个分片的条款数量下限
+SHARD_MIN_CLAUSES = 100
+
+# 进程池大小，默认取CPU核数（最多8个），可通过环境变量调整
+DOCX_WORKERS = int(os.environ.get('POLICYMAKER_DOCX_WORKERS', min(os.cpu_count() or 1, 8)))
+
+_pools = {}
+_pools_lock = threading.Lock()
 
 def create_element(name):
     """创建XML元素"""
+    from docx.oxml import OxmlElement
     return OxmlElement(name)
 
 def create_attribute(element, name, value):
     """创建XML属性"""
+    from docx.oxml.ns import qn
     element.set(qn(name), value)
 
-def add_bookmark(paragraph, bookmark_name):
-    """添加书签"""
-    run = paragraph.add_run()
+def add_bookmark(paragraph, bookmark_name, bookmark_id):
+    """添加书签，bookmark_id 在文档内必须唯一"""
     tag = create_element('w:bookmarkStart')
-    create_attribute(tag, 'w:id', '0')
+    create_attribute(tag, 'w:id', str(bookmark_id))
     create_attribute(tag, 'w:name', bookmark_name)
-    run._r.append(tag)
+    paragraph._p.append(tag)
     
     tag = create_element('w:bookmarkEnd')
-    create_attribute(tag, 'w:id', '0')
-    run._r.append(tag)
-    
-    return run
+    create_attribute(tag, 'w:id', str(bookmark_id))
+    paragraph._p.append(tag)
 
 def add_hyperlink(paragraph, text, bookmark_name):
     """添加超链接"""
@@ -50,6 +67,87 @@ def add_hyperlink(paragraph, text, bookmark_name):
     
     paragraph._p.append(hyperlink)
 
+def render_clause_shard(start, clauses):
+    """在独立的文档中生成一段扩展条款的目录项和正文，返回序列化的段落XML
+
+    start 为第一个条款的序号，clauses 为 (标题, 正文) 列表。
+    在进程池中执行，返回值只包含字节串，合并时按分片顺序插入。
+    """
+    from docx import Document
+    from lxml import etree
+    
+    doc = Document()
+    # 样式ID只解析一次，逐段按名称查找样式的开销与条款正文的生成相当
+    heading_style_id = doc.styles['Heading 3'].style_id
+    
+    def serialize(paragraph):
+        # 序列化后从临时文档中移除，避免 add_paragraph 随文档变长而变慢
+        xml = etree.tostring(paragraph._p)
+        paragraph._p.getparent().remove(paragraph._p)
+        return xml
+    
+    toc, body = [], []
+    for i, (title, content) in enumerate(clauses, start):
+        # 目录项和超链接
+        paragraph = doc.add_paragraph()
+        add_hyperlink(paragraph, f"{i}. {title}", f"clause_{i}")
+        toc.append(serialize(paragraph))
+        
+        # 条款标题（带书签，书签ID取条款序号）
+        paragraph = doc.add_paragraph()
+        add_bookmark(paragraph, f"clause_{i}", i)
+        paragraph.add_run(f"{i}. {title}")
+        paragraph._p.style = heading_style_id  # 使用三级标题
+        body.append(serialize(paragraph))
+        
+        # 条款内容（移除换行符）
+        body.append(serialize(doc.add_paragraph(content.replace('\n', ' ').strip())))
+    return toc, body
+
+def _shard_pool(workers):
+    """获取指定大小的进程池，同一进程内复用"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Streamlit 在多线程中运行脚本，fork 可能复制被占用的锁，使用 spawn 启动子进程
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pools[workers] = pool
+        return pool
+
+def _discard_pool(workers):
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def render_clause_shards(selected_clauses, workers=None):
+    """分片生成扩展条款，按条款顺序返回 (目录段落列表, 正文段落列表)"""
+    workers = DOCX_WORKERS if workers is None else workers
+    items = [(clause['扩展条款标题'], clause['扩展条款正文']) for clause in selected_clauses]
+    if workers <= 1 or len(items) < PARALLEL_MIN_CLAUSES:
+        return render_clause_shard(1, items)
+    
+    # 每个进程分到若干个分片，分片边界只取决于条款数量和进程数，结果与串行生成相同
+    shard_size = max(SHARD_MIN_CLAUSES, -(-len(items) // (workers * 4)))
+    starts = list(range(0, len(items), shard_size))
+    try:
+        results = list(_shard_pool(workers).map(
+            render_clause_shard,
+            [start + 1 for start in starts],
+            [items[start:start + shard_size] for start in starts]
+        ))
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("进程池生成扩展条款失败，改为在当前进程中生成：%s", e)
+        _discard_pool(workers)
+        return render_clause_shard(1, items)
+    
+    toc, body = [], []
+    for shard_toc, shard_body in results:
+        toc.extend(shard_toc)
+        body.extend(shard_body)
+    return toc, body
+
+@timed('doc.generate_markdown')
 def generate_markdown(insurance_data, selected_clauses):
     """生成带目录和跳转的Markdown格式保险方案"""
     markdown = f"""# 保险方案
@@ -131,8 +229,14 @@ def generate_markdown(insurance_data, selected_clauses):
     
     return markdown
 
-def generate_docx(insurance_data, selected_clauses):
-    """生成带目录的DOCX格式保险方案"""
+@timed('doc.generate_docx')
+def generate_docx(insurance_data, selected_clauses, workers=None):
+    """生成带目录的DOCX格式保险方案，扩展条款较多时在进程池中分片生成"""
+    from docx import Document
+    from docx.shared import Pt
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import qn
+    
     doc = Document()
     
     # 设置默认字体为仿宋
@@ -260,28 +364,21 @@ def generate_docx(insurance_data, selected_clauses):
         for i, term in enumerate(insurance_data['special_terms'], 1):
             doc.add_paragraph(f"{i}. {term}")
     
+    # 扩展条款的目录项和正文分片生成，再按顺序插入文档
+    toc, body = render_clause_shards(selected_clauses, workers)
+    
     # 扩展条款目录
     doc.add_heading('扩展条款目录', level=2)  # 改为二级标题
-    for i, clause in enumerate(selected_clauses, 1):
-        paragraph = doc.add_paragraph()
-        # 添加目录项和超链接
-        add_hyperlink(paragraph, f"{i}. {clause['扩展条款标题']}", f"clause_{i}")
+    for xml in toc:
+        doc.element.body.sectPr.addprevious(parse_xml(xml))
     
     # 添加分页符
     doc.add_page_break()
     
     # 扩展条款
     doc.add_heading('扩展条款', level=2)  # 改为二级标题
-    for i, clause in enumerate(selected_clauses, 1):
-        # 添加条款标题（带书签）
-        paragraph = doc.add_paragraph()
-        add_bookmark(paragraph, f"clause_{i}")
-        paragraph.add_run(f"{i}. {clause['扩展条款标题']}")
-        paragraph.style = 'Heading 3'  # 使用三级标题
-        
-        # 添加条款内容（移除换行符）
-        content = clause['扩展条款正文'].replace('\n', ' ').strip()
-        doc.add_paragraph(content)
+    for xml in body:
+        doc.element.body.sectPr.addprevious(parse_xml(xml))
     
     # 保存文档到内存
     docx_buffer = io.BytesIO()
@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .clause_snapshot import load_catalog, snapshot_path
+from .fuzzy_search import build_fuzzy_index
+from .perf import span, timed
+
+# 条款列表中提供分面筛选的列
+FACET_COLUMNS = ['险种', '保险公司', '年度版本']
+
+# 每个索引缓存的搜索结果数量
+SEARCH_CACHE_SIZE = 32
+
+# 进程内的分面索引：快照路径 -> FacetIndex，条款库 DataFrame 变化（修订号变化）时重建
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _popcount_rows(bitmaps):
+    """统计二维位图每一行中置位的数量"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bitmaps).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(bitmaps, axis=1).sum(axis=1, dtype=np.int64)
+
+class FacetIndex:
+    """条款库的分面索引
+
+    每个分面列用 pd.factorize 编码，每个取值保存一个按位压缩的位图（np.packbits）。
+    同一分面内选中的取值按位或，不同分面之间以及与搜索结果之间按位与；
+    每个选项的计数是该取值的位图与其他条件交集的置位数量。
+    搜索使用容错的模糊索引（见 fuzzy_search），在第一次搜索时构建，
+    并复用上一个索引（previous）的切分结果。
+    """
+
+    def __init__(self, df, columns=FACET_COLUMNS, previous=None):
+        self.df = df
+        self.size = len(df)
+        self.columns = [col for col in columns if col in df.columns]
+        self._values = {}
+        self._positions = {}
+        self._bitmaps = {}
+        for col in self.columns:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            values = [str(value) for value in uniques]
+            self._values[col] = values
+            self._positions[col] = {value: i for i, value in enumerate(values)}
+            bitmaps = np.zeros((len(values), (self.size + 7) // 8), dtype=np.uint8)
+            for i in range(len(values)):
+                bitmaps[i] = np.packbits(codes == i)
+            self._bitmaps[col] = bitmaps
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self._search_cache = OrderedDict()
+        self._search_lock = threading.Lock()
+        self._fuzzy = None
+        # 只保留上一个模糊索引，不保留上一个条款库 DataFrame
+        self._previous_fuzzy = previous.fuzzy_source() if previous is not None else None
+
+    def fuzzy_source(self):
+        """可供下一个索引复用的模糊索引（尚未构建时沿用更早的）"""
+        return self._fuzzy or self._previous_fuzzy
+
+    def fuzzy_index(self):
+        """模糊搜索索引，首次使用时构建"""
+        if self._fuzzy is None:
+            with span('catalog.build_fuzzy_index'):
+                self._fuzzy = build_fuzzy_index(self.df, self._previous_fuzzy)
+            self._previous_fuzzy = None
+        return self._fuzzy
+
+    def options(self, col):
+        """分面列的所有取值（已排序）"""
+        return self._values.get(col, [])
+
+    def _facet_bitmap(self, col, selected):
+        """一个分面中选中取值的并集，未选择时为 None（不限制）"""
+        rows = [self._positions[col][value] for value in selected if value in self._positions[col]]
+        if not selected:
+            return None
+        if not rows:
+            return np.zeros_like(self._all)
+        return np.bitwise_or.reduce(self._bitmaps[col][rows], axis=0)
+
+    def search(self, term):
+        """容错搜索标题、拼音首字母和全拼，返回 (匹配条款的位图, 按相关度排序的行位置)，结果按搜索词缓存"""
+        term = (term or '').strip().lower()
+        if not term:
+            return None, None
+        with self._search_lock:
+            cached = self._search_cache.get(term)
+            if cached is not None:
+                self._search_cache.move_to_end(term)
+                return cached
+        ranked, _ = self.fuzzy_index().search(term)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[ranked] = True
+        result = (np.packbits(mask), ranked)
+        with self._search_lock:
+            self._search_cache[term] = result
+            while len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return result
+
+    def search_bitmap(self, term):
+        """搜索结果的位图，未输入搜索词时为 None"""
+        return self.search(term)[0]
+
+    def _combine(self, bitmaps):
+        result = self._all
+        for bitmap in bitmaps:
+            if bitmap is not None:
+                result = result & bitmap
+        return result
+
+    def filter(self, selections, search_bitmap=None, ranked=None):
+        """按分面选择和搜索结果筛选，返回 (匹配行的位置数组, {分面列: 各选项的计数数组})
+
+        计数与 options(col) 对齐，是在其他分面条件和搜索结果下选择该取值时的匹配数量。
+        给出 ranked（搜索结果按相关度排序的行位置）时，匹配行按该顺序返回，否则按行顺序。
+        """
+        facet_bitmaps = {col: self._facet_bitmap(col, selections.get(col) or []) for col in self.columns}
+        counts = {}
+        for col in self.columns:
+            others = self._combine(
+                [bitmap for other, bitmap in facet_bitmaps.items() if other != col] + [search_bitmap]
+            )
+            counts[col] = _popcount_rows(self._bitmaps[col] & others)
+        matched = self._combine(list(facet_bitmaps.values()) + [search_bitmap])
+        matched = np.unpackbits(matched, count=self.size).astype(bool)
+        positions = ranked[matched[ranked]] if ranked is not None else np.flatnonzero(matched)
+        return positions, counts
+
+@timed('catalog.load_facet_index')
+def load_facet_index(db):
+    """获取当前条款库的分面索引，条款库未变化时复用已建好的索引"""
+    df = load_catalog(db)
+    path = snapshot_path(db.db_path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+    if index is not None and index.df is df:
+        return index
+    index = FacetIndex(df, previous=index)
+    with _indexes_lock:
+        _indexes[path] = index
+    return index
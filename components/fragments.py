@@ -0,0 +1,13 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+def in_fragment_rerun():
+    """当前是否为片段单独重跑（整页运行时片段函数也会执行，但不算片段重跑）"""
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and getattr(ctx, 'fragment_ids_this_run', None))
+
+def rerun_fragment():
+    """只重跑当前片段；整页运行中（首次渲染、AppTest 等）无法限定范围，退回整页重跑"""
+    if in_fragment_rerun():
+        st.rerun(scope="fragment")
+    st.rerun()
@@ -0,0 +1,140 @@
+import threading
+import numpy as np
+
+# 模糊匹配的列，顺序即同等距离下的排序优先级（标题优先）
+FUZZY_COLUMNS = ['扩展条款标题', 'PINYIN', 'QUANPIN']
+
+# 允许的最大编辑次数：搜索词每 4 个字符允许 1 处错误，且不超过该值
+MAX_EDITS = 3
+
+def allowed_edits(term):
+    """搜索词允许的编辑距离"""
+    return min(len(term) // 4, MAX_EDITS)
+
+def bigrams(text):
+    """文本中所有不同的二元组（相邻两个字符）"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def substring_distances(pattern, texts, k):
+    """模式与每个文本中最相近子串的编辑距离（Sellers 算法），超过 k 的记为 k + 1
+
+    动态规划按文本列推进，每一步对所有候选文本向量化计算；
+    第 0 行恒为 0，即匹配可以从文本任意位置开始。文本用 0 补齐到相同长度，
+    补齐字符与模式不相等，不会得到比真实子串更小的距离。
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.int16)
+    codes = np.array(texts, dtype=str)
+    codes = codes.view(np.uint32).reshape(len(texts), -1)
+    pattern_codes = [ord(char) for char in pattern]
+    cap = k + 1
+    m = len(pattern_codes)
+    # column[i] 为模式前 i 个字符与以当前列结尾的子串的最小编辑距离，按 k + 1 截断
+    column = np.minimum(np.arange(m + 1, dtype=np.int16), cap)[:, None].repeat(len(texts), axis=1)
+    best = column[m].copy()
+    for j in range(codes.shape[1]):
+        chars = codes[:, j]
+        previous = column
+        column = np.empty_like(previous)
+        column[0] = 0
+        for i in range(1, m + 1):
+            cost = previous[i - 1] + (chars != pattern_codes[i - 1])
+            np.minimum(cost, previous[i] + 1, out=cost)
+            np.minimum(cost, column[i - 1] + 1, out=cost)
+            np.minimum(cost, cap, out=column[i])
+        np.minimum(best, column[m], out=best)
+        if not best.any():
+            break
+    return best
+
+class FuzzyIndex:
+    """条款标题、拼音首字母和全拼的容错搜索索引
+
+    每个（行, 列）文本是一个文档，文档 ID 为 列序号 * 行数 + 行位置。
+    二元组倒排表以 CSR 形式保存（indptr + 文档 ID 数组）。查询时按 q-gram 计数引理过滤：
+    一处编辑最多破坏 2 个二元组，编辑距离不超过 k 的子串至少包含搜索词中
+    不同二元组数量 - 2k 个；只有达到该数量的候选文档才用 Sellers 算法验证。
+
+    文本到二元组 ID 的映射按文本内容缓存，条款库变化后用上一个索引构建，
+    只有新增或修改过的文本需要重新切分。
+    """
+
+    def __init__(self, df, previous=None):
+        self.size = len(df)
+        self.columns = [col for col in FUZZY_COLUMNS if col in df.columns]
+        self._vocab = dict(previous._vocab) if previous is not None else {}
+        previous_tokens = previous._tokens if previous is not None else {}
+        self._tokens = {}
+        self._texts = []
+        doc_tokens = []
+        for col in self.columns:
+            texts = df[col].fillna('').astype(str).str.lower().tolist()
+            self._texts.extend(texts)
+            for text in texts:
+                tokens = self._tokens.get(text)
+                if tokens is None:
+                    tokens = previous_tokens.get(text)
+                    if tokens is None:
+                        ids = {self._vocab.setdefault(gram, len(self._vocab)) for gram in bigrams(text)}
+                        tokens = np.fromiter(ids, dtype=np.int32, count=len(ids))
+                    self._tokens[text] = tokens
+                doc_tokens.append(tokens)
+        lengths = np.fromiter((len(tokens) for tokens in doc_tokens), dtype=np.int64, count=len(doc_tokens))
+        grams = np.concatenate(doc_tokens) if doc_tokens else np.zeros(0, dtype=np.int32)
+        docs = np.repeat(np.arange(len(doc_tokens), dtype=np.int32), lengths)
+        order = np.argsort(grams, kind='stable')
+        self._postings = docs[order]
+        self._indptr = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(grams, minlength=len(self._vocab)), out=self._indptr[1:])
+
+    def search(self, term):
+        """返回 (按相关度排序的行位置数组, 对应的编辑距离数组)
+
+        排序依次按编辑距离、匹配列（标题、拼音首字母、全拼）和行位置。
+        搜索词不足 2 个字符时没有二元组可用，按精确子串匹配。
+        """
+        term = term.lower()
+        if len(term) < 2:
+            matched = np.zeros(len(self._texts), dtype=bool)
+            if term:
+                matched = np.fromiter((term in text for text in self._texts), dtype=bool, count=len(self._texts))
+            return self._rank(np.flatnonzero(matched), np.zeros(int(matched.sum()), dtype=np.int16))
+
+        term_ids = [self._vocab[gram] for gram in bigrams(term) if gram in self._vocab]
+        distinct = len(bigrams(term))
+        # 至少要求一个二元组命中，否则候选集退化为全部文档
+        k = min(allowed_edits(term), (distinct - 1) // 2)
+        threshold = distinct - 2 * k
+        if len(term_ids) < threshold:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16)
+        hits = np.concatenate([self._postings[self._indptr[i]:self._indptr[i + 1]] for i in term_ids])
+        candidates = np.flatnonzero(np.bincount(hits, minlength=len(self._texts)) >= threshold)
+        texts = [self._texts[doc] for doc in candidates]
+        # 精确包含搜索词的文本距离为 0，其余的才需要动态规划验证
+        exact = np.fromiter((term in text for text in texts), dtype=bool, count=len(texts))
+        distances = np.zeros(len(texts), dtype=np.int16)
+        fuzzy = np.flatnonzero(~exact)
+        distances[fuzzy] = substring_distances(term, [texts[i] for i in fuzzy], k)
+        keep = distances <= k
+        return self._rank(candidates[keep], distances[keep])
+
+    def _rank(self, docs, distances):
+        """文档合并为行：每行取最小的（编辑距离, 列序号），再排序"""
+        if not len(docs):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16)
+        rows = docs % self.size
+        fields = docs // self.size
+        order = np.lexsort((fields, distances, rows))
+        rows, fields, distances = rows[order], fields[order], distances[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        rows, fields, distances = rows[first], fields[first], distances[first]
+        order = np.lexsort((rows, fields, distances))
+        return rows[order], distances[order]
+
+_build_lock = threading.Lock()
+
+def build_fuzzy_index(df, previous=None):
+    """构建模糊搜索索引，同一时间只构建一个（复用上一个索引的切分结果）"""
+    with _build_lock:
+        return FuzzyIndex(df, previous)
@@ -0,0 +1,245 @@
+import streamlit as st
+import os
+import shutil
+import time
+import logging
+import sqlite3
+import threading
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, text, bindparam
+from sqlalchemy.pool import NullPool
+from .database import Database, ACTIVE_JOB_STATUSES
+from .perf import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# 任务类型的显示名称
+JOB_KIND_LABELS = {
+    'import': '条款导入',
+    'export': '条款库导出',
+    'generate': '方案生成'
+}
+
+# 任务状态的显示名称
+JOB_STATUS_LABELS = {
+    'queued': '⏳ 排队中',
+    'running': '🔄 运行中',
+    'succeeded': '✅ 已完成',
+    'failed': '❌ 失败'
+}
+
+# 任务面板轮询时读取的任务字段
+_JOB_STATUS_SQL = text("""
+    SELECT job_id, kind, status, progress, message, result_path
+    FROM background_jobs WHERE job_id IN :job_ids
+""").bindparams(bindparam('job_ids', expanding=True))
+
+# 任务状态轮询使用的只读引擎：数据库路径 -> 引擎
+_status_engines = {}
+_status_engines_lock = threading.Lock()
+
+def _status_engine(db_path):
+    """每个数据库共用一个只读引擎轮询任务状态
+
+    不保留连接池，每次轮询重新打开连接，数据库文件被导入的数据库替换后也能读到新文件。
+    """
+    path = os.path.abspath(db_path)
+    with _status_engines_lock:
+        engine = _status_engines.get(path)
+        if engine is None:
+            uri = f"file:{quote(path)}?mode=ro"
+            engine = create_engine(
+                'sqlite://',
+                creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+                poolclass=NullPool
+            )
+            instrument_engine(engine)
+            _status_engines[path] = engine
+        return engine
+
+def load_jobs(db_path, job_ids):
+    """按 job_ids 的顺序读取任务状态，跳过不存在的任务"""
+    with _status_engine(db_path).connect() as conn:
+        rows = {row.job_id: row for row in conn.execute(_JOB_STATUS_SQL, {'job_ids': list(job_ids)})}
+    return [rows[job_id] for job_id in job_ids if job_id in rows]
+
+def job_dir(db_path):
+    """任务文件目录（上传的原始文件和任务结果）"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'jobs')
+
+class JobReporter:
+    """任务进度上报，限制写库频率"""
+
+    def __init__(self, db, job_id, min_interval=0.5):
+        self.db = db
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.summary = None
+        self._last_report = 0.0
+
+    def update(self, done, fraction=None, message=None):
+        """上报进度，可直接用作 ClauseImporter 的 progress_callback"""
+        now = time.monotonic()
+        if now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+        fields = {'message': message or f"已处理 {done} 条"}
+        if fraction is not None:
+            fields['progress'] = fraction
+        self.db.update_job(self.job_id, **fields)
+
+class JobManager:
+    """进程级后台任务管理器
+
+    每个被写入的数据库只分配一个单线程执行器，同一数据库的任务依次执行，保证只有一个后台写入者。
+    使用共享条款库的项目，导入等任务写入的是条款库，因此共用条款库的执行器。
+    任务状态和进度保存在项目数据库的 background_jobs 表中，界面通过轮询读取。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(JobManager, cls).__new__(cls)
+                cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """初始化执行器表"""
+        self._executors = {}
+        self._adopted_projects = set()
+        self._executors_lock = threading.Lock()
+
+    def _executor_for(self, db):
+        """获取任务写入的数据库（有共享条款库时为条款库）对应的单线程执行器"""
+        project_path = os.path.abspath(db.db_path)
+        key = os.path.abspath(db.library.db_path) if db.library is not None else project_path
+        with self._executors_lock:
+            if project_path not in self._adopted_projects:
+                # 本进程首次接管该项目，之前遗留的未完成任务已无人执行
+                db.fail_interrupted_jobs()
+                self._adopted_projects.add(project_path)
+            executor = self._executors.get(key)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='policymaker-job')
+                self._executors[key] = executor
+            return executor
+
+    def submit(self, db_path, kind, func, dedupe_key=None, **kwargs):
+        """提交后台任务，返回任务ID
+
+        func(db, reporter, **kwargs) 在后台线程中执行，返回值作为结果文件路径。
+        相同 kind 和 dedupe_key 的任务尚未结束时，直接返回已有任务的ID。
+        """
+        db = Database(db_path)
+        try:
+            executor = self._executor_for(db)
+            if dedupe_key:
+                active = db.find_active_job(kind, dedupe_key)
+                if active:
+                    return active.job_id
+            job_id = db.create_job(kind, dedupe_key).job_id
+        finally:
+            db.session.close()
+
+        executor.submit(self._run, db_path, job_id, func, kwargs)
+        return job_id
+
+    def _run(self, db_path, job_id, func, kwargs):
+        """在后台线程中执行任务并记录结果"""
+        db = Database(db_path)
+        try:
+            db.update_job(job_id, status='running', message='任务开始执行')
+            reporter = JobReporter(db, job_id)
+            result_path = func(db, reporter, **kwargs)
+            db.update_job(job_id, status='succeeded', progress=1.0, result_path=result_path,
+                          message=reporter.summary or '任务已完成')
+        except Exception as e:
+            logger.exception("后台任务 %s 执行失败", job_id)
+            db.session.rollback()
+            db.update_job(job_id, status='failed', message=str(e))
+        finally:
+            db.session.close()
+
+def run_import_job(db, reporter, file_path, file_name, force=False):
+    """后台任务：流式导入条款文件"""
+    from .clause_importer import ClauseImporter
+
+    importer = ClauseImporter(db)
+    with open(file_path, 'rb') as f:
+        new_count, update_count = importer.run(f, file_name, progress_callback=reporter.update, force=force)
+    reporter.summary = f"新增 {new_count} 条，更新 {update_count} 条"
+    if importer.skipped_rows:
+        reporter.summary += f"，跳过已导入的 {importer.skipped_rows} 行"
+    return None
+
+def run_export_job(db, reporter, output_path):
+    """后台任务：导出整个条款库为XLSX"""
+    with db.export_clauses('xlsx') as output, open(output_path, 'wb') as f:
+        shutil.copyfileobj(output, f)
+    return output_path
+
+def run_generate_job(db, reporter, insurance_data, selected_clauses, format, output_path, policy_id=None):
+    """后台任务：生成保险方案文档，指定 policy_id 时条款顺序以数据库中的方案为准"""
+    from .document_generator import generate_document
+    from .selected_clauses import order_by_policy
+
+    if policy_id is not None:
+        selected_clauses = order_by_policy(db, policy_id, selected_clauses)
+    document = generate_document(insurance_data, selected_clauses, format)
+    if format == 'markdown':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(document)
+    else:
+        with open(output_path, 'wb') as f:
+            f.write(document.read())
+    return output_path
+
+def submit_job(db_path, kind, func, dedupe_key=None, **kwargs):
+    """提交后台任务并记录到当前会话，便于界面轮询"""
+    job_id = JobManager().submit(db_path, kind, func, dedupe_key=dedupe_key, **kwargs)
+    if 'job_ids' not in st.session_state:
+        st.session_state.job_ids = []
+    if job_id not in st.session_state.job_ids:
+        st.session_state.job_ids.append(job_id)
+    return job_id
+
+@st.fragment(run_every=2)
+def render_job_status(db_path, key_prefix):
+    """轮询显示当前会话提交的后台任务
+
+    同一次运行中可能在多个页面各显示一次，key_prefix 用于区分各处的组件 key。
+    """
+    job_ids = st.session_state.get('job_ids', [])
+    if not job_ids:
+        return
+
+    # 每 2 秒轮询一次，使用共用的只读引擎，不为每次轮询新建数据库连接和会话
+    jobs = load_jobs(db_path, job_ids)
+    if not jobs:
+        return
+
+    st.markdown("### 🛠️ 后台任务")
+    for job in reversed(jobs):
+        label = f"{JOB_KIND_LABELS.get(job.kind, job.kind)} · {JOB_STATUS_LABELS.get(job.status, job.status)}"
+        if job.status in ACTIVE_JOB_STATUSES:
+            st.progress(min(job.progress or 0.0, 1.0), text=f"{label}：{job.message or ''}")
+        elif job.status == 'failed':
+            st.error(f"{label}：{job.message}")
+        else:
+            st.success(f"{label}：{job.message or ''}")
+            if job.result_path and os.path.exists(job.result_path):
+                with open(job.result_path, 'rb') as f:
+                    st.download_button(
+                        "⬇️ 下载任务结果",
+                        f.read(),
+                        file_name=os.path.basename(job.result_path),
+                        key=f"{key_prefix}_job_download_{job.job_id}"
+                    )
+
+    if st.button("🧹 清除已结束的任务", key=f"{key_prefix}_clear_finished_jobs"):
+        finished = {job.job_id for job in jobs if job.status not in ACTIVE_JOB_STATUSES}
+        st.session_state.job_ids = [job_id for job_id in job_ids if job_id not in finished]
+        st.rerun(scope="fragment")
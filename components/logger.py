@@ -1,70 +1,126 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+
+# 日志目录和文件
+LOG_DIR = 'logs'
+LOG_FILE = 'default.log'
+
+# 需要接入日志管道的记录器：Logger 单例本身和 components 包下各模块的 logging.getLogger(__name__)
+PIPELINE_LOGGERS = ('PolicyMaker', 'components')
+
+# 默认日志级别为 INFO，调试内容默认不输出
+DEFAULT_LEVEL = 'INFO'
+
+def _parse_module_levels(spec):
+    """解析按模块配置的日志级别，格式：components.version_manager=DEBUG,components.database=WARNING"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def _create_file_handler(log_path):
+    """创建带轮转的文件处理器
+
+    POLICYMAKER_LOG_ROTATION=size（默认）按大小轮转，由 POLICYMAKER_LOG_MAX_MB 控制单个文件大小；
+    POLICYMAKER_LOG_ROTATION=time 每天零点轮转。两种方式都保留 POLICYMAKER_LOG_BACKUPS 个历史文件。
+    """
+    backups = int(os.environ.get('POLICYMAKER_LOG_BACKUPS', 7))
+    if os.environ.get('POLICYMAKER_LOG_ROTATION', 'size').lower() == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_path, when='midnight', backupCount=backups, encoding='utf-8', delay=True
+        )
+    max_bytes = int(float(os.environ.get('POLICYMAKER_LOG_MAX_MB', 10)) * 1024 * 1024)
+    return logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True
+    )
 
 class Logger:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Logger, cls).__new__(cls)
             cls._instance._initialize_logger()
         return cls._instance
-    
+
     def _initialize_logger(self):
-        """初始化日志记录器"""
+        """初始化日志记录器
+
+        业务线程只把日志记录放入队列，由后台监听线程统一格式化并写入文件和控制台，
+        避免渲染路径上的同步文件写入。
+        """
         # 创建logs目录
-        if not os.path.exists('logs'):
-            os.makedirs('logs')
-        
-        # 创建以日期命名的日志文件
-        log_file = os.path.join('logs', f'default_{datetime.now().strftime("%Y%m%d")}.log')
-        
-        # 配置日志记录器
-        self.logger = logging.getLogger('PolicyMaker')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 创建文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        
+        if not os.path.exists(LOG_DIR):
+            os.makedirs(LOG_DIR)
+
         # 创建格式化器
         formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
+            '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        
-        # 设置格式化器
+
+        # 创建文件处理器和控制台处理器，由监听线程调用
+        file_handler = _create_file_handler(os.path.join(LOG_DIR, LOG_FILE))
         file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        
-        # 添加处理器
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
-    def debug(self, message):
+
+        # 队列处理器和监听线程
+        log_queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self.listener.start()
+        atexit.register(self.listener.stop)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+
+        # 配置日志记录器
+        default_level = os.environ.get('POLICYMAKER_LOG_LEVEL', DEFAULT_LEVEL).upper()
+        for name in PIPELINE_LOGGERS:
+            pipeline_logger = logging.getLogger(name)
+            pipeline_logger.setLevel(default_level)
+            pipeline_logger.addHandler(queue_handler)
+            pipeline_logger.propagate = False
+        self.logger = logging.getLogger('PolicyMaker')
+
+        # 按模块设置日志级别
+        self.configure_levels(_parse_module_levels(os.environ.get('POLICYMAKER_LOG_LEVELS')))
+
+    def configure_levels(self, levels):
+        """按模块设置日志级别，如 {'components.version_manager': 'DEBUG'}"""
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+    def is_debug_enabled(self):
+        """是否输出调试信息，用于跳过代价较高的调试内容拼接"""
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def debug(self, message, *args):
         """记录调试信息"""
-        self.logger.debug(message)
-    
-    def info(self, message):
+        self.logger.debug(message, *args)
+
+    def info(self, message, *args):
         """记录一般信息"""
-        self.logger.info(message)
-    
-    def warning(self, message):
+        self.logger.info(message, *args)
+
+    def warning(self, message, *args):
         """记录警告信息"""
-        self.logger.warning(message)
-    
-    def error(self, message):
+        self.logger.warning(message, *args)
+
+    def error(self, message, *args):
         """记录错误信息"""
-        self.logger.error(message)
-    
-    def critical(self, message):
+        self.logger.error(message, *args)
+
+    def critical(self, message, *args):
         """记录严重错误信息"""
-        self.logger.critical(message)
+        self.logger.critical(message, *args)
 
 # 创建全局日志记录器实例
-logger = Logger() 
+logger = Logger()
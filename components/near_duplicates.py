@@ -0,0 +1,143 @@
+import hashlib
+import numpy as np
+
+# 每个签名的哈希值数量（分桶数）
+NUM_HASHES = 128
+
+# LSH 分段：16 段，每段 8 个哈希值，Jaccard 相似度约 0.7 以上的条款大概率落入同一个桶
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+
+# 正文按字符三元组切分
+SHINGLE_SIZE = 3
+
+# 估计的 Jaccard 相似度达到该值才认为是近似重复
+DUPLICATE_THRESHOLD = 0.8
+
+# 每次向量化计算签名的条款数量
+SIGNATURE_BATCH = 5000
+
+# 哈希值的低位部分（高 7 位用于分桶）
+VALUE_BITS = 25
+
+# 没有任何三元组（正文过短）的签名值
+EMPTY_VALUE = np.uint32(0xFFFFFFFF)
+
+# 组合一段中多个哈希值的系数（奇数，按 2^64 取模相乘求和）
+_BAND_COEFFICIENTS = np.random.default_rng(20240611).integers(1, 2**63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+def content_digest(content):
+    """条款正文的摘要，用于判断签名是否需要重新计算"""
+    return hashlib.blake2b((content or '').encode('utf-8'), digest_size=8).hexdigest()
+
+def _mix(values):
+    """32 位整数哈希的雪崩混合（murmur3 finalizer 变体）"""
+    values ^= values >> np.uint32(15)
+    values *= np.uint32(0x2C1B3C6D)
+    values ^= values >> np.uint32(12)
+    values *= np.uint32(0x297A2D39)
+    values ^= values >> np.uint32(15)
+    return values
+
+def _batch_signatures(texts):
+    """一批文本的签名，见 minhash_signatures"""
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer('\x00'.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    signatures = np.full((len(texts), NUM_HASHES), EMPTY_VALUE, dtype=np.uint32)
+    if len(codes) < SHINGLE_SIZE:
+        return signatures
+
+    # 字符三元组的哈希，跨越文本分隔符的三元组丢弃
+    hashes = codes[:-2] * np.uint32(0x9E3779B1) ^ codes[1:-1] * np.uint32(0x85EBCA77) ^ codes[2:] * np.uint32(0xC2B2AE3D)
+    hashes = _mix(hashes)
+    valid = (codes[:-2] != 0) & (codes[1:-1] != 0) & (codes[2:] != 0)
+    docs = np.repeat(np.arange(len(texts), dtype=np.uint64), lengths + 1)[:len(hashes)]
+
+    # 按 (文本, 分桶, 值) 排序后，每个 (文本, 分桶) 的第一个元素就是桶内最小值
+    keys = np.sort((docs[valid] << np.uint64(32)) | hashes[valid].astype(np.uint64))
+    groups = keys >> np.uint64(VALUE_BITS)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    keys = keys[first]
+    rows = (keys >> np.uint64(32)).astype(np.int64)
+    bins = ((keys >> np.uint64(VALUE_BITS)) & np.uint64(NUM_HASHES - 1)).astype(np.int64)
+    signatures[rows, bins] = (keys & np.uint64((1 << VALUE_BITS) - 1)).astype(np.uint32)
+
+    # 空桶取右侧（循环）最近的非空桶的值，并按距离加上偏移，使两个文本的空桶仍可比较
+    filled = signatures != EMPTY_VALUE
+    columns = np.arange(2 * NUM_HASHES)
+    positions = np.where(np.tile(filled, 2), columns, 4 * NUM_HASHES)
+    nearest = np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1][:, :NUM_HASHES]
+    found = nearest < 4 * NUM_HASHES
+    distance = (nearest - np.arange(NUM_HASHES)).astype(np.uint32)
+    donors = signatures[np.arange(len(texts))[:, None], np.where(found, nearest % NUM_HASHES, 0)]
+    return np.where(found, donors + (distance << np.uint32(VALUE_BITS)), EMPTY_VALUE).astype(np.uint32)
+
+def minhash_signatures(texts):
+    """计算文本的 MinHash 签名，返回形状为 (文本数, NUM_HASHES) 的 uint32 数组
+
+    使用单次哈希的 MinHash（one permutation hashing）：每个字符三元组只哈希一次，
+    高位决定落入的分桶，桶内取最小的低位值；空桶按旋转法用相邻桶的值补齐。
+    两个签名中相等位置的比例是正文三元组集合 Jaccard 相似度的无偏估计。
+    """
+    texts = [text or '' for text in texts]
+    if not texts:
+        return np.zeros((0, NUM_HASHES), dtype=np.uint32)
+    return np.concatenate([
+        _batch_signatures(texts[start:start + SIGNATURE_BATCH])
+        for start in range(0, len(texts), SIGNATURE_BATCH)
+    ])
+
+def signatures_from_bytes(blobs):
+    """数据库中保存的签名字节串还原为数组"""
+    return np.frombuffer(b''.join(blobs), dtype=np.uint32).reshape(-1, NUM_HASHES)
+
+def estimated_similarity(signatures, left, right):
+    """按签名估计多对文本的 Jaccard 相似度"""
+    return (signatures[left] == signatures[right]).mean(axis=1)
+
+def find_clusters(signatures, threshold=DUPLICATE_THRESHOLD):
+    """用 LSH 找出近似重复的文本簇，返回按大小降序排列的行号列表（每簇至少 2 个）
+
+    每段的 8 个哈希值组合为一个桶键，同一段桶键相同的文本成为候选；桶内按顺序相邻的
+    候选对用完整签名估计相似度验证，达到阈值的用并查集合并。整个过程只有排序和
+    线性扫描，不做两两比较。
+    """
+    usable = np.flatnonzero((signatures != EMPTY_VALUE).any(axis=1))
+    if len(usable) < 2:
+        return []
+    bands = signatures[usable].reshape(len(usable), BANDS, ROWS_PER_BAND).astype(np.uint64)
+    band_keys = (bands * _BAND_COEFFICIENTS).sum(axis=2)
+
+    left, right = [], []
+    for band in range(BANDS):
+        order = np.argsort(band_keys[:, band], kind='stable')
+        keys = band_keys[order, band]
+        same = np.flatnonzero(keys[1:] == keys[:-1])
+        left.append(usable[order[same]])
+        right.append(usable[order[same + 1]])
+    left = np.concatenate(left)
+    right = np.concatenate(right)
+    if not len(left):
+        return []
+    pairs = np.unique(np.stack([np.minimum(left, right), np.maximum(left, right)], axis=1), axis=0)
+    pairs = pairs[estimated_similarity(signatures, pairs[:, 0], pairs[:, 1]) >= threshold]
+
+    parent = {}
+
+    def find(item):
+        root = parent.setdefault(item, item)
+        while root != parent[root]:
+            parent[root] = parent[parent[root]]
+            root = parent[root]
+        return root
+
+    for a, b in pairs.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = {}
+    for item in parent:
+        clusters.setdefault(find(item), []).append(item)
+    return sorted((sorted(members) for members in clusters.values()), key=lambda members: (-len(members), members[0]))
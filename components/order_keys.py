@@ -0,0 +1,195 @@
+import bisect
+
+# 排序键使用的 62 进制数字，按 ASCII 顺序排列，字符串比较即数值比较
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+# 第一个排序键（整数 0）
+FIRST_KEY = 'a0'
+
+# 最小的整数部分，不能再在其前面生成排序键
+SMALLEST_INTEGER = 'A' + '0' * 26
+
+def _integer_length(head):
+    """整数部分的长度由首字符决定：a–z 为 2–27 位的非负整数，Z–A 为 2–27 位的负整数"""
+    if 'a' <= head <= 'z':
+        return ord(head) - ord('a') + 2
+    if 'A' <= head <= 'Z':
+        return ord('Z') - ord(head) + 2
+    raise ValueError(f"无效的排序键首字符：{head!r}")
+
+def _integer_part(key):
+    """排序键的整数部分"""
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"无效的排序键：{key!r}")
+    return key[:length]
+
+def validate_order_key(key):
+    """检查排序键格式：整数部分完整，小数部分不以 0 结尾"""
+    if key == SMALLEST_INTEGER:
+        raise ValueError(f"无效的排序键：{key!r}")
+    integer = _integer_part(key)
+    if key[len(integer):].endswith('0') or any(char not in DIGITS for char in key[1:]):
+        raise ValueError(f"无效的排序键：{key!r}")
+
+def _increment_integer(integer):
+    """整数部分加一，超出最大值时返回 None"""
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = '0'
+    # 所有位都进位，整数部分变长一位（负数变短一位）
+    if head == 'Z':
+        return FIRST_KEY
+    if head == 'z':
+        return None
+    head = chr(ord(head) + 1)
+    if head > 'a':
+        digits.append('0')
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+def _decrement_integer(integer):
+    """整数部分减一，超出最小值时返回 None"""
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[-1]
+    if head == 'a':
+        return 'Z' + DIGITS[-1]
+    if head == 'A':
+        return None
+    head = chr(ord(head) - 1)
+    if head < 'Z':
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+def _midpoint(a, b):
+    """两个小数部分之间的小数部分，a < b，b 为 None 表示上界为 1"""
+    if b is not None:
+        # 去掉公共前缀（a 较短时按补 0 比较）
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    low = DIGITS.index(a[0]) if a else 0
+    high = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    # 首位相邻：b 多于一位时取 b 的首位即可，否则在 a 的首位之后继续取中点
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[low] + _midpoint(a[1:], None)
+
+def key_between(a, b):
+    """生成严格位于 a 和 b 之间的排序键，a 为 None 表示最前，b 为 None 表示最后
+
+    排序键为 62 进制的“整数部分 + 小数部分”：在末尾追加只需整数加一，
+    在两个键之间插入取小数部分的中点，其他行的排序键都不变。
+    """
+    if a is not None:
+        validate_order_key(a)
+    if b is not None:
+        validate_order_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"排序键顺序错误：{a!r} >= {b!r}")
+
+    if a is None:
+        if b is None:
+            return FIRST_KEY
+        integer = _integer_part(b)
+        fraction = b[len(integer):]
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint('', fraction)
+        if integer < b:
+            return integer
+        result = _decrement_integer(integer)
+        if result is None:
+            raise ValueError("排序键已达到下限")
+        return result
+
+    integer = _integer_part(a)
+    fraction = a[len(integer):]
+    if b is None:
+        result = _increment_integer(integer)
+        return integer + _midpoint(fraction, None) if result is None else result
+
+    if integer == _integer_part(b):
+        return integer + _midpoint(fraction, b[len(integer):])
+    result = _increment_integer(integer)
+    if result is None:
+        raise ValueError("排序键已达到上限")
+    return result if result < b else integer + _midpoint(fraction, None)
+
+def keys_between(a, b, n):
+    """生成 n 个位于 a 和 b 之间、依次递增的排序键
+
+    两端都有界时按二分生成，键的长度只随 log(n) 增长。
+    """
+    if n <= 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        keys = [key_between(a, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(keys[-1], b))
+        return keys
+    if a is None:
+        keys = [key_between(a, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(a, keys[-1]))
+        return keys[::-1]
+    mid = n // 2
+    key = key_between(a, b)
+    return keys_between(a, key, mid) + [key] + keys_between(key, b, n - mid - 1)
+
+def assign_order_keys(keys):
+    """为按目标顺序排列的行确定排序键，返回新的排序键列表
+
+    keys 为各行现有的排序键（新行为 None）。保留现有键中最长的递增子序列，
+    只为其余的行在相邻保留键之间重新生成排序键，因此移动一行只改写一行。
+    """
+    # 最长递增子序列（耐心排序），tails[i] 为长度 i + 1 的子序列的末尾位置
+    tails, tail_keys, previous = [], [], [None] * len(keys)
+    for position, key in enumerate(keys):
+        if key is None:
+            continue
+        length = bisect.bisect_left(tail_keys, key)
+        previous[position] = tails[length - 1] if length else None
+        if length == len(tails):
+            tails.append(position)
+            tail_keys.append(key)
+        else:
+            tails[length] = position
+            tail_keys[length] = key
+    kept = set()
+    position = tails[-1] if tails else None
+    while position is not None:
+        kept.add(position)
+        position = previous[position]
+
+    result = list(keys)
+    start = 0
+    while start < len(keys):
+        if start in kept:
+            start += 1
+            continue
+        end = start
+        while end < len(keys) and end not in kept:
+            end += 1
+        lower = result[start - 1] if start > 0 else None
+        upper = keys[end] if end < len(keys) else None
+        result[start:end] = keys_between(lower, upper, end - start)
+        start = end
+    return result
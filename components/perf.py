@@ -0,0 +1,131 @@
+import streamlit as st
+import os
+import json
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+# 性能跟踪文件（每次页面重跑写入一行 JSON）
+TRACE_FILE = os.path.join('logs', 'perf_trace.jsonl')
+
+# 性能面板中显示的最慢耗时段数量
+SLOWEST_SPAN_COUNT = 10
+
+# 当前脚本线程的跟踪记录；后台任务线程中为 None，计时和计数直接跳过
+_current_trace = contextvars.ContextVar('policymaker_perf_trace', default=None)
+_trace_file_lock = threading.Lock()
+
+class RerunTrace:
+    """一次页面重跑的性能记录"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.queries = 0
+        self.depth = 0
+
+    def elapsed_ms(self):
+        """本次重跑至今的耗时（毫秒）"""
+        return (time.perf_counter() - self.start) * 1000
+
+def begin_rerun():
+    """开始记录本次页面重跑"""
+    trace = RerunTrace()
+    _current_trace.set(trace)
+    return trace
+
+@contextmanager
+def span(name):
+    """记录一段代码的耗时和期间执行的 SQL 数量"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    queries_before = trace.queries
+    depth = trace.depth
+    trace.depth += 1
+    try:
+        yield
+    finally:
+        trace.depth = depth
+        trace.spans.append({
+            'name': name,
+            'ms': round((time.perf_counter() - start) * 1000, 3),
+            'queries': trace.queries - queries_before,
+            'depth': depth
+        })
+
+def timed(name):
+    """计时装饰器，name 为耗时段名称"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """SQLAlchemy 事件回调：累计当前重跑执行的 SQL 数量"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries += 1
+
+def instrument_engine(engine):
+    """为数据库引擎注册 SQL 计数"""
+    from sqlalchemy import event
+    
+    if not event.contains(engine, 'before_cursor_execute', _count_query):
+        event.listen(engine, 'before_cursor_execute', _count_query)
+
+def _trace_record(trace):
+    """生成写入跟踪文件的记录"""
+    # 条款缓存的查询引擎也需要注册 SQL 计数，这里延迟导入避免循环引用
+    from . import clause_cache
+
+    return {
+        'started_at': trace.started_at.isoformat(),
+        'project': st.session_state.get('project_name'),
+        'total_ms': round(trace.elapsed_ms(), 3),
+        'queries': trace.queries,
+        'cache': clause_cache.stats(),
+        'spans': trace.spans
+    }
+
+def _write_trace(record):
+    """追加写入 JSON-lines 跟踪文件"""
+    os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _trace_file_lock:
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+def render_perf_panel(trace):
+    """在侧边栏显示本次重跑的性能数据，开启时同时写入跟踪文件"""
+    if not st.sidebar.toggle("⏱️ 性能面板", key="perf_panel_enabled", help="显示本次页面重跑的耗时、SQL数量和缓存命中率"):
+        return
+
+    record = _trace_record(trace)
+    _write_trace(record)
+
+    with st.sidebar.expander("⏱️ 本次重跑性能", expanded=True):
+        cache = record['cache']
+        st.write(f"总耗时：{record['total_ms']:.1f} ms")
+        st.write(f"SQL 数量：{record['queries']}")
+        st.write(
+            f"条款缓存命中率：{cache['hit_rate']:.0%}"
+            f"（{cache['hits']} 命中 / {cache['misses']} 未命中，{cache['bytes'] / 1024 / 1024:.1f} MB）"
+        )
+        slowest = sorted(record['spans'], key=lambda s: s['ms'], reverse=True)[:SLOWEST_SPAN_COUNT]
+        if slowest:
+            st.dataframe(
+                [{'耗时段': s['name'], '耗时(ms)': s['ms'], 'SQL': s['queries']} for s in slowest],
+                hide_index=True
+            )
+        st.caption(f"跟踪记录写入 {TRACE_FILE}")
@@ -5,8 +5,88 @@ import shutil
 import zipfile
 import io
 from datetime import datetime
-from .database import Database, Base, ClauseVersion
-import sqlite3
+import logging
+from .perf import timed
+
+logger = logging.getLogger(__name__)
+
+# 数据库层（SQLAlchemy、pandas）在打开项目时才导入，侧边栏和欢迎页不需要加载它们
+
+# Linux 上 FICLONE ioctl 的请求码
+FICLONE = 0x40049409
+
+# 应用所在目录
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 所有项目共用的条款库，默认放在应用目录下（与启动 streamlit 时的工作目录无关），
+# 可通过环境变量 POLICYMAKER_LIBRARY_DB 指定位置
+LIBRARY_DB = os.path.abspath(
+    os.environ.get('POLICYMAKER_LIBRARY_DB') or os.path.join(APP_DIR, 'library', 'clauses.db')
+)
+
+def _reflink(src_path, dst_path):
+    """在支持写时复制的文件系统（btrfs、XFS 等）上克隆文件，不支持时返回 False"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        return False
+
+def clone_database(src_path, dst_path):
+    """复制 SQLite 数据库，返回使用的方式
+
+    优先用写时复制克隆文件（与文件大小无关，几乎不占额外空间）；文件系统不支持时，
+    用 SQLite 在线备份 API 从源数据库直接写入目标文件。两种方式都只复制一次。
+    """
+    import sqlite3
+    
+    source = sqlite3.connect(src_path, isolation_level=None)
+    try:
+        # 持有读事务，克隆期间其他连接无法提交写入，保证得到一致的副本
+        source.execute('BEGIN')
+        source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        try:
+            if _reflink(src_path, dst_path):
+                return 'reflink'
+        finally:
+            source.execute('ROLLBACK')
+        
+        target = sqlite3.connect(dst_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+        return 'backup'
+    finally:
+        source.close()
+
+def build_selection(db, db_path, bindings):
+    """根据方案的条款绑定 [(UUID, 版本号)] 创建已选条款列表
+
+    绑定的版本就是条款库当前版本时，用条款库快照中的行预先填充共享缓存，
+    其余条款（历史版本、已停用条款）在显示时再从缓存按需加载。
+    """
+    from .clause_snapshot import load_catalog
+    from .selected_clauses import SelectedClause, make_selected_clause
+    
+    catalog = load_catalog(db)
+    catalog_rows = catalog.set_index('UUID', drop=False) if not catalog.empty else None
+    selection = []
+    for index, (uuid, version_number) in enumerate(bindings, start=1):
+        if catalog_rows is not None and uuid in catalog_rows.index:
+            row = catalog_rows.loc[uuid]
+            if int(row['版本号']) == int(version_number):
+                selection.append(make_selected_clause(db_path, row, index))
+                continue
+        selection.append(SelectedClause(db_path, uuid, version_number, index))
+    return selection
 
 class ProjectManager:
     def __init__(self, base_dir='projects'):
@@ -17,8 +97,8 @@ class ProjectManager:
         if 'last_save_time' not in st.session_state:
             st.session_state.last_save_time = datetime.now()
     
-    def create_project(self, name, description=""):
-        """创建项目或打开已存在的项目"""
+    def create_project(self, name, description="", use_library=True):
+        """创建项目或打开已存在的项目，use_library 为 True 时新项目使用共享条款库"""
         project_dir = os.path.join(self.base_dir, name)
         
         # 如果项目已存在
@@ -33,12 +113,15 @@ class ProjectManager:
                 return False, f"打开已存在的项目失败: {str(e)}"
         
         try:
+            from .database import Database
+            
             # 创建新项目
             os.makedirs(project_dir)
             
             config = {
                 "name": name,
                 "description": description,
+                "library": LIBRARY_DB if use_library else None,
                 "created_at": datetime.now().isoformat(),
                 "updated_at": datetime.now().isoformat(),
                 "state": {
@@ -52,85 +135,69 @@ class ProjectManager:
             with open(os.path.join(project_dir, 'config.json'), 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
             
-            # 创建数据库并初始化保险方案
-            db = Database(os.path.join(project_dir, 'clauses.db'))
-            policy = db.create_policy(name, description)
-            st.session_state.current_policy_id = policy.id
+            # 创建数据库并初始化保险方案，项目数据库中只保存方案和本地修改
+            db = Database(os.path.join(project_dir, 'clauses.db'), library_path=LIBRARY_DB if use_library else None)
+            db.create_policy(name, description)
+            
+            # 打开新项目，数据库路径和当前方案都指向新项目
+            self.load_project(name)
             
             return True, f"项目 '{name}' 创建成功"
         except Exception as e:
             return False, f"创建项目失败: {str(e)}"
     
+    @timed('project.load_project')
     def load_project(self, name):
         """加载项目"""
+        from .database import Database
+        
         project_dir = os.path.join(self.base_dir, name)
         if not os.path.exists(project_dir):
             raise ValueError(f"目 '{name}' 不存在")
         
         # 获取数据库实例
-        db = Database(os.path.join(project_dir, 'clauses.db'))
+        db_path = os.path.join(project_dir, 'clauses.db')
+        db = Database(db_path)
         
         # 加载配置文件
         with open(os.path.join(project_dir, 'config.json'), 'r', encoding='utf-8') as f:
             config = json.load(f)
         
-        # 获取或创建保险方案
-        policies = db.session.query(db.InsurancePolicy).all()
+        # 获取或创建保险方案，优先打开上次保存时使用的方案
+        policies = db.list_policies()
         st.write(f"找到的保险方案数量：{len(policies)}")
         
+        policy_ids = [policy.id for policy in policies]
         if policies:
-            policy = policies[0]  # 使用第一个保险方案
-            st.write(f"使用现有保险方案，ID：{policy.id}")
+            policy_id = config['state'].get('current_policy_id')
+            if policy_id not in policy_ids:
+                policy_id = policy_ids[0]
+            st.write(f"使用现有保险方案，ID：{policy_id}")
         else:
-            policy = db.create_policy(name, config.get('description', ''))
-            st.write(f"创建新保险方案，ID：{policy.id}")
-        
-        st.session_state.current_policy_id = policy.id
-        
-        # 获取保险方案关联的条款UUID列表
-        clause_uuids = db.get_policy_clause_uuids(policy.id)
-        st.write(f"从数据库加载的条款数量：{len(clause_uuids)}")
-        
-        # 根据UUID列表构建selected_clauses
-        updated_selected_clauses = []
-        for uuid in clause_uuids:
-            # 获取条款的最新版本
-            latest_version = db.get_clause_version_by_clause_uuid(uuid)
-            if latest_version:
-                clause = db.session.query(db.Clause).filter_by(uuid=uuid).first()
-                if clause:
-                    updated_clause = {
-                        'UUID': uuid,
-                        '序号': len(updated_selected_clauses) + 1,
-                        '扩展条款标题': latest_version.title,
-                        '扩展条款正文': latest_version.content,
-                        'PINYIN': clause.pinyin,
-                        'QUANPIN': clause.quanpin,
-                        '险种': clause.insurance_type,
-                        '保险公司': clause.company,
-                        '年度版本': clause.version,
-                        '版本号': latest_version.version_number
-                    }
-                    updated_selected_clauses.append(updated_clause)
+            policy_id = db.create_policy(name, config.get('description', '')).id
+            st.write(f"创建新保险方案，ID：{policy_id}")
         
-        st.write(f"成功加载的条款数量：{len(updated_selected_clauses)}")
+        # 切换项目时清空上一个项目的方案缓存
+        st.session_state.policy_selections = {}
+        bindings = db.get_policy_clause_bindings(policy_id)
+        st.session_state.policy_selections[policy_id] = bindings
+        st.write(f"从数据库加载的条款数量：{len(bindings)}")
         
-        # 初始化 version_info
-        if 'version_info' not in st.session_state:
-            st.session_state.version_info = {}
+        updated_selected_clauses = build_selection(db, db_path, bindings)
+        st.write(f"成功加载的条款数量：{len(updated_selected_clauses)}")
         
         # 更新 version_info
-        for clause in updated_selected_clauses:
-            st.session_state.version_info[clause['UUID']] = clause['版本号']
+        st.session_state.version_info = {uuid: version_number for uuid, version_number in bindings}
         
         # 更新session state
+        st.session_state.current_policy_id = policy_id
         st.session_state.project_name = name
         st.session_state.project_dir = project_dir
         st.session_state.insurance_data = config['state']['insurance_data']
         st.session_state.selected_clauses = updated_selected_clauses
         st.session_state.filters = config['state'].get('filters', {})
         st.session_state.search_term = config['state'].get('search_term', '')
-        st.session_state.db_path = os.path.join(project_dir, 'clauses.db')
+        st.session_state.db_path = db_path
         st.session_state.last_save_time = datetime.now()
         
         # 加载其他信息选项卡配置
@@ -141,10 +208,89 @@ class ProjectManager:
             if 'other_info_data' not in st.session_state.insurance_data:
                 st.session_state.insurance_data['other_info_data'] = config['state'].get('other_info_data', {})
         
-        return os.path.join(project_dir, 'clauses.db')
+        return db_path
+    
+    def _store_current_policy(self, db):
+        """把当前方案的已选条款写入数据库和方案缓存"""
+        policy_id = st.session_state.get('current_policy_id')
+        if policy_id is None:
+            return
+        selected = st.session_state.get('selected_clauses', [])
+        db.save_policy_clauses(policy_id, [clause['UUID'] for clause in selected])
+        st.session_state.setdefault('policy_selections', {})[policy_id] = [
+            (clause['UUID'], clause.get('版本号', 1)) for clause in selected
+        ]
+    
+    @timed('project.switch_policy')
+    def switch_policy(self, policy_id):
+        """切换当前项目中的保险方案
+
+        先保存当前方案的已选条款，再从方案缓存中取出目标方案的条款绑定；
+        缓存中没有时用一次连接查询从数据库加载。
+        """
+        from .database import Database
+        
+        db_path = st.session_state.db_path
+        db = Database(db_path)
+        if policy_id != st.session_state.get('current_policy_id'):
+            self._store_current_policy(db)
+        
+        policy_selections = st.session_state.setdefault('policy_selections', {})
+        bindings = policy_selections.get(policy_id)
+        if bindings is None:
+            bindings = db.get_policy_clause_bindings(policy_id)
+            policy_selections[policy_id] = bindings
+        
+        st.session_state.current_policy_id = policy_id
+        st.session_state.selected_clauses = build_selection(db, db_path, bindings)
+        st.session_state.version_info = {uuid: version_number for uuid, version_number in bindings}
     
-    def save_project(self, name):
-        """保存项目"""
+    @timed('project.rebind_policy_as_of')
+    def rebind_policy_as_of(self, as_of):
+        """把当前方案的条款改为 as_of（UTC）时的版本，返回 (改绑数量, 当时尚不存在的条款UUID列表)"""
+        from .database import Database
+        
+        db_path = st.session_state.db_path
+        db = Database(db_path)
+        policy_id = st.session_state.current_policy_id
+        # 先保存当前选择，改绑以数据库中的绑定为准
+        self._store_current_policy(db)
+        rebound, missing = db.rebind_policy_as_of(policy_id, as_of)
+        
+        bindings = db.get_policy_clause_bindings(policy_id)
+        st.session_state.setdefault('policy_selections', {})[policy_id] = bindings
+        st.session_state.selected_clauses = build_selection(db, db_path, bindings)
+        st.session_state.version_info = {uuid: version_number for uuid, version_number in bindings}
+        return rebound, missing
+    
+    def create_policy(self, name, description=""):
+        """在当前项目中新建空白保险方案并切换过去"""
+        from .database import Database
+        
+        db = Database(st.session_state.db_path)
+        policy_id = db.create_policy(name, description).id
+        self.switch_policy(policy_id)
+        return policy_id
+    
+    def clone_policy(self, name):
+        """复制当前保险方案（包括尚未保存的已选条款）并切换到副本"""
+        from .database import Database
+        
+        db = Database(st.session_state.db_path)
+        self._store_current_policy(db)
+        policy = db.clone_policy(st.session_state.current_policy_id, name)
+        if policy is None:
+            return None
+        policy_id = policy.id
+        self.switch_policy(policy_id)
+        return policy_id
+    
+    @timed('project.save_project')
+    def save_project(self, name, export=True):
+        """保存项目，export 为 True 时同时返回项目导出数据"""
+        from .database import Database
+        from .selected_clauses import selection_refs
+        
         project_dir = os.path.join(self.base_dir, name)
         if not os.path.exists(project_dir):
             raise ValueError(f"项目 '{name}' 不存在")
@@ -171,10 +317,11 @@ class ProjectManager:
         config['updated_at'] = datetime.now().isoformat()
         config['state'] = {
             'insurance_data': st.session_state.get('insurance_data', {}),
-            'selected_clauses': st.session_state.get('selected_clauses', []),
+            'selected_clauses': selection_refs(st.session_state.get('selected_clauses', [])),
             'filters': st.session_state.get('filters', {}),
             'search_term': st.session_state.get('search_term', ''),
             'version_info': version_info,
+            'current_policy_id': st.session_state.get('current_policy_id'),
             'other_info_tabs': st.session_state.get('other_info_tabs', []),
             'other_info_data': (st.session_state.get('insurance_data', {}) or {}).get('other_info_data', {})
         }
@@ -183,10 +330,51 @@ class ProjectManager:
             json.dump(config, f, ensure_ascii=False, indent=2)
         
         # 导出项目数据
+        if not export:
+            return None
         project_data = self.export_project(name)
         
         return project_data
     
+    @timed('project.clone_project')
+    def clone_project(self, source_name, name):
+        """复制项目：数据库直接从源项目克隆，不经过 zip 导出和导入"""
+        from .database import Database, BackgroundJob, ImportCheckpoint
+        
+        source_dir = os.path.join(self.base_dir, source_name)
+        project_dir = os.path.join(self.base_dir, name)
+        if not os.path.exists(source_dir):
+            return False, f"项目 '{source_name}' 不存在"
+        if os.path.exists(project_dir):
+            return False, f"项目 '{name}' 已存在"
+        
+        try:
+            os.makedirs(project_dir)
+            
+            with open(os.path.join(source_dir, 'config.json'), 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            config['name'] = name
+            config['created_at'] = config['updated_at'] = datetime.now().isoformat()
+            with open(os.path.join(project_dir, 'config.json'), 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+            
+            source_db = os.path.join(source_dir, 'clauses.db')
+            if os.path.exists(source_db):
+                db_path = os.path.join(project_dir, 'clauses.db')
+                method = clone_database(source_db, db_path)
+                
+                # 后台任务记录和导入断点属于源项目，不随项目复制
+                db = Database(db_path)
+                db.session.query(BackgroundJob).delete()
+                db.session.query(ImportCheckpoint).delete()
+                db.session.commit()
+                logger.info("项目 %s 已复制为 %s（%s）", source_name, name, method)
+            
+            return True, f"项目 '{source_name}' 已复制为 '{name}'"
+        except Exception as e:
+            shutil.rmtree(project_dir, ignore_errors=True)
+            return False, f"复制项目失败: {str(e)}"
+    
     def export_project(self, name):
         project_dir = os.path.join(self.base_dir, name)
         if not os.path.exists(project_dir):
@@ -240,38 +428,7 @@ class ProjectManager:
             with zipfile.ZipFile(memory_zip, 'r') as zf:
                 zf.extractall(project_dir)
             
-            # 处理数据库升级
-            db_path = os.path.join(project_dir, 'clauses.db')
-            if os.path.exists(db_path):
-                # 备份原数据库
-                shutil.copy2(db_path, f"{db_path}.bak")
-                
-                # 创建新数据库
-                from .database import Database, Base
-                db = Database(db_path)
-                Base.metadata.create_all(db.engine)
-                
-                try:
-                    # 迁移数据
-                    old_db = sqlite3.connect(f"{db_path}.bak")
-                    new_db = sqlite3.connect(db_path)
-                    
-                    # 复制数据
-                    old_db.backup(new_db)
-                    
-                    # 关闭连接
-                    old_db.close()
-                    new_db.close()
-                    
-                    # 删除备份
-                    os.remove(f"{db_path}.bak")
-                except Exception as e:
-                    st.error(f"数据库升级失败: {str(e)}")
-                    # 恢复备份
-                    if os.path.exists(f"{db_path}.bak"):
-                        shutil.copy2(f"{db_path}.bak", db_path)
-                        os.remove(f"{db_path}.bak")
-            
+            # 旧版本数据库缺少的表、索引和触发器在打开数据库时原地补齐，不需要备份后再整库复制
             # 加载项目
             return self.load_project(name)
         except Exception as e:
@@ -302,9 +459,14 @@ def render_project_manager():
     with st.sidebar.expander("✨ 新建项目", expanded=False):
         project_name = st.text_input("📝 项目名称")
         project_desc = st.text_area("📋 项目描述")
+        use_library = st.checkbox(
+            "🔗 使用共享条款库",
+            value=True,
+            help=f"条款库只导入一次，所有项目共用（{LIBRARY_DB}）；不勾选则项目拥有独立的条款库"
+        )
         if st.button("🎯 创建项目"):
             if project_name:
-                success, message = project_manager.create_project(project_name, project_desc)
+                success, message = project_manager.create_project(project_name, project_desc, use_library)
                 if success:
                     st.success(f"🎉 {message}")
                     st.session_state.project_name = project_name
@@ -325,11 +487,31 @@ def render_project_manager():
             except ValueError as e:
                 st.error(f"❌ {str(e)}")
     
+    if 'project_name' in st.session_state and st.session_state.project_name is not None:
+        render_policy_switcher(project_manager)
+    
     if 'project_name' in st.session_state and st.session_state.project_name is not None:
         if st.sidebar.button("💾 手动保存当前项目"):
             project_manager.save_project(st.session_state.project_name)
             st.sidebar.success("✨ 项目已手动保存")
     
+    if 'project_name' in st.session_state and st.session_state.project_name is not None:
+        with st.sidebar.expander("📋 复制项目", expanded=False):
+            clone_name = st.text_input("📝 新项目名称", key="clone_project_name")
+            if st.button("📄 复制当前项目", help="直接克隆项目数据库，不经过导出和导入"):
+                if clone_name:
+                    # 先保存当前项目，副本包含最新的已选条款和投保信息
+                    project_manager.save_project(st.session_state.project_name, export=False)
+                    success, message = project_manager.clone_project(st.session_state.project_name, clone_name)
+                    if success:
+                        project_manager.load_project(clone_name)
+                        st.success(f"🎉 {message}")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {message}")
+                else:
+                    st.error("⚠️ 请输入项目名称")
+    
     if 'project_name' in st.session_state and st.session_state.project_name is not None:
         if st.sidebar.button("📤 导出当前项目"):
             project_data = project_manager.export_project(st.session_state.project_name)
@@ -346,3 +528,64 @@ def render_project_manager():
     if st.session_state.show_startup_message:
         st.info("💡 项目文件每隔5分钟自动保存，默认保存在浏览器缓存中。如果导出了项目数据，则将自动保存在选择的导出位置。")
         st.session_state.show_startup_message = False
+
+def render_policy_switcher(project_manager):
+    """侧边栏中的保险方案切换、新建和复制"""
+    from .database import Database
+    
+    policies = Database(st.session_state.db_path).list_policies()
+    if not policies:
+        return
+    
+    labels = {policy.id: f"{policy.name}（{policy.clause_count} 条）" for policy in policies}
+    policy_ids = list(labels)
+    current_policy_id = st.session_state.get('current_policy_id')
+    
+    with st.sidebar.expander("📑 保险方案", expanded=False):
+        selected_policy_id = st.selectbox(
+            "当前方案",
+            policy_ids,
+            index=policy_ids.index(current_policy_id) if current_policy_id in policy_ids else 0,
+            format_func=labels.get,
+            help="切换前会自动保存当前方案的已选条款"
+        )
+        if selected_policy_id != current_policy_id:
+            project_manager.switch_policy(selected_policy_id)
+            st.rerun()
+        
+        policy_name = st.text_input("📝 方案名称", key="new_policy_name")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("➕ 新建方案", use_container_width=True):
+                if policy_name:
+                    project_manager.create_policy(policy_name)
+                    st.rerun()
+                else:
+                    st.error("⚠️ 请输入方案名称")
+        with col2:
+            if st.button("📄 复制当前方案", use_container_width=True):
+                if policy_name:
+                    if project_manager.clone_policy(policy_name) is None:
+                        st.error("❌ 复制方案失败")
+                    else:
+                        st.rerun()
+                else:
+                    st.error("⚠️ 请输入方案名称")
+        
+        # 按日期回溯：版本创建时间以 UTC 记录，所选日期当天结束前创建的版本都算在内
+        as_of_date = st.date_input(
+            "⏱️ 回溯日期（UTC）",
+            value=datetime.utcnow().date(),
+            key="policy_as_of_date",
+            help="把当前方案的所有条款切换为该日期结束时的版本"
+        )
+        if st.button("⏪ 切换到该日期的条款版本", use_container_width=True):
+            try:
+                rebound, missing = project_manager.rebind_policy_as_of(
+                    datetime.combine(as_of_date, datetime.max.time())
+                )
+                st.success(f"🎉 已切换 {rebound} 个条款的版本")
+                if missing:
+                    st.warning(f"⚠️ {len(missing)} 个条款在该日期之后才创建，保持当前版本")
+            except Exception as e:
+                st.error(f"❌ 切换版本失败：{str(e)}")
@@ -0,0 +1,91 @@
+from collections.abc import MutableMapping
+from . import clause_cache
+
+# 已选条款对外提供的字段（与原先的字典字段一致）
+SELECTED_CLAUSE_KEYS = (
+    'UUID', '序号', '扩展条款标题', '扩展条款正文', 'PINYIN', 'QUANPIN',
+    '险种', '保险公司', '年度版本', '版本号'
+)
+
+# 由条款版本决定的字段 -> 缓存记录中的属性名
+_CACHED_FIELDS = {
+    '扩展条款标题': 'title',
+    '扩展条款正文': 'content',
+    'PINYIN': 'pinyin',
+    'QUANPIN': 'quanpin',
+    '险种': 'insurance_type',
+    '保险公司': 'company',
+    '年度版本': 'version'
+}
+
+class SelectedClause(MutableMapping):
+    """已选条款的紧凑引用
+
+    只保存 (UUID, 版本号, 序号)，标题、正文等字段按需从进程级条款缓存中读取，
+    对外仍可像原来的字典一样使用 clause['扩展条款标题']、clause.get('版本号') 等方式访问。
+    """
+    __slots__ = ('db_path', 'uuid', 'version_number', 'index')
+
+    def __init__(self, db_path, uuid, version_number, index):
+        self.db_path = db_path
+        self.uuid = uuid
+        self.version_number = int(version_number)
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == 'UUID':
+            return self.uuid
+        if key == '序号':
+            return self.index
+        if key == '版本号':
+            return self.version_number
+        field = _CACHED_FIELDS.get(key)
+        if field is None:
+            raise KeyError(key)
+        return getattr(clause_cache.get(self.db_path, self.uuid, self.version_number), field)
+
+    def __setitem__(self, key, value):
+        if key == '序号':
+            self.index = value
+        elif key == '版本号':
+            self.version_number = int(value)
+        else:
+            raise KeyError(f"{key} 由条款版本决定，请修改版本号")
+
+    def __delitem__(self, key):
+        raise KeyError(f"不能删除已选条款的字段：{key}")
+
+    def __iter__(self):
+        return iter(SELECTED_CLAUSE_KEYS)
+
+    def __len__(self):
+        return len(SELECTED_CLAUSE_KEYS)
+
+    def __repr__(self):
+        return f"SelectedClause({self.uuid!r}, V{self.version_number}, 序号={self.index})"
+
+    def to_ref(self):
+        """用于保存到项目配置的最小引用"""
+        return {'UUID': self.uuid, '版本号': self.version_number}
+
+def make_selected_clause(db_path, row, index):
+    """根据条款库中的一行创建已选条款，同时把行中的内容放入共享缓存"""
+    clause_cache.put(db_path, row['UUID'], row['版本号'], clause_cache.CachedClause(
+        title=row['扩展条款标题'],
+        content=row['扩展条款正文'],
+        pinyin=row['PINYIN'],
+        quanpin=row['QUANPIN'],
+        insurance_type=row['险种'],
+        company=row['保险公司'],
+        version=row['年度版本']
+    ))
+    return SelectedClause(db_path, row['UUID'], row['版本号'], index)
+
+def order_by_policy(db, policy_id, clauses):
+    """按数据库中方案的条款顺序排列已选条款，不在方案中的条款保持原有顺序排在最后"""
+    rank = {uuid: i for i, (uuid, _) in enumerate(db.get_policy_clause_bindings(policy_id))}
+    return sorted(clauses, key=lambda clause: rank.get(clause['UUID'], len(rank)))
+
+def selection_refs(clauses):
+    """将已选条款列表转换为可写入 config.json 的引用列表"""
+    return [{'UUID': clause['UUID'], '版本号': clause.get('版本号', 1)} for clause in clauses]
@@ -0,0 +1,208 @@
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from .clause_snapshot import load_catalog
+from .perf import timed
+
+logger = logging.getLogger(__name__)
+
+# 字符二元组哈希到的特征维数
+HASH_BUCKETS = 1 << 20
+
+# 出现在超过该比例条款中的特征（如“保险”“条款”）查询时忽略
+MAX_DF_RATIO = 0.5
+
+# 索引文件格式版本，格式变化后旧文件会被忽略并重建
+INDEX_FORMAT = 1
+
+# 进程内的相似度索引：索引文件路径 -> (条款库 DataFrame, SimilarityIndex)
+_indexes = {}
+_indexes_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+def similarity_path(db_path):
+    """相似度索引文件路径，与数据库文件放在同一目录"""
+    return os.path.splitext(os.path.abspath(db_path))[0] + '.tfidf.npz'
+
+def clause_text(title, content):
+    """参与相似度计算的条款文本：标题和正文"""
+    return f"{title or ''}\n{content or ''}"
+
+def text_digest(text):
+    """文本内容摘要，用于判断条款内容是否变化"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+def hashed_bigrams(text):
+    """文本的字符二元组哈希特征，返回 (升序的特征号, 出现次数)"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    if len(codes) < 2:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    grams = (codes[:-1] * 1000003 + codes[1:]) % HASH_BUCKETS
+    features, counts = np.unique(grams, return_counts=True)
+    return features.astype(np.int32), counts.astype(np.int32)
+
+def _gather(ptr, keys):
+    """CSR/CSC 中多个行（列）的元素下标，返回 (下标数组, 每个行的元素数)"""
+    starts = ptr[keys]
+    lengths = ptr[keys + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum()), lengths
+
+class SimilarityIndex:
+    """条款的字符二元组 TF-IDF 索引
+
+    每个条款的标题和正文切分为字符二元组，哈希到 HASH_BUCKETS 维；
+    词频计数以 CSR（indptr, indices, counts）保存到数据库旁的 .npz 文件，
+    加载时计算 IDF 权重（1 + log tf）* idf 并按行归一化，同时建立按特征的 CSC 倒排，
+    查询向量与命中特征的倒排做稀疏乘积即得到所有条款的余弦相似度。
+    """
+
+    def __init__(self, uuids, digests, indptr, indices, counts):
+        self.uuids = uuids
+        self.digests = digests
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.size = len(uuids)
+        self.position = {uuid: i for i, uuid in enumerate(uuids.tolist())}
+
+        rows = np.repeat(np.arange(self.size, dtype=np.int32), np.diff(indptr))
+        doc_freq = np.bincount(indices, minlength=HASH_BUCKETS)
+        idf = np.log((1 + self.size) / (1 + doc_freq)) + 1
+        weights = (1 + np.log(counts)) * idf[indices]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=self.size))
+        norms[norms == 0] = 1
+        self.data = (weights / norms[rows]).astype(np.float32)
+        self.common = doc_freq > MAX_DF_RATIO * max(self.size, 1)
+
+        order = np.argsort(indices, kind='stable')
+        self.col_ptr = np.zeros(HASH_BUCKETS + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self.col_ptr[1:])
+        self.col_rows = rows[order]
+        self.col_data = self.data[order]
+
+    @classmethod
+    def build(cls, df, previous=None):
+        """由条款库构建索引，内容与 previous 中相同的条款直接复用其特征"""
+        uuids = df['UUID'].astype(str).to_numpy()
+        texts = [clause_text(title, content) for title, content in zip(df['扩展条款标题'], df['扩展条款正文'])]
+        digests = np.array([text_digest(text) for text in texts], dtype='S8')
+        reuse = previous.row_by_digest() if previous is not None else {}
+        features, counts = [], []
+        for text, digest in zip(texts, digests.tolist()):
+            row = reuse.get(digest)
+            if row is not None:
+                start, end = previous.indptr[row], previous.indptr[row + 1]
+                features.append(previous.indices[start:end])
+                counts.append(previous.counts[start:end])
+            else:
+                row_features, row_counts = hashed_bigrams(text)
+                features.append(row_features)
+                counts.append(row_counts)
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in features], out=indptr[1:])
+        empty = np.zeros(0, dtype=np.int32)
+        return cls(
+            uuids, digests, indptr,
+            np.concatenate(features) if features else empty,
+            np.concatenate(counts) if counts else empty
+        )
+
+    def row_by_digest(self):
+        """内容摘要 -> 行号"""
+        return {digest: i for i, digest in enumerate(self.digests.tolist())}
+
+    def similar(self, uuids, k=10):
+        """与给定条款（多个时取向量之和）最相似的 k 个其他条款，返回 [(UUID, 余弦相似度)]"""
+        rows = np.array([self.position[uuid] for uuid in uuids if uuid in self.position], dtype=np.int64)
+        if not len(rows):
+            return []
+        positions, _ = _gather(self.indptr, rows)
+        features, inverse = np.unique(self.indices[positions], return_inverse=True)
+        query = np.bincount(inverse, weights=self.data[positions])
+        keep = ~self.common[features]
+        features, query = features[keep], query[keep]
+        norm = np.linalg.norm(query)
+        if not len(features) or norm == 0:
+            return []
+
+        positions, lengths = _gather(self.col_ptr, features)
+        scores = np.bincount(
+            self.col_rows[positions],
+            weights=self.col_data[positions] * np.repeat(query / norm, lengths),
+            minlength=self.size
+        )
+        scores[rows] = 0
+        k = min(k, int((scores > 0).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(str(self.uuids[i]), float(scores[i])) for i in top]
+
+    def save(self, path):
+        """写入 .npz 文件，先写临时文件再原子替换"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as sink:
+                np.savez(
+                    sink, format=np.array(INDEX_FORMAT), uuids=self.uuids.astype(str), digests=self.digests,
+                    indptr=self.indptr, indices=self.indices, counts=self.counts
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """读取 .npz 文件，文件不存在、损坏或格式不符时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data['format']) != INDEX_FORMAT:
+                    return None
+                return cls(data['uuids'], data['digests'], data['indptr'], data['indices'], data['counts'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("读取相似度索引失败，将重新生成：%s", e)
+            return None
+
+@timed('catalog.load_similarity_index')
+def load_similarity_index(db):
+    """获取当前条款库的相似度索引
+
+    条款库未变化时复用进程内的索引；变化后（导入、修改条款等）以上一个索引或磁盘上的
+    索引文件为基础增量更新，只对内容变化的条款重新提取特征，再写回索引文件。
+    """
+    df = load_catalog(db)
+    path = similarity_path(db.db_path)
+    with _indexes_lock:
+        cached = _indexes.get(path)
+    if cached is not None and cached[0] is df:
+        return cached[1]
+
+    with _build_lock:
+        with _indexes_lock:
+            cached = _indexes.get(path)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        previous = cached[1] if cached is not None else SimilarityIndex.load(path)
+        index = SimilarityIndex.build(df, previous)
+        unchanged = (
+            previous is not None
+            and np.array_equal(previous.digests, index.digests)
+            and np.array_equal(previous.uuids, index.uuids)
+        )
+        if not unchanged:
+            try:
+                index.save(path)
+            except Exception as e:
+                logger.warning("写入相似度索引失败：%s", e)
+        with _indexes_lock:
+            _indexes[path] = (df, index)
+    return index
@@ -1,17 +1,19 @@
 import streamlit as st
 import difflib
 from .logger import logger
+from .fragments import rerun_fragment
 
 def render_version_tags(versions, current_version, on_version_select, on_version_delete, key_prefix, current_content):
     """渲染版本标签"""
-    logger.debug("\n=== 版本标签渲染开始 ===")
-    logger.debug(f"当前版本号: {current_version}")
-    logger.debug(f"条款UUID: {key_prefix}")
+    # 调试内容（含条款正文片段）只在开启 DEBUG 时拼接和输出
+    debug_enabled = logger.is_debug_enabled()
+    if debug_enabled:
+        logger.debug("=== 版本标签渲染开始 === 条款UUID: %s，当前版本号: %s", key_prefix, current_version)
     
     # 获取当前生效的版本对象
     current_ver = next((v for v in versions if v.version_number == current_version), None)
-    if current_ver:
-        logger.debug(f"当前版本内容: {current_ver.content[:50]}...")
+    if current_ver and debug_enabled:
+        logger.debug("当前版本内容: %s...", current_ver.content[:50])
     
     # 显示版本历史和当前生效版本
     st.write(f"📚 版本历史（当前生效：V{current_version}）")
@@ -22,10 +24,8 @@ def render_version_tags(versions, current_version, on_version_select, on_version
         f"V{v.version_number} ({v.created_at.strftime('%Y-%m-%d %H:%M')})" 
         for v in versions
     ]
-    logger.debug(f"可用版本数量: {len(versions)}")
-    logger.debug("可用版本列表:")
-    for v in versions:
-        logger.debug(f"  - V{v.version_number} ({v.created_at})")
+    if debug_enabled:
+        logger.debug("可用版本: %s", ", ".join(f"V{v.version_number} ({v.created_at})" for v in versions))
     
     selected_idx = st.selectbox(
         "🔍 选择版本",
@@ -36,8 +36,8 @@ def render_version_tags(versions, current_version, on_version_select, on_version
     
     # 获取选中的版本
     selected_version = versions[selected_idx]
-    logger.debug(f"选中的版本号: {selected_version.version_number}")
-    logger.debug(f"选中版本内容: {selected_version.content[:50]}...")
+    if debug_enabled:
+        logger.debug("选中的版本号: %s，内容: %s...", selected_version.version_number, selected_version.content[:50])
     
     # 显示选中版本的内容（只读）
     st.text_area(
@@ -54,10 +54,9 @@ def render_version_tags(versions, current_version, on_version_select, on_version
         with col1:
             switch_key = f"switch_{key_prefix}_{selected_version.version_number}_{current_version}"
             if st.button("切换到此版本", key=switch_key):
-                logger.info("\n=== 版本切换操作开始 ===")
-                logger.info(f"尝试从 V{current_version} 切换到 V{selected_version.version_number}")
+                logger.info("尝试从 V%s 切换到 V%s", current_version, selected_version.version_number)
                 success = on_version_select(selected_version.version_number)
-                logger.info(f"版本切换结果: {success}")
+                logger.info("版本切换结果: %s", success)
                 
                 if success:
                     st.success(f"已切换到版本 V{selected_version.version_number}")
@@ -77,7 +76,7 @@ def render_version_tags(versions, current_version, on_version_select, on_version
     
     if st.button("✏️ 开始编辑", key=f"edit_{key_prefix}"):
         st.session_state.editing_mode[key_prefix] = True
-        st.rerun()
+        rerun_fragment()
     
     # 只在编辑模式下显示编辑区域
     if st.session_state.editing_mode.get(key_prefix):
@@ -105,7 +104,7 @@ def render_version_tags(versions, current_version, on_version_select, on_version
         with col2:
             if st.button("❌ 取消编辑", key=f"cancel_{key_prefix}"):
                 st.session_state.editing_mode[key_prefix] = False
-                st.rerun()
+                rerun_fragment()
         
         return edited_content, True, version_note
     
@@ -1,17 +1,103 @@
 import streamlit as st
+import os
 import json
-import requests
-from streamlit_lottie import st_lottie
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 
-def load_lottie_url(url: str):
-    """从URL加载Lottie动画"""
+# 随应用打包的欢迎动画，离线环境直接使用
+LOTTIE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'lottie')
+BUNDLED_ANIMATION = os.path.join(LOTTIE_DIR, 'welcome.json')
+
+# 远程下载的动画缓存目录
+LOTTIE_CACHE_DIR = os.path.join(LOTTIE_DIR, 'cache')
+
+# 在线动画地址（本地动画缺失时才使用）
+LOTTIE_URLS = [
+    "https://assets9.lottiefiles.com/packages/lf20_qp1q7mct.json",  # 数据分析动画
+    "https://assets6.lottiefiles.com/packages/lf20_xyadoh9h.json",  # 备用数据分析动画1
+    "https://assets5.lottiefiles.com/packages/lf20_qrf3xad8.json",  # 备用数据分析动画2
+    "https://assets7.lottiefiles.com/packages/lf20_dwjqnr8o.json"   # 备用数据分析动画3
+]
+
+# 远程下载的总时限（秒），超时后不再等待，直接显示没有动画的欢迎页
+LOTTIE_FETCH_TIMEOUT = 3
+
+# 进程级缓存：所有会话共用一次加载结果（包括加载失败），避免每个新会话重复访问网络
+_animation_cache = {}
+_animation_lock = threading.Lock()
+
+def load_lottie_file(path):
+    """从本地文件加载Lottie动画，文件不存在或损坏时返回 None"""
     try:
-        r = requests.get(url)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _cache_path(url):
+    """远程动画在本地缓存中的文件路径"""
+    return os.path.join(LOTTIE_CACHE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+def load_lottie_url(url, timeout=LOTTIE_FETCH_TIMEOUT):
+    """从URL加载Lottie动画，成功后写入本地缓存"""
+    try:
+        import requests
+        r = requests.get(url, timeout=timeout)
         if r.status_code != 200:
             return None
-        return r.json()
-    except:
+        animation = r.json()
+    except Exception:
         return None
+    
+    try:
+        os.makedirs(LOTTIE_CACHE_DIR, exist_ok=True)
+        with open(_cache_path(url), 'w', encoding='utf-8') as f:
+            json.dump(animation, f)
+    except OSError:
+        # 应用目录只读时不缓存，下次启动重新下载
+        pass
+    return animation
+
+def fetch_first_animation(urls, timeout=LOTTIE_FETCH_TIMEOUT):
+    """并发下载多个动画，在时限内按 urls 顺序返回第一个成功的结果"""
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    futures = [executor.submit(load_lottie_url, url, timeout) for url in urls]
+    deadline = time.monotonic() + timeout
+    try:
+        for future in futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                animation = future.result(timeout=remaining)
+            except FuturesTimeout:
+                break
+            if animation:
+                return animation
+        return None
+    finally:
+        # 不等待仍在进行的下载，页面渲染不受网络影响
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def load_welcome_animation():
+    """加载欢迎动画：优先使用本地打包和缓存的动画，都没有时才限时下载"""
+    with _animation_lock:
+        if 'welcome' in _animation_cache:
+            return _animation_cache['welcome']
+        
+        animation = load_lottie_file(BUNDLED_ANIMATION)
+        if not animation:
+            for url in LOTTIE_URLS:
+                animation = load_lottie_file(_cache_path(url))
+                if animation:
+                    break
+        if not animation:
+            animation = fetch_first_animation(LOTTIE_URLS)
+        
+        _animation_cache['welcome'] = animation
+        return animation
 
 def show_welcome_screen():
     """显示欢迎页面"""
@@ -22,22 +108,8 @@ def show_welcome_screen():
         layout="wide"
     )
     
-    # 加载动画 - 使用数据分析相关的动画
-    lottie_url = "https://assets9.lottiefiles.com/packages/lf20_qp1q7mct.json"  # 这是一个数据分析动画
-    # 备用动画URLs，以防主URL不可用
-    backup_urls = [
-        "https://assets6.lottiefiles.com/packages/lf20_xyadoh9h.json",  # 备用数据分析动画1
-        "https://assets5.lottiefiles.com/packages/lf20_qrf3xad8.json",  # 备用数据分析动画2
-        "https://assets7.lottiefiles.com/packages/lf20_dwjqnr8o.json"   # 备用数据分析动画3
-    ]
-    
-    # 尝试加载主动画，如果失败则尝试备用动画
-    lottie_json = load_lottie_url(lottie_url)
-    if not lottie_json:
-        for backup_url in backup_urls:
-            lottie_json = load_lottie_url(backup_url)
-            if lottie_json:
-                break
+    # 加载动画（本地优先，进程内只加载一次）
+    lottie_json = load_welcome_animation()
     
     # 显示欢迎信息
     st.markdown("""
@@ -69,6 +141,8 @@ def show_welcome_screen():
     with col2:
         # 显示动画，添加更多的自定义选项
         if lottie_json:
+            # streamlit_lottie 会连带导入 requests，只在真正显示动画时加载
+            from streamlit_lottie import st_lottie
             st_lottie(
                 lottie_json,
                 speed=1,